@@ -1,4 +1,5 @@
 import os
+from datetime import date
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
@@ -59,6 +60,13 @@ def create_app(config_name=None):
     with app.app_context():
         db.create_all()
         _upgrade_simulation_tables(app)
+        _upgrade_document_search_index(app)
+        _upgrade_document_storage_keys(app)
+        _upgrade_image_analysis_ocr(app)
+        _upgrade_reminder_next_fire(app)
+        _backfill_reminder_slots(app)
+        _upgrade_user_location_keys(app)
+        _backfill_user_location_keys(app)
         _seed_simulations(app)
         print("✓ Database tables initialized and seeded")
     
@@ -119,6 +127,193 @@ def _upgrade_simulation_tables(app):
         print(f"! Column upgrade skipped: {e}")
 
 
+def _upgrade_document_search_index(app):
+    """Add the FULLTEXT search index over document OCR text"""
+    try:
+        with db.engine.connect() as conn:
+            result = conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_name='medical_documents' AND index_name='ft_medical_documents_search'"
+            ))
+            if result.scalar() == 0:
+                conn.execute(text(
+                    "ALTER TABLE medical_documents "
+                    "ADD FULLTEXT INDEX ft_medical_documents_search (title, ocr_text, ai_summary)"
+                ))
+                conn.commit()
+                print("✓ Added document search index")
+    except Exception as e:
+        print(f"! Document search index skipped: {e}")
+
+
+def _upgrade_document_storage_keys(app):
+    """Add object storage key columns to document tables"""
+    try:
+        with db.engine.connect() as conn:
+            for table, column in (('medical_documents', 'file_key'), ('medical_document_images', 'image_key')):
+                result = conn.execute(text(
+                    "SELECT COUNT(*) FROM information_schema.columns "
+                    f"WHERE table_name='{table}' AND column_name='{column}'"
+                ))
+                if result.scalar() == 0:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(255)"))
+                    conn.commit()
+                    print(f"✓ Added {table}.{column}")
+    except Exception as e:
+        print(f"! Document storage keys upgrade skipped: {e}")
+
+
+def _upgrade_image_analysis_ocr(app):
+    """Add the OCR text columns to image_analysis_cache"""
+    try:
+        with db.engine.connect() as conn:
+            for column, column_type in (('ocr_text', 'TEXT'), ('ocr_confidence', 'FLOAT')):
+                result = conn.execute(text(
+                    "SELECT COUNT(*) FROM information_schema.columns "
+                    f"WHERE table_name='image_analysis_cache' AND column_name='{column}'"
+                ))
+                if result.scalar() == 0:
+                    conn.execute(text(f"ALTER TABLE image_analysis_cache ADD COLUMN {column} {column_type} NULL"))
+                    conn.commit()
+                    print(f"✓ Added image_analysis_cache.{column}")
+    except Exception as e:
+        print(f"! Image analysis OCR upgrade skipped: {e}")
+
+
+def _upgrade_reminder_next_fire(app):
+    """Add users.timezone and the precomputed reminder_schedule_slots.next_fire_at"""
+    try:
+        with db.engine.connect() as conn:
+            result = conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_name='users' AND column_name='timezone'"
+            ))
+            if result.scalar() == 0:
+                default_tz = os.getenv('DEFAULT_TIMEZONE', 'Asia/Kathmandu')
+                conn.execute(text(f"ALTER TABLE users ADD COLUMN timezone VARCHAR(50) DEFAULT '{default_tz}'"))
+                conn.commit()
+                print("✓ Added users.timezone")
+            
+            result = conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_name='reminder_schedule_slots' AND column_name='next_fire_at'"
+            ))
+            if result.scalar() == 0:
+                conn.execute(text("ALTER TABLE reminder_schedule_slots ADD COLUMN next_fire_at DATETIME NULL"))
+                conn.execute(text(
+                    "CREATE INDEX idx_reminder_slots_next_fire ON reminder_schedule_slots (next_fire_at)"
+                ))
+                conn.execute(text("DROP INDEX idx_reminder_slots_minute ON reminder_schedule_slots"))
+                conn.commit()
+                print("✓ Added reminder_schedule_slots.next_fire_at")
+    except Exception as e:
+        print(f"! Reminder next_fire_at upgrade skipped: {e}")
+
+
+def _backfill_reminder_slots(app):
+    """Index reminders created before reminder_schedule_slots existed, and schedule unscheduled active ones"""
+    try:
+        from app.models.reminder import MedicineReminder, ReminderScheduleSlot
+        
+        missing = MedicineReminder.query.outerjoin(
+            ReminderScheduleSlot, ReminderScheduleSlot.reminder_id == MedicineReminder.id
+        ).filter(ReminderScheduleSlot.id.is_(None)).all()
+        unscheduled = MedicineReminder.query.join(
+            ReminderScheduleSlot, ReminderScheduleSlot.reminder_id == MedicineReminder.id
+        ).filter(
+            MedicineReminder.is_active == True,
+            db.or_(MedicineReminder.end_date.is_(None), MedicineReminder.end_date >= date.today()),
+            ReminderScheduleSlot.next_fire_at.is_(None)
+        ).distinct().all()
+        reminders = {reminder.id: reminder for reminder in missing + unscheduled}
+        for reminder in reminders.values():
+            reminder.sync_schedule_slots()
+        if reminders:
+            db.session.commit()
+            print(f"✓ Indexed schedule slots for {len(reminders)} reminders")
+    except Exception as e:
+        db.session.rollback()
+        print(f"! Reminder slot backfill skipped: {e}")
+
+
+def _upgrade_user_location_keys(app):
+    """Add the derived users.city_key / province_key / geohash columns used for alert audiences"""
+    try:
+        with db.engine.connect() as conn:
+            for column, column_type in (
+                ('city_key', 'VARCHAR(100)'),
+                ('province_key', 'VARCHAR(100)'),
+                ('geohash', 'VARCHAR(12)')
+            ):
+                result = conn.execute(text(
+                    "SELECT COUNT(*) FROM information_schema.columns "
+                    f"WHERE table_name='users' AND column_name='{column}'"
+                ))
+                if result.scalar() == 0:
+                    conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} {column_type}"))
+                    conn.execute(text(f"CREATE INDEX ix_users_{column} ON users ({column})"))
+                    conn.commit()
+                    print(f"✓ Added users.{column}")
+    except Exception as e:
+        print(f"! User location keys upgrade skipped: {e}")
+
+
+def _backfill_user_location_keys(app, batch_size=1000):
+    """Fill city_key / province_key / geohash for users saved before the columns existed"""
+    try:
+        from app.models.user import User, normalize_location_key
+        from app.utils.geo import encode_geohash
+        
+        total = 0
+        unkeyed = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                User.id, User.city, User.province, User.latitude, User.longitude
+            ).filter(
+                User.id > last_id,
+                db.or_(
+                    db.and_(User.city.isnot(None), User.city_key.is_(None)),
+                    db.and_(User.province.isnot(None), User.province_key.is_(None)),
+                    db.and_(User.latitude.isnot(None), User.longitude.isnot(None), User.geohash.is_(None))
+                )
+            ).order_by(User.id).limit(batch_size).all()
+            if not rows:
+                break
+            params = [
+                {
+                    'user_id': user_id,
+                    'city_key': normalize_location_key(city),
+                    'province_key': normalize_location_key(province),
+                    'geohash': encode_geohash(latitude, longitude)
+                }
+                for user_id, city, province, latitude, longitude in rows
+            ]
+            db.session.execute(User.__table__.update().where(
+                User.__table__.c.id == db.bindparam('user_id')
+            ).values(
+                city_key=db.bindparam('city_key'),
+                province_key=db.bindparam('province_key'),
+                geohash=db.bindparam('geohash')
+            ), params)
+            db.session.commit()
+            total += len(rows)
+            # Names with nothing left to match on (e.g. only punctuation): no city/province alerts
+            unkeyed += sum(
+                1 for (_, city, province, _, _), row in zip(rows, params)
+                if (city and city.strip() and row['city_key'] is None)
+                or (province and province.strip() and row['province_key'] is None)
+            )
+            last_id = rows[-1][0]
+        if total:
+            print(f"✓ Backfilled location keys for {total} users")
+        if unkeyed:
+            print(f"! {unkeyed} users have a city/province that normalizes to no location key")
+    except Exception as e:
+        db.session.rollback()
+        print(f"! User location key backfill skipped: {e}")
+
+
 def _seed_simulations(app):
     """Seed simulations if not already present with full data"""
     try:
@@ -50,6 +50,10 @@ class Config:
     AI_LIVE_CALL_MODEL = os.getenv('AI_LIVE_CALL_MODEL', 'meta-llama/Llama-3.3-70B-Instruct')
     AI_LIVE_CALL_MODEL_FALLBACKS = os.getenv('AI_LIVE_CALL_MODEL_FALLBACKS', 'deepseek-ai/DeepSeek-V3').split(',')
     
+    # Live call voice budget - longer replies are cut at a sentence boundary
+    # and the rest is returned as text only
+    VOICE_RESPONSE_MAX_SECONDS = float(os.getenv('VOICE_RESPONSE_MAX_SECONDS', '20'))
+    
     AI_JSON_MODEL = os.getenv('AI_JSON_MODEL', 'google/gemma-2-27b-it')
     AI_JSON_MODEL_FALLBACKS = os.getenv('AI_JSON_MODEL_FALLBACKS', 'meta-llama/Llama-3.3-70B-Instruct').split(',')
     
@@ -72,7 +76,31 @@ class Config:
     
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Largest decoded image accepted by the upload/analysis routes (413 above)
+    MAX_IMAGE_UPLOAD_BYTES = int(os.getenv('MAX_IMAGE_UPLOAD_BYTES', str(10 * 1024 * 1024)))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    
+    # Public base URL used to build absolute links outside a request (cron jobs)
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', '').rstrip('/')
+    
+    # Generated media serving (TTS audio etc.)
+    FILE_CACHE_MAX_AGE = int(os.getenv('FILE_CACHE_MAX_AGE', str(365 * 24 * 60 * 60)))
+    # nginx internal location, e.g. /protected_audio -> X-Accel-Redirect offload
+    FILE_ACCEL_REDIRECT_PREFIX = os.getenv('FILE_ACCEL_REDIRECT_PREFIX', '')
+    AUDIO_ACCEL_REDIRECT_PREFIX = os.getenv('AUDIO_ACCEL_REDIRECT_PREFIX', '')
+    # Apache/lighttpd mod_xsendfile offload (handled by Flask's send_file)
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+    
+    # Upload storage: 'local' (STORAGE_LOCAL_ROOT, default UPLOAD_FOLDER) or
+    # 's3' (any S3-compatible store - set S3_ENDPOINT_URL for MinIO/R2)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local').lower()
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', '')
+    STORAGE_URL_EXPIRES = int(os.getenv('STORAGE_URL_EXPIRES', '3600'))
+    S3_BUCKET = os.getenv('S3_BUCKET', 'swasthya-uploads')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '')
+    S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID', '')
+    S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY', '')
+    S3_REGION = os.getenv('S3_REGION', '')
 
 
 class DevelopmentConfig(Config):
@@ -1,20 +1,29 @@
 """
 Swasthya Cron Module
-Handles all scheduled tasks: medicine reminders, health alerts, weather alerts
+Handles all scheduled tasks: medicine reminders, health alerts, weather and earthquake alerts
 """
 
 from .scheduler import CronScheduler
+from .daemon import CronDaemon, DaemonAlreadyRunning
 from .medicine_reminders import MedicineReminderHandler
 from .health_alerts import HealthAlertHandler
 from .weather_alerts import WeatherAlertHandler
+from .earthquake_alerts import EarthquakeAlertHandler
 from .user_health_insights import UserHealthInsightsHandler
 from .general_health_tips import GeneralHealthTipsHandler
+from .document_analysis import DocumentAnalysisHandler
+from .notification_dispatch import NotificationDispatchHandler
 
 __all__ = [
     'CronScheduler',
+    'CronDaemon',
+    'DaemonAlreadyRunning',
     'MedicineReminderHandler',
     'HealthAlertHandler',
     'WeatherAlertHandler',
+    'EarthquakeAlertHandler',
     'UserHealthInsightsHandler',
-    'GeneralHealthTipsHandler'
+    'GeneralHealthTipsHandler',
+    'DocumentAnalysisHandler',
+    'NotificationDispatchHandler'
 ]
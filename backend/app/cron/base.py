@@ -6,6 +6,8 @@ Provides common functionality for all cron handlers
 from abc import ABC, abstractmethod
 from datetime import datetime
 import logging
+import os
+import time
 
 
 # Configure logging
@@ -16,22 +18,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger('swasthya_cron')
 
+# Default per-handler timeout when run from the scheduler
+DEFAULT_HANDLER_TIMEOUT = int(os.getenv('CRON_HANDLER_TIMEOUT', '300'))
+
 
 class BaseCronHandler(ABC):
     """Base class for all cron handlers"""
     
     name: str = "BaseHandler"
     
+    # Scheduling (see CronScheduler.run_all): handlers this one must run after
+    # (skipped if they fail), handlers it runs after whatever their outcome,
+    # priority among ready handlers (lower runs first) and timeout in seconds
+    depends_on: tuple = ()
+    runs_after: tuple = ()
+    priority: int = 100
+    timeout_seconds: int = DEFAULT_HANDLER_TIMEOUT
+    
+    # Run interval in --daemon mode (see CronDaemon)
+    interval_seconds: int = 3600
+    
     def __init__(self):
         self.logger = logger
         self.start_time = None
         self.end_time = None
-        self.results = {
-            'success': 0,
-            'failed': 0,
-            'skipped': 0,
-            'errors': []
-        }
+        self.lease = None
+        self.results = self._empty_results()
     
     def run(self, dry_run: bool = False) -> dict:
         """
@@ -44,12 +56,18 @@ class BaseCronHandler(ABC):
             Dict with execution results
         """
         self.start_time = datetime.utcnow()
-        self.results = {
-            'success': 0,
-            'failed': 0,
-            'skipped': 0,
-            'errors': []
-        }
+        cpu_start = time.thread_time()
+        self.results = self._empty_results()
+        
+        self.lease = None
+        if not dry_run and not self._acquire_lease():
+            self.logger.info(f"{self.name} is running elsewhere, skipping")
+            return {
+                'handler': self.name,
+                'start_time': self.start_time.isoformat(),
+                'locked': True,
+                **self.results
+            }
         
         self.logger.info(f"Starting {self.name}...")
         
@@ -58,9 +76,12 @@ class BaseCronHandler(ABC):
         except Exception as e:
             self.logger.error(f"{self.name} failed with error: {str(e)}")
             self.results['errors'].append(str(e))
+        finally:
+            self._release_lease()
         
         self.end_time = datetime.utcnow()
         duration = (self.end_time - self.start_time).total_seconds()
+        cpu_seconds = time.thread_time() - cpu_start
         
         self.logger.info(
             f"{self.name} completed in {duration:.2f}s - "
@@ -68,13 +89,65 @@ class BaseCronHandler(ABC):
             f"Skipped: {self.results['skipped']}"
         )
         
-        return {
+        result = {
             'handler': self.name,
             'start_time': self.start_time.isoformat(),
             'end_time': self.end_time.isoformat(),
+            'lease_token': self.lease.token if self.lease else None,
             'duration_seconds': duration,
+            'cpu_seconds': round(cpu_seconds, 3),
             **self.results
         }
+        self._record_run(result, dry_run)
+        return result
+    
+    def _empty_results(self) -> dict:
+        return {
+            'success': 0,
+            'failed': 0,
+            'skipped': 0,
+            'rows_scanned': 0,
+            'notifications_sent': 0,
+            'errors': []
+        }
+    
+    def _record_run(self, result: dict, dry_run: bool):
+        from .history import record_run
+        
+        try:
+            record_run(result, dry_run)
+        except Exception as e:
+            self.logger.warning(f"Could not record {self.name} run: {e}")
+    
+    def _acquire_lease(self) -> bool:
+        """Take this handler's cron lease; False if another process holds it"""
+        from .lease import CRON_LOCKS_ENABLED, CRON_LEASE_MARGIN_SECONDS, acquire_lease
+        
+        if not CRON_LOCKS_ENABLED:
+            return True
+        try:
+            self.lease = acquire_lease(self.name, self.timeout_seconds + CRON_LEASE_MARGIN_SECONDS)
+        except Exception as e:
+            # Lock table unavailable: keep cron working, unprotected
+            self.logger.warning(f"{self.name} running without a lease: {e}")
+            return True
+        return self.lease is not None
+    
+    def _release_lease(self):
+        if self.lease is None:
+            return
+        try:
+            self.lease.release()
+        except Exception as e:
+            self.logger.warning(f"Could not release {self.name} lease: {e}")
+    
+    def check_lease(self):
+        """
+        Call before each side effect (e.g. a push): renews the lease, or raises
+        LeaseLost if another process has taken over this handler
+        """
+        if self.lease is not None:
+            self.lease.check()
     
     @abstractmethod
     def execute(self, dry_run: bool = False):
@@ -98,6 +171,14 @@ class BaseCronHandler(ABC):
         if error:
             self.results['errors'].append(error)
     
+    def count_scanned(self, rows: int):
+        """Record rows examined by the sweep (for capacity metrics)"""
+        self.results['rows_scanned'] += rows
+    
+    def count_sent(self, notifications: int = 1):
+        """Record push notifications sent"""
+        self.results['notifications_sent'] += notifications
+    
     def log_skipped(self, message: str):
         """Log a skipped operation"""
         self.logger.debug(f"⏭️ {message}")
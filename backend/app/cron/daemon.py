@@ -0,0 +1,198 @@
+"""
+Cron Daemon
+Long-running alternative to spawning cron_runner.py every minute: the app is
+created once and each handler runs on its own interval_seconds.
+
+- Fire times are aligned to the wall clock (every minute at :00, every 30
+  minutes at :00/:30), so slow ticks never accumulate drift; runs missed while
+  a handler was still busy are skipped, not replayed
+- A handler never overlaps itself, and waits while a dependency is running
+- SIGINT/SIGTERM stop scheduling and wait for running handlers
+- A lock file keeps a second daemon on the same host from starting
+
+Usage: python cron_runner.py --daemon
+"""
+
+import os
+import math
+import time
+import signal
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .base import logger
+from .scheduler import CronScheduler
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+CRON_DAEMON_LOCK_FILE = os.getenv(
+    'CRON_DAEMON_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'swasthya_cron_daemon.lock')
+)
+
+# Seconds to wait for running handlers after a shutdown signal
+CRON_DAEMON_SHUTDOWN_GRACE = int(os.getenv('CRON_DAEMON_SHUTDOWN_GRACE', '60'))
+
+
+class DaemonAlreadyRunning(RuntimeError):
+    pass
+
+
+class DaemonLock:
+    """Exclusive, non-blocking lock file holding the daemon's PID"""
+
+    def __init__(self, path: str = None):
+        self.path = path or CRON_DAEMON_LOCK_FILE
+        self._fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif os.path.getsize(self.path) > 0:
+                raise OSError("lock file in use")
+        except OSError:
+            os.close(fd)
+            raise DaemonAlreadyRunning(f"Another cron daemon holds {self.path}")
+
+        # The kernel drops the flock if the process dies, so a stale file is harmless
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+
+    def release(self):
+        if self._fd is None:
+            return
+        os.ftruncate(self._fd, 0)
+        if FCNTL_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def next_fire_time(interval: int, now: float) -> float:
+    """Next wall-clock multiple of interval strictly after now"""
+    return (math.floor(now / interval) + 1) * interval
+
+
+class CronDaemon:
+    """Runs every handler on its own interval inside one process"""
+
+    def __init__(self, app, scheduler: CronScheduler = None, dry_run: bool = False, lock_path: str = None):
+        self.app = app
+        self.scheduler = scheduler or CronScheduler()
+        self.dry_run = dry_run
+        self.lock = DaemonLock(lock_path)
+        self.logger = logger
+        self.stop_event = threading.Event()
+        self.running = {}  # handler name -> (future, started_at)
+        self.next_run = {}
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            self.logger.info("Shutdown requested, finishing running handlers...")
+        self.stop_event.set()
+
+    def run(self):
+        """Block until stopped; raises DaemonAlreadyRunning if the lock is held"""
+        self.scheduler.validate_graph()
+
+        with self.lock:
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+            # One thread per handler: a handler never overlaps itself, so the
+            # reminders are never queued behind slow LLM-bound handlers
+            executor = ThreadPoolExecutor(max_workers=len(self.scheduler.handlers), thread_name_prefix='cron-daemon')
+            now = time.time()
+            # Start everything once on boot, then follow the aligned schedule
+            self.next_run = {name: now for name in self.scheduler.handlers}
+
+            self.logger.info(
+                f"Cron daemon started (pid {os.getpid()}): " +
+                ", ".join(f"{name} every {cls.interval_seconds}s" for name, cls in self.scheduler.handlers.items())
+            )
+            try:
+                while not self.stop_event.is_set():
+                    self.tick(executor)
+                    self.stop_event.wait(self._seconds_until_next())
+            finally:
+                self._shutdown(executor)
+
+    def tick(self, executor):
+        """Start every due handler that is not running and not blocked"""
+        self._reap()
+        now = time.time()
+        handlers = self.scheduler.handlers
+
+        due = sorted(
+            (name for name, at in self.next_run.items() if at <= now),
+            key=lambda name: handlers[name].priority
+        )
+        for name in due:
+            handler_class = handlers[name]
+            if name in self.running:
+                _, started_at = self.running[name]
+                if now - started_at > handler_class.timeout_seconds:
+                    self.logger.warning(f"{name} still running after {now - started_at:.0f}s (timeout "
+                                        f"{handler_class.timeout_seconds}s), skipping this run")
+                self._reschedule(name, now)
+                continue
+
+            blocking = [
+                dep for dep in handler_class.depends_on + handler_class.runs_after if dep in self.running
+            ]
+            if blocking:
+                # Stay due; starts on the tick after the dependency finishes
+                continue
+
+            lag = now - self.next_run[name]
+            if lag > handler_class.interval_seconds:
+                self.logger.warning(f"{name} is {lag:.0f}s late, skipping missed runs")
+
+            future = executor.submit(self.scheduler.run_in_context, self.app, name, self.dry_run)
+            self.running[name] = (future, now)
+            self._reschedule(name, now)
+
+    def _reschedule(self, name: str, now: float):
+        self.next_run[name] = next_fire_time(self.scheduler.handlers[name].interval_seconds, now)
+
+    def _reap(self):
+        for name, (future, _) in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[name]
+            try:
+                future.result()
+            except Exception as e:
+                self.logger.error(f"Handler {name} crashed: {e}")
+
+    def _seconds_until_next(self) -> float:
+        pending = [at for name, at in self.next_run.items() if name not in self.running]
+        if not pending:
+            return 1.0
+        # Poll at least every second so finished dependencies are noticed promptly
+        return min(1.0, max(0.0, min(pending) - time.time()))
+
+    def _shutdown(self, executor):
+        deadline = time.monotonic() + CRON_DAEMON_SHUTDOWN_GRACE
+        for name, (future, _) in list(self.running.items()):
+            remaining = deadline - time.monotonic()
+            try:
+                future.result(timeout=max(0, remaining))
+            except Exception as e:
+                self.logger.warning(f"{name} did not finish cleanly before shutdown: {e}")
+        executor.shutdown(wait=False)
+        self.logger.info("Cron daemon stopped")
@@ -0,0 +1,43 @@
+"""
+Document Analysis Cron Handler
+Drains the queued AI document analysis jobs created by uploads
+"""
+
+from .base import BaseCronHandler
+
+
+class DocumentAnalysisHandler(BaseCronHandler):
+    """
+    Processes pending DocumentAnalysisJob rows on a small thread pool
+    """
+
+    name = "DocumentAnalysisHandler"
+    priority = 30
+    timeout_seconds = 600
+    interval_seconds = 60
+
+    def execute(self, dry_run: bool = False):
+        """
+        Claim and run queued document analysis jobs
+        """
+        from flask import current_app
+        from app.models.medical_history import DocumentAnalysisJob
+        from app.utils.document_jobs import run_pending_jobs
+
+        if dry_run:
+            pending = DocumentAnalysisJob.query.filter_by(status='queued').count()
+            self.logger.info(f"[DRY RUN] {pending} document analysis jobs queued")
+            self.results['skipped'] += pending
+            return
+
+        counts = run_pending_jobs(current_app._get_current_object())
+
+        self.count_scanned(counts['claimed'])
+        self.results['success'] += counts['completed']
+        self.results['failed'] += counts['failed']
+        self.results['skipped'] += counts['retry']
+        if counts['claimed']:
+            self.logger.info(
+                f"Document analysis: {counts['completed']} completed, "
+                f"{counts['retry']} scheduled for retry, {counts['failed']} failed"
+            )
@@ -0,0 +1,121 @@
+"""
+Earthquake Alert Cron Handler
+Polls USGS for recent earthquakes and notifies users within the felt radius
+of each epicentre
+"""
+
+import os
+from datetime import datetime, timedelta
+from .base import BaseCronHandler
+from .lease import LeaseLost
+
+
+class EarthquakeAlertHandler(BaseCronHandler):
+    """Sends earthquake push notifications to users near the epicentre"""
+
+    name = "EarthquakeAlertHandler"
+    priority = 15
+    interval_seconds = 300
+
+    MIN_MAGNITUDE = float(os.getenv('EARTHQUAKE_ALERT_MIN_MAGNITUDE', '4.5'))
+    # USGS bounding box to poll (see earthquake_data.COUNTRY_BOUNDS)
+    COUNTRY = os.getenv('EARTHQUAKE_ALERT_COUNTRY', 'nepal')
+    # Older quakes are not worth a push
+    MAX_AGE_HOURS = int(os.getenv('EARTHQUAKE_ALERT_MAX_AGE_HOURS', '6'))
+    MAX_RADIUS_KM = float(os.getenv('EARTHQUAKE_ALERT_MAX_RADIUS_KM', '500'))
+    # A quake is polled for MAX_AGE_HOURS; keep its "alerted" marker well past that
+    DEDUP_TTL = timedelta(hours=max(24, 2 * MAX_AGE_HOURS))
+
+    @classmethod
+    def alert_radius_km(cls, magnitude: float) -> float:
+        """Dobrovolsky strain radius 10^(0.43 M) km: ~86 km at M4.5, ~380 km at M6"""
+        return min(cls.MAX_RADIUS_KM, 10 ** (0.43 * magnitude))
+
+    def execute(self, dry_run: bool = False):
+        """
+        Fetch recent earthquakes and queue alerts for nearby users
+        """
+        from app import db
+        from app.data_scripts.earthquake_data import get_earthquakes
+        from app.utils.alert_dedup import sent_keys, mark_sent
+        from app.utils.audience import iter_radius_audience_ids
+        from app.utils.notification_outbox import enqueue_notification
+
+        quakes = get_earthquakes(
+            country=self.COUNTRY,
+            min_magnitude=self.MIN_MAGNITUDE,
+            since=datetime.utcnow() - timedelta(hours=self.MAX_AGE_HOURS)
+        )
+        quakes = [
+            q for q in quakes
+            if q['coordinates'].get('latitude') is not None
+            and q['coordinates'].get('longitude') is not None
+        ]
+        self.count_scanned(len(quakes))
+        self.logger.info(f"Found {len(quakes)} recent earthquakes >= M{self.MIN_MAGNITUDE}")
+        alerted = sent_keys('earthquake', [quake['id'] for quake in quakes])
+
+        for quake in quakes:
+            try:
+                if quake['id'] in alerted:
+                    self.log_skipped(f"{quake['id']} M{quake['magnitude']}: already alerted")
+                    continue
+
+                magnitude = quake['magnitude']
+                radius_km = self.alert_radius_km(magnitude)
+                title = f"🌍 Earthquake M{magnitude:.1f}"
+                message = f"{quake.get('place') or 'Earthquake nearby'}"
+                if quake.get('safety_advisory'):
+                    message += f"\n{quake['safety_advisory'][0]}"
+
+                total_users = 0
+                for user_ids in iter_radius_audience_ids(
+                    quake['coordinates']['latitude'],
+                    quake['coordinates']['longitude'],
+                    radius_km
+                ):
+                    total_users += len(user_ids)
+                    if dry_run:
+                        continue
+                    self.check_lease()
+                    enqueue_notification(
+                        title=title,
+                        message=message,
+                        user_ids=user_ids,
+                        data={
+                            'type': 'earthquake_alert',
+                            'earthquake_id': quake['id'],
+                            'magnitude': str(magnitude),
+                            'severity': quake.get('severity'),
+                            'radius_km': str(round(radius_km))
+                        },
+                        url=quake.get('url'),
+                        source=self.name
+                    )
+                self.count_scanned(total_users)
+
+                if not total_users:
+                    self.log_skipped(f"{quake['id']} M{magnitude}: no users within {radius_km:.0f} km")
+                    continue
+
+                if dry_run:
+                    self.logger.info(
+                        f"[DRY RUN] Would alert {total_users} users within {radius_km:.0f} km "
+                        f"of {quake['id']} (M{magnitude})"
+                    )
+                    self.log_success(f"[DRY RUN] {quake['id']}")
+                else:
+                    # Marked once per quake, in the same commit as its outbox rows
+                    mark_sent('earthquake', [quake['id']], self.DEDUP_TTL)
+                    db.session.commit()
+
+                    self.count_sent(total_users)
+                    self.log_success(
+                        f"Queued M{magnitude} earthquake alert for {total_users} users within {radius_km:.0f} km"
+                    )
+
+            except LeaseLost:
+                raise
+            except Exception as e:
+                db.session.rollback()
+                self.log_failed(f"Error processing earthquake {quake.get('id')}", error=str(e))
@@ -8,6 +8,7 @@ import json
 import os
 import re
 from .base import BaseCronHandler
+from .lease import LeaseLost
 
 
 class GeneralHealthTipsHandler(BaseCronHandler):
@@ -16,10 +17,22 @@ class GeneralHealthTipsHandler(BaseCronHandler):
     """
     
     name = "GeneralHealthTipsHandler"
+    # LLM-bound; waits for insights so the two don't compete for provider quota
+    depends_on = ('user_health_insights',)
+    priority = 60
+    timeout_seconds = 600
+    interval_seconds = 3600
     
     # Maximum users to process per batch
     BATCH_SIZE = int(os.getenv('CRON_HEALTH_TIPS_BATCH', '500'))
     
+    # Attach a spoken version of the tip for low-literacy users
+    TIP_AUDIO_ENABLED = os.getenv('CRON_HEALTH_TIPS_AUDIO', 'true').lower() == 'true'
+    TIP_AUDIO_LANGUAGES = [
+        lang.strip() for lang in os.getenv('CRON_HEALTH_TIPS_AUDIO_LANGUAGES', 'en-US').split(',')
+        if lang.strip()
+    ]
+    
     # Categories of health tips to rotate through
     TIP_CATEGORIES = [
         'hydration',      # 0:00, 8:00, 16:00
@@ -38,7 +51,7 @@ class GeneralHealthTipsHandler(BaseCronHandler):
         """
         from app import db
         from app.models.user import User
-        from app.routes.notifications import send_onesignal_notification
+        from app.utils.notification_outbox import enqueue_notification
         
         # Get current hour to determine tip category
         current_hour = datetime.now().hour
@@ -59,32 +72,74 @@ class GeneralHealthTipsHandler(BaseCronHandler):
             self.log_success("[DRY RUN] Tip generated successfully")
             return
         
+        notification_data = {
+            'type': 'health_tip',
+            'category': category,
+            'tip_id': f"{datetime.now().strftime('%Y%m%d%H')}_{category}",
+            'action': 'open_tips'
+        }
+        notification_data.update(self._render_tip_audio(tip))
+        
         # Send to all users with push notifications enabled using segment
         # Using 'Subscribed Users' segment to send to all subscribed users
         try:
-            result = send_onesignal_notification(
+            self.check_lease()
+            rows = enqueue_notification(
                 title=tip['title'],
                 message=tip['message'],
                 segments=['Subscribed Users'],  # Send to all subscribed users
-                data={
-                    'type': 'health_tip',
-                    'category': category,
-                    'tip_id': f"{datetime.now().strftime('%Y%m%d%H')}_{category}",
-                    'action': 'open_tips'
-                }
+                data=notification_data,
+                source=self.name,
+                dedup_key=f"health_tip:{notification_data['tip_id']}"
             )
+            db.session.commit()
             
-            if 'id' in result or 'recipients' in result:
-                recipients = result.get('recipients', 'all')
-                self.log_success(f"Sent {category} tip to {recipients} users")
-                self.logger.info(f"OneSignal Response: {result}")
+            if rows:
+                self.count_sent()
+                self.log_success(f"Queued {category} tip for all subscribed users")
             else:
-                self.log_failed(
-                    f"Failed to send {category} tip",
-                    error=str(result.get('errors', result))
-                )
+                self.log_skipped(f"{category} tip {notification_data['tip_id']} already queued")
+        except LeaseLost:
+            raise
+        except Exception as e:
+            db.session.rollback()
+            self.log_failed(f"Error queueing notification", error=str(e))
+    
+    def _render_tip_audio(self, tip: dict) -> dict:
+        """
+        Render audio for the tip through the batch TTS cache
+        
+        Returns:
+            Notification data fields with audio URLs (empty if disabled/failed)
+        """
+        if not self.TIP_AUDIO_ENABLED or not self.TIP_AUDIO_LANGUAGES:
+            return {}
+        
+        from flask import current_app
+        from app.utils.tts_batch import render_tts_batch
+        
+        text = f"{tip['title']}. {tip['message']}"
+        try:
+            batch = render_tts_batch([
+                {'text': text, 'language': language} for language in self.TIP_AUDIO_LANGUAGES
+            ])
         except Exception as e:
-            self.log_failed(f"Error sending notification", error=str(e))
+            self.logger.warning(f"Tip audio rendering failed: {e}")
+            return {}
+        
+        base_url = current_app.config.get('PUBLIC_BASE_URL', '')
+        audio = {}
+        for result in batch['results']:
+            if result['status'] in ('rendered', 'cached', 'duplicate'):
+                audio[f"audio_url_{result['language']}"] = f"{base_url}{result['url']}"
+            else:
+                self.logger.warning(f"Tip audio ({result.get('language')}) failed: {result.get('message')}")
+        
+        # Default audio in the first configured language
+        first = f"audio_url_{self.TIP_AUDIO_LANGUAGES[0]}"
+        if first in audio:
+            audio['audio_url'] = audio[first]
+        return audio
     
     def _generate_health_tip(self, category: str, dry_run: bool = False) -> dict:
         """
@@ -6,12 +6,15 @@ Sends push notifications for new or updated health alerts in user regions
 from datetime import datetime, timedelta
 import os
 from .base import BaseCronHandler
+from .lease import LeaseLost
 
 
 class HealthAlertHandler(BaseCronHandler):
     """Handles sending health alert push notifications to affected regions"""
     
     name = "HealthAlertHandler"
+    priority = 10
+    interval_seconds = 1800
     
     # Only send alerts for high or critical severity
     ALERT_SEVERITY_THRESHOLD = ['high', 'critical']
@@ -25,8 +28,9 @@ class HealthAlertHandler(BaseCronHandler):
         """
         from app import db
         from app.models.health_alert import HealthAlert
-        from app.models.user import User
-        from app.routes.notifications import send_onesignal_notification
+        from app.utils.alert_dedup import sent_keys, mark_sent
+        from app.utils.audience import iter_audience_ids
+        from app.utils.notification_outbox import enqueue_notification
         
         # Get alerts updated in last check period or new alerts
         cutoff_time = datetime.utcnow() - timedelta(hours=self.ALERT_COOLDOWN_HOURS)
@@ -37,42 +41,20 @@ class HealthAlertHandler(BaseCronHandler):
             HealthAlert.severity.in_(self.ALERT_SEVERITY_THRESHOLD),
             HealthAlert.updated_at >= cutoff_time
         ).all()
+        self.count_scanned(len(alerts))
         
         self.logger.info(f"Found {len(alerts)} recent high-severity alerts")
         
+        # Each revision of an alert is announced once
+        already_sent = sent_keys('health_alert', [self._dedup_key(alert) for alert in alerts])
+        
         for alert in alerts:
             try:
-                # Find users in affected area
-                users_query = User.query.filter_by(
-                    is_active=True,
-                    notification_push=True
-                )
-                
-                # Filter by location
-                if alert.affected_city:
-                    users_query = users_query.filter(
-                        User.city.ilike(f'%{alert.affected_city}%')
-                    )
-                elif alert.affected_province:
-                    users_query = users_query.filter(
-                        User.province.ilike(f'%{alert.affected_province}%')
-                    )
-                else:
-                    # National alert - send to all users
-                    pass
-                
-                affected_users = users_query.all()
-                
-                if not affected_users:
-                    self.log_skipped(
-                        f"Alert {alert.id} ({alert.disease_name}) - no users in affected area"
-                    )
+                if self._dedup_key(alert) in already_sent:
+                    self.log_skipped(f"Alert {alert.id} ({alert.disease_name}) already sent")
                     continue
                 
-                self.logger.info(
-                    f"Alert {alert.id}: {len(affected_users)} users in "
-                    f"{alert.affected_city or alert.affected_province or 'Nepal'}"
-                )
+                location = alert.affected_city or alert.affected_province or 'Nepal'
                 
                 # Build notification
                 severity_emoji = {
@@ -89,21 +71,20 @@ class HealthAlertHandler(BaseCronHandler):
                     message += f"\n{alert.cases_count} cases reported"
                 if alert.trend == 'increasing':
                     message += " (increasing)"
-                
-                location = alert.affected_city or alert.affected_province or 'Nepal'
                 message += f"\nLocation: {location}"
                 
-                if dry_run:
-                    self.logger.info(
-                        f"[DRY RUN] Would send '{alert.disease_name}' alert to "
-                        f"{len(affected_users)} users"
-                    )
-                    self.log_success(f"[DRY RUN] Alert {alert.id}")
-                else:
-                    # Send to all affected users
-                    user_ids = [str(u.id) for u in affected_users]
-                    
-                    result = send_onesignal_notification(
+                # Stream the audience (national alert if no city/province)
+                # and queue one outbox row per provider-sized chunk
+                total_users = 0
+                for user_ids in iter_audience_ids(
+                    city=alert.affected_city,
+                    province=alert.affected_province
+                ):
+                    total_users += len(user_ids)
+                    if dry_run:
+                        continue
+                    self.check_lease()
+                    enqueue_notification(
                         title=title,
                         message=message,
                         user_ids=user_ids,
@@ -112,22 +93,46 @@ class HealthAlertHandler(BaseCronHandler):
                             'alert_id': str(alert.id),
                             'disease_name': alert.disease_name,
                             'severity': alert.severity
-                        }
+                        },
+                        source=self.name
+                    )
+                self.count_scanned(total_users)
+                
+                if not total_users:
+                    self.log_skipped(
+                        f"Alert {alert.id} ({alert.disease_name}) - no users in affected area"
+                    )
+                    continue
+                
+                if dry_run:
+                    self.logger.info(
+                        f"[DRY RUN] Would send '{alert.disease_name}' alert to "
+                        f"{total_users} users in {location}"
                     )
+                    self.log_success(f"[DRY RUN] Alert {alert.id}")
+                else:
+                    mark_sent(
+                        'health_alert',
+                        [self._dedup_key(alert)],
+                        timedelta(hours=self.ALERT_COOLDOWN_HOURS)
+                    )
+                    db.session.commit()
                     
-                    if 'id' in result or 'recipients' in result:
-                        recipients = result.get('recipients', len(user_ids))
-                        self.log_success(
-                            f"Sent {alert.disease_name} alert to {recipients} users"
-                        )
-                    else:
-                        self.log_failed(
-                            f"Failed to send alert {alert.id}",
-                            error=str(result.get('errors', result))
-                        )
+                    self.count_sent(total_users)
+                    self.log_success(
+                        f"Queued {alert.disease_name} alert for {total_users} users in {location}"
+                    )
             
+            except LeaseLost:
+                raise
             except Exception as e:
+                db.session.rollback()
                 self.log_failed(
                     f"Error processing alert {alert.id}",
                     error=str(e)
                 )
+    
+    @staticmethod
+    def _dedup_key(alert) -> str:
+        """alert_dedup key for one revision of an alert"""
+        return f"{alert.id}:{alert.updated_at.isoformat() if alert.updated_at else ''}"
@@ -0,0 +1,151 @@
+"""
+Cron Run History
+Every handler run is stored in cron_runs (shared by all workers and hosts,
+unlike the in-process last-run info) and summarized as p50/p95 durations per
+handler for capacity planning of the sweeps.
+"""
+
+import os
+import json
+import math
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, delete, select
+
+from .base import logger
+
+CRON_RUNS_RETENTION_DAYS = int(os.getenv('CRON_RUNS_RETENTION_DAYS', '90'))
+
+# Stored error messages per run
+MAX_STORED_ERRORS = 20
+
+_last_prune = {'at': 0.0}
+
+
+def record_run(result: dict, dry_run: bool = False):
+    """
+    Store a BaseCronHandler.run result
+
+    Uses its own connection so the row is written even if the handler left
+    its session in a failed state.
+    """
+    from app import db
+    from app.models.cron import CronRun
+
+    table = CronRun.__table__
+    errors = result.get('errors') or []
+    with db.engine.begin() as conn:
+        conn.execute(insert(table).values(
+            handler=result['handler'],
+            host=socket.gethostname()[:100],
+            started_at=datetime.fromisoformat(result['start_time']),
+            finished_at=datetime.fromisoformat(result['end_time']),
+            duration_seconds=result.get('duration_seconds', 0),
+            cpu_seconds=result.get('cpu_seconds'),
+            success=result.get('success', 0),
+            failed=result.get('failed', 0),
+            skipped=result.get('skipped', 0),
+            rows_scanned=result.get('rows_scanned', 0),
+            notifications_sent=result.get('notifications_sent', 0),
+            errors=json.dumps([str(e)[:500] for e in errors[:MAX_STORED_ERRORS]]) if errors else None,
+            dry_run=dry_run,
+            lease_token=result.get('lease_token')
+        ))
+    _prune_old_runs()
+
+
+def _prune_old_runs():
+    """Drop runs past retention, at most once an hour per process"""
+    from app import db
+    from app.models.cron import CronRun
+
+    if time.time() - _last_prune['at'] < 3600:
+        return
+    _last_prune['at'] = time.time()
+
+    table = CronRun.__table__
+    cutoff = datetime.utcnow() - timedelta(days=CRON_RUNS_RETENTION_DAYS)
+    with db.engine.begin() as conn:
+        deleted = conn.execute(delete(table).where(table.c.started_at < cutoff)).rowcount
+    if deleted:
+        logger.info(f"Pruned {deleted} cron runs older than {CRON_RUNS_RETENTION_DAYS} days")
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _summarize(rows: List[tuple]) -> dict:
+    durations = sorted(row[1] for row in rows)
+    return {
+        'runs': len(rows),
+        'p50_seconds': round(percentile(durations, 50), 3),
+        'p95_seconds': round(percentile(durations, 95), 3),
+        'max_seconds': round(durations[-1], 3),
+        'avg_rows_scanned': round(sum(row[2] for row in rows) / len(rows), 1),
+        'notifications_sent': sum(row[3] for row in rows),
+        'failed': sum(row[4] for row in rows),
+        'runs_with_errors': sum(1 for row in rows if row[6])
+    }
+
+
+def get_duration_stats(days: int = 7, bucket: str = 'day', handler: Optional[str] = None) -> Dict[str, dict]:
+    """
+    p50/p95 durations per handler, overall and per time bucket
+
+    Args:
+        days: Look-back window
+        bucket: 'hour' or 'day'
+        handler: Limit to one handler name
+
+    Returns:
+        Dict handler -> {runs, p50_seconds, p95_seconds, ..., series: [...]}
+    """
+    from app import db
+    from app.models.cron import CronRun
+
+    table = CronRun.__table__
+    since = datetime.utcnow() - timedelta(days=days)
+    query = select(
+        table.c.handler, table.c.duration_seconds, table.c.rows_scanned,
+        table.c.notifications_sent, table.c.failed, table.c.started_at, table.c.errors
+    ).where(table.c.started_at >= since, table.c.dry_run.is_(False))
+    if handler:
+        query = query.where(table.c.handler == handler)
+
+    with db.engine.connect() as conn:
+        rows = conn.execute(query).all()
+
+    bucket_format = '%Y-%m-%dT%H:00' if bucket == 'hour' else '%Y-%m-%d'
+    by_handler = defaultdict(list)
+    by_bucket = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        by_handler[row[0]].append(row)
+        by_bucket[row[0]][row[5].strftime(bucket_format)].append(row)
+
+    stats = {}
+    for name, handler_rows in by_handler.items():
+        stats[name] = _summarize(handler_rows)
+        stats[name]['series'] = [
+            {'bucket': key, **_summarize(bucket_rows)}
+            for key, bucket_rows in sorted(by_bucket[name].items())
+        ]
+    return stats
+
+
+def get_last_runs() -> Dict[str, dict]:
+    """Most recent run of each handler"""
+    from app import db
+    from app.models.cron import CronRun
+
+    latest_ids = db.session.query(db.func.max(CronRun.id)).group_by(CronRun.handler)
+    runs = CronRun.query.filter(CronRun.id.in_(latest_ids)).all()
+    return {run.handler: run.to_dict() for run in runs}
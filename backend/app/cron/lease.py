@@ -0,0 +1,134 @@
+"""
+Cron Handler Leases
+A row per handler in cron_locks, so only one process across all hosts runs a
+handler at a time - whether started by cron_runner.py, the daemon or the
+/api/cron routes.
+
+Every acquisition bumps the row's fencing token. Before a side effect (e.g.
+sending a push) a handler calls Lease.check(), which renews the lease only if
+its token is still current; a holder that stalled past expiry and was
+superseded gets LeaseLost instead of double-sending.
+
+Lease statements run on their own connection and commit immediately, so they
+never mix with the handler's session transaction.
+"""
+
+import os
+import time
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from .base import logger
+
+CRON_LOCKS_ENABLED = os.getenv('CRON_LOCKS_ENABLED', 'true').lower() == 'true'
+
+# Added to a handler's timeout to get its lease length
+CRON_LEASE_MARGIN_SECONDS = int(os.getenv('CRON_LEASE_MARGIN_SECONDS', '30'))
+
+# Lease.check() renews at most this often; in between, the last renewal
+# still guarantees nobody else can hold the lease
+CRON_LEASE_RENEW_SECONDS = float(os.getenv('CRON_LEASE_RENEW_SECONDS', '5'))
+
+
+class LeaseLost(RuntimeError):
+    """The lease expired and another process acquired it"""
+
+
+def get_owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class Lease:
+    """A held lease on one cron handler"""
+
+    def __init__(self, name: str, owner: str, token: int, ttl_seconds: int):
+        self.name = name
+        self.owner = owner
+        self.token = token
+        self.ttl_seconds = ttl_seconds
+        self.renewed_at = time.monotonic()
+
+    def check(self):
+        """
+        Renew the lease if this holder's fencing token is still current
+
+        Skips the round trip while the previous renewal is recent, so per-send
+        checks don't add a query per notification.
+
+        Raises:
+            LeaseLost: If the lease was taken over by another process
+        """
+        from app import db
+        from app.models.cron import CronLock
+
+        if time.monotonic() - self.renewed_at < min(CRON_LEASE_RENEW_SECONDS, self.ttl_seconds / 3):
+            return
+
+        table = CronLock.__table__
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.name == self.name, table.c.token == self.token, table.c.owner == self.owner)
+                .values(expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds))
+            )
+        if result.rowcount != 1:
+            raise LeaseLost(f"Lease on {self.name} (token {self.token}) was lost")
+        self.renewed_at = time.monotonic()
+
+    def release(self):
+        """Give the lease up early (no-op if it was already superseded)"""
+        from app import db
+        from app.models.cron import CronLock
+
+        table = CronLock.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == self.name, table.c.token == self.token)
+                .values(owner=None, expires_at=datetime.utcnow())
+            )
+
+
+def acquire_lease(name: str, ttl_seconds: int, owner: Optional[str] = None) -> Optional[Lease]:
+    """
+    Take the lease on a handler if it is free or expired
+
+    Returns:
+        Lease, or None if another process holds it
+    """
+    from app import db
+    from app.models.cron import CronLock
+
+    owner = owner or get_owner_id()
+    table = CronLock.__table__
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    with db.engine.begin() as conn:
+        # Conditional UPDATE: at most one contender wins an expired lease
+        result = conn.execute(
+            update(table)
+            .where(table.c.name == name, table.c.expires_at < now)
+            .values(owner=owner, token=table.c.token + 1, acquired_at=now, expires_at=expires_at)
+        )
+        if result.rowcount == 1:
+            token = conn.execute(select(table.c.token).where(table.c.name == name)).scalar()
+            return Lease(name, owner, token, ttl_seconds)
+
+    # First run ever: create the row; a concurrent insert loses on the primary key
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(table).values(
+                name=name, owner=owner, token=1, acquired_at=now, expires_at=expires_at
+            ))
+        return Lease(name, owner, 1, ttl_seconds)
+    except IntegrityError:
+        with db.engine.connect() as conn:
+            holder = conn.execute(select(table.c.owner).where(table.c.name == name)).scalar()
+        logger.info(f"{name} is already running on {holder}")
+        return None
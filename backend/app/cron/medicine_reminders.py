@@ -3,203 +3,242 @@ Medicine Reminder Cron Handler
 Sends push notifications for scheduled medicine reminders via OneSignal
 """
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
-import pytz
 import os
+from sqlalchemy import insert, select, update, bindparam
 from .base import BaseCronHandler
+from .lease import LeaseLost
 
 
 class MedicineReminderHandler(BaseCronHandler):
     """Handles sending medicine reminder push notifications"""
     
     name = "MedicineReminderHandler"
+    # Time-critical: first in line, must finish within the minute
+    priority = 0
+    timeout_seconds = 55
+    interval_seconds = 60
     
-    # Time window in minutes - reminders within this window of current time will be sent
+    # Slots overdue by more than this many minutes (e.g. after an outage) are
+    # rescheduled without sending
     REMINDER_WINDOW_MINUTES = int(os.getenv('CRON_MEDICINE_WINDOW_MINUTES', '5'))
     
-    def __init__(self):
-        super().__init__()
-        # Nepal timezone - adjust as needed
-        self.timezone = pytz.timezone('Asia/Kathmandu')
-    
     def execute(self, dry_run: bool = False):
         """
-        Check all active reminders and send notifications for those due now
+        Send notifications for reminder slots due now
+        
+        Every slot carries its next occurrence in UTC (computed from the
+        user's timezone), so the due slots are one range scan on
+        next_fire_at. Advancing the due slots to their following occurrence,
+        queueing the pushes in the notification outbox and writing the
+        reminder logs is one transaction: a dose is either queued exactly
+        once or left due for the next tick. Delivery happens in the outbox
+        dispatcher.
         """
         from app import db
-        from app.models.reminder import MedicineReminder, ReminderLog
+        from app.models.reminder import MedicineReminder, ReminderScheduleSlot
         from app.models.user import User
-        from app.routes.notifications import send_onesignal_notification
-        
-        now = datetime.now(self.timezone)
-        current_time = now.strftime('%H:%M')
-        current_hour = now.hour
-        current_minute = now.minute
-        
-        self.logger.info(f"Checking reminders for {current_time} (window: ±{self.REMINDER_WINDOW_MINUTES} min)")
-        
-        # Get all active reminders
-        active_reminders = MedicineReminder.query.filter_by(is_active=True).all()
-        
-        self.logger.info(f"Found {len(active_reminders)} active reminders")
-        
-        for reminder in active_reminders:
-            try:
-                # Check if reminder times match current time window
-                reminder_times = reminder.reminder_times or []
-                
-                if not reminder_times:
-                    self.log_skipped(f"Reminder {reminder.id} has no times")
-                    continue
-                
-                # Check each reminder time
-                for time_str in reminder_times:
-                    if self._is_time_due(time_str, current_hour, current_minute):
-                        # Check if already sent recently (within last hour)
-                        if self._was_recently_sent(reminder.id, time_str):
-                            self.log_skipped(
-                                f"Reminder {reminder.id} ({reminder.medicine_name}) at {time_str} "
-                                "already sent recently"
-                            )
-                            continue
-                        
-                        # Send notification
-                        if dry_run:
-                            self.logger.info(
-                                f"[DRY RUN] Would send: {reminder.medicine_name} to user {reminder.user_id}"
-                            )
-                            self.log_success(f"[DRY RUN] Reminder {reminder.id} at {time_str}")
-                        else:
-                            # Get user info
-                            user = User.query.get(reminder.user_id)
-                            if not user:
-                                self.log_failed(f"User {reminder.user_id} not found")
-                                continue
-                            
-                            # Build notification message
-                            message = f"Time to take {reminder.medicine_name}"
-                            if reminder.strength:
-                                message += f" ({reminder.strength} {reminder.unit or ''})"
-                            if reminder.instructions:
-                                message += f"\n{reminder.instructions}"
-                            
-                            # Send via OneSignal
-                            result = send_onesignal_notification(
-                                title='💊 Medicine Reminder',
-                                message=message,
-                                user_ids=[str(reminder.user_id)],
-                                data={
-                                    'type': 'medicine_reminder',
-                                    'reminder_id': str(reminder.id),
-                                    'medicine_name': reminder.medicine_name,
-                                    'scheduled_time': time_str
-                                }
-                            )
-                            
-                            if 'id' in result or 'recipients' in result:
-                                self.log_success(
-                                    f"Sent reminder for {reminder.medicine_name} to user {reminder.user_id}"
-                                )
-                                # Log the sent reminder
-                                self._log_reminder_sent(reminder.id, time_str)
-                            else:
-                                self.log_failed(
-                                    f"Failed to send reminder {reminder.id}",
-                                    error=str(result.get('errors', result))
-                                )
-            
-            except Exception as e:
-                self.log_failed(
-                    f"Error processing reminder {reminder.id}",
-                    error=str(e)
+        
+        now = datetime.utcnow()
+        
+        due = db.session.query(ReminderScheduleSlot, MedicineReminder, User).join(
+            MedicineReminder, MedicineReminder.id == ReminderScheduleSlot.reminder_id
+        ).outerjoin(
+            User, User.id == MedicineReminder.user_id
+        ).filter(
+            ReminderScheduleSlot.next_fire_at <= now
+        ).all()
+        self.count_scanned(len(due))
+        
+        self.logger.info(f"Found {len(due)} due reminder slots at {now.strftime('%H:%M')} UTC")
+        if not due:
+            return
+        
+        if dry_run:
+            self._report_dry_run(due, now)
+            return
+        
+        self.check_lease()
+        try:
+            self._queue_due(self._advance_slots(due, now), now)
+            db.session.commit()
+        except LeaseLost:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            self.log_failed(f"Failed to queue {len(due)} due reminder slots", error=str(e))
+            return
+        self._report_queued()
+    
+    def _report_dry_run(self, due: list, now: datetime):
+        """Log what a live sweep would queue"""
+        late_cutoff = now - timedelta(minutes=self.REMINDER_WINDOW_MINUTES)
+        for slot, reminder, user in due:
+            fire_at = slot.next_fire_at
+            if fire_at < late_cutoff:
+                self.log_skipped(
+                    f"Reminder {reminder.id} ({reminder.medicine_name}) at {slot.time_str} "
+                    f"missed by {int((now - fire_at).total_seconds() // 60)} min"
                 )
+                continue
+            self.logger.info(
+                f"[DRY RUN] Would send: {reminder.medicine_name} to user {reminder.user_id}"
+            )
+            self.log_success(f"[DRY RUN] Reminder {reminder.id} at {slot.time_str}")
     
-    def _is_time_due(self, time_str: str, current_hour: int, current_minute: int) -> bool:
+    def _queue_due(self, due: list, now: datetime):
         """
-        Check if a reminder time is within the current window
+        Queue pushes and reminder logs for the advanced slots (the caller commits)
         
         Args:
-            time_str: Time string in HH:MM format
-            current_hour: Current hour
-            current_minute: Current minute
-            
-        Returns:
-            True if the time is within the reminder window
+            due: (slot, reminder, user, fire_at) from _advance_slots
         """
-        try:
-            parts = time_str.split(':')
-            reminder_hour = int(parts[0])
-            reminder_minute = int(parts[1])
-            
-            # Calculate minutes from midnight for both times
-            current_total = current_hour * 60 + current_minute
-            reminder_total = reminder_hour * 60 + reminder_minute
-            
-            # Check if within window
-            diff = abs(current_total - reminder_total)
-            
-            # Handle midnight crossing
-            if diff > 720:  # More than 12 hours
-                diff = 1440 - diff
+        from app import db
+        from app.models.reminder import ReminderLog
+        from app.utils.push import PushDispatcher
+        
+        late_cutoff = now - timedelta(minutes=self.REMINDER_WINDOW_MINUTES)
+        self._queued = []
+        
+        # A user's reminders due in the same minute become one push
+        doses = OrderedDict()
+        for slot, reminder, user, fire_at in due:
+            if fire_at < late_cutoff:
+                self.log_skipped(
+                    f"Reminder {reminder.id} ({reminder.medicine_name}) at {slot.time_str} "
+                    f"missed by {int((now - fire_at).total_seconds() // 60)} min"
+                )
+                continue
             
-            return diff <= self.REMINDER_WINDOW_MINUTES
+            if not user:
+                self.log_failed(f"User {reminder.user_id} not found")
+                continue
             
-        except (ValueError, IndexError):
-            self.logger.warning(f"Invalid time format: {time_str}")
-            return False
+            doses.setdefault((reminder.user_id, fire_at), []).append((slot, reminder))
+        
+        if not doses:
+            return
+        
+        dispatcher = PushDispatcher()
+        for (user_id, fire_at), entries in doses.items():
+            title, message, data = self._build_notification(entries)
+            dispatcher.add(user_id, title, message, data, tag=(fire_at, entries))
+        
+        self.logger.info(f"Queueing {len(doses)} reminder pushes as {len(dispatcher)} notifications")
+        
+        # Pushes with identical payloads share one outbox row
+        self.check_lease()
+        logs = []
+        for group in dispatcher.enqueue(source=self.name):
+            for fire_at, entries in group['tags']:
+                self._queued.append((
+                    ', '.join(reminder.medicine_name for _, reminder in entries),
+                    entries[0][1].user_id
+                ))
+                logs.extend(
+                    {'reminder_id': reminder.id, 'scheduled_time': fire_at}
+                    for _, reminder in entries
+                )
+        if logs:
+            db.session.execute(insert(ReminderLog), logs)
     
-    def _was_recently_sent(self, reminder_id: int, time_str: str) -> bool:
+    def _report_queued(self):
+        """Count the pushes queued by _queue_due once they are committed"""
+        for names, user_id in self._queued:
+            self.count_sent()
+            self.log_success(f"Queued reminder for {names} to user {user_id}")
+    
+    def _build_notification(self, entries: list) -> tuple:
         """
-        Check if this reminder was already sent within the last hour
+        Title, message and data for one user's doses due in the same minute
         
         Args:
-            reminder_id: Reminder ID
-            time_str: Time string
-            
-        Returns:
-            True if reminder was sent recently
+            entries: (slot, reminder) pairs
         """
-        from app import db
-        from app.models.reminder import ReminderLog
-        
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        def dose(reminder):
+            text = reminder.medicine_name
+            if reminder.strength:
+                text += f" ({reminder.strength} {reminder.unit or ''})"
+            return text
         
-        # Check for existing log entry
-        recent_log = ReminderLog.query.filter(
-            ReminderLog.reminder_id == reminder_id,
-            ReminderLog.scheduled_time >= one_hour_ago
-        ).first()
+        slot, first = entries[0]
+        if len(entries) == 1:
+            message = f"Time to take {dose(first)}"
+            if first.instructions:
+                message += f"\n{first.instructions}"
+        else:
+            lines = []
+            for _, reminder in entries:
+                line = f"• {dose(reminder)}"
+                if reminder.instructions:
+                    line += f" - {reminder.instructions}"
+                lines.append(line)
+            message = "Time to take your medicines:\n" + "\n".join(lines)
         
-        return recent_log is not None
+        data = {
+            'type': 'medicine_reminder',
+            'reminder_id': str(first.id),
+            'medicine_name': first.medicine_name,
+            'scheduled_time': slot.time_str
+        }
+        if len(entries) > 1:
+            data['reminder_ids'] = ','.join(str(reminder.id) for _, reminder in entries)
+            data['medicine_name'] = ', '.join(reminder.medicine_name for _, reminder in entries)
+        return '💊 Medicine Reminder', message, data
     
-    def _log_reminder_sent(self, reminder_id: int, time_str: str):
+    def _advance_slots(self, due: list, now: datetime) -> list:
         """
-        Log that a reminder was sent
+        Move due slots to their next occurrence, in the session's transaction
         
-        Args:
-            reminder_id: Reminder ID
-            time_str: Scheduled time
+        The slots are re-read with row locks and only those whose
+        next_fire_at is still the value we read are advanced, so a reminder
+        edited (or a slot claimed by another sweep) mid-sweep keeps its new
+        schedule and is not sent here. The guarded bulk UPDATE's rowcount
+        must then match; if not, the sweep fails and its whole transaction
+        rolls back, leaving the slots due for the next run.
+        
+        Returns:
+            (slot, reminder, user, fire_at) for the slots this sweep advanced
         """
         from app import db
-        from app.models.reminder import ReminderLog
+        from app.models.reminder import ReminderScheduleSlot
         
-        try:
-            # Parse time and combine with today's date
-            now = datetime.now(self.timezone)
-            parts = time_str.split(':')
-            scheduled_dt = now.replace(
-                hour=int(parts[0]),
-                minute=int(parts[1]),
-                second=0,
-                microsecond=0
-            )
-            
-            log = ReminderLog(
-                reminder_id=reminder_id,
-                scheduled_time=scheduled_dt.astimezone(pytz.UTC).replace(tzinfo=None)
-            )
-            db.session.add(log)
-            db.session.commit()
-        except Exception as e:
-            self.logger.error(f"Failed to log reminder: {e}")
-            db.session.rollback()
+        table = ReminderScheduleSlot.__table__
+        statement = update(table).where(
+            table.c.id == bindparam('slot_id'),
+            table.c.next_fire_at == bindparam('old_fire')
+        ).values(next_fire_at=bindparam('new_fire'))
+        
+        advanced = []
+        params = []
+        for slot, reminder, user in due:
+            fire_at = slot.next_fire_at
+            tz_name = user.timezone if user else None
+            next_fire = slot.compute_next_fire(reminder, tz_name, now) if user else None
+            params.append({'slot_id': slot.id, 'old_fire': fire_at, 'new_fire': next_fire})
+            advanced.append((slot, reminder, user, fire_at))
+        
+        current = dict(db.session.execute(
+            select(table.c.id, table.c.next_fire_at).where(
+                table.c.id.in_([row['slot_id'] for row in params])
+            ).with_for_update()
+        ).all())
+        
+        claimed = []
+        claimed_params = []
+        for entry, row_params in zip(advanced, params):
+            if current.get(row_params['slot_id']) == row_params['old_fire']:
+                claimed.append(entry)
+                claimed_params.append(row_params)
+            else:
+                self.log_skipped(f"Reminder slot {row_params['slot_id']} changed during the sweep")
+        
+        if claimed_params:
+            updated = db.session.execute(statement, claimed_params).rowcount
+            if db.engine.dialect.supports_sane_multi_rowcount and updated != len(claimed_params):
+                raise RuntimeError(
+                    f"{len(claimed_params) - updated} reminder slots changed while being advanced"
+                )
+        return claimed
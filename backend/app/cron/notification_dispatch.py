@@ -0,0 +1,50 @@
+"""
+Notification Dispatch Cron Handler
+Drains the push notification outbox filled by the other handlers and routes
+"""
+
+from .base import BaseCronHandler
+
+
+class NotificationDispatchHandler(BaseCronHandler):
+    """
+    Sends queued NotificationOutbox rows on a rate-limited thread pool
+    """
+
+    name = "NotificationDispatchHandler"
+    # Starts once the reminder sweep has committed so queued doses go out the
+    # same minute; runs_after (not depends_on) so a failed sweep does not hold
+    # back pushes queued by other handlers. Anything else queued while this
+    # runs is picked up on the next tick
+    runs_after = ('medicine_reminders',)
+    priority = 5
+    timeout_seconds = 55
+    interval_seconds = 60
+
+    def execute(self, dry_run: bool = False):
+        """
+        Claim and send queued notifications
+        """
+        from flask import current_app
+        from app.models.notification import NotificationOutbox
+        from app.utils.notification_outbox import run_pending_notifications
+
+        if dry_run:
+            pending = NotificationOutbox.query.filter_by(status='queued').count()
+            self.logger.info(f"[DRY RUN] {pending} notifications queued")
+            self.results['skipped'] += pending
+            return
+
+        self.check_lease()
+        counts = run_pending_notifications(current_app._get_current_object())
+
+        self.count_scanned(counts['claimed'])
+        self.count_sent(counts['recipients'])
+        self.results['success'] += counts['sent']
+        self.results['failed'] += counts['failed']
+        self.results['skipped'] += counts['retry']
+        if counts['claimed']:
+            self.logger.info(
+                f"Notification outbox: {counts['sent']} sent, "
+                f"{counts['retry']} scheduled for retry, {counts['failed']} failed"
+            )
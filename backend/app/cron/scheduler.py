@@ -1,15 +1,27 @@
 """
 Cron Scheduler
-Coordinates all cron handlers and runs them in sequence
+Coordinates all cron handlers and runs them as a dependency graph on a thread
+pool: ready handlers start in priority order (medicine reminders first), each
+in its own app context, so one slow LLM-bound handler never delays the others.
 """
 
+import os
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from .base import logger
 from .medicine_reminders import MedicineReminderHandler
 from .health_alerts import HealthAlertHandler
 from .weather_alerts import WeatherAlertHandler
+from .earthquake_alerts import EarthquakeAlertHandler
 from .user_health_insights import UserHealthInsightsHandler
 from .general_health_tips import GeneralHealthTipsHandler
+from .document_analysis import DocumentAnalysisHandler
+from .notification_dispatch import NotificationDispatchHandler
+
+# Handlers running at the same time
+CRON_MAX_WORKERS = int(os.getenv('CRON_MAX_WORKERS', '4'))
 
 
 class CronScheduler:
@@ -21,71 +33,200 @@ class CronScheduler:
             'medicine_reminders': MedicineReminderHandler,
             'health_alerts': HealthAlertHandler,
             'weather_alerts': WeatherAlertHandler,
+            'earthquake_alerts': EarthquakeAlertHandler,
             'user_health_insights': UserHealthInsightsHandler,
             'general_health_tips': GeneralHealthTipsHandler,
+            'document_analysis': DocumentAnalysisHandler,
+            'notification_dispatch': NotificationDispatchHandler,
         }
     
-    def run_all(self, dry_run: bool = False) -> dict:
+    def validate_graph(self) -> list:
+        """
+        Check handler dependencies and return a topological order
+        
+        Raises:
+            ValueError: On unknown dependencies or cycles
+        """
+        order = []
+        state = {}  # name -> 'visiting' | 'done'
+        
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cron handler dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            handler_class = self.handlers[name]
+            for dep in handler_class.depends_on + handler_class.runs_after:
+                if dep not in self.handlers:
+                    raise ValueError(f"Cron handler {name} depends on unknown handler {dep}")
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+        
+        for name in sorted(self.handlers, key=lambda n: self.handlers[n].priority):
+            visit(name, [])
+        return order
+    
+    def run_all(self, dry_run: bool = False, max_workers: int = None) -> dict:
         """
         Run all cron handlers
         
+        Handlers whose dependencies have finished run in parallel (up to
+        max_workers), highest priority first. A handler that exceeds its
+        timeout is reported as timed out and its dependents are skipped
+        (runs_after handlers still run); its thread cannot be killed and is
+        left to finish in the background.
+        
         Args:
             dry_run: If True, simulate without sending notifications
+            max_workers: Concurrent handlers (default CRON_MAX_WORKERS)
             
         Returns:
             Dict with results from all handlers
         """
+        self.validate_graph()
+        max_workers = max(1, max_workers or CRON_MAX_WORKERS)
+        app = self._get_app()
+        
         start_time = datetime.utcnow()
+        wall_start = time.perf_counter()
         results = {
             'start_time': start_time.isoformat(),
             'dry_run': dry_run,
+            'max_workers': max_workers,
+            'execution_order': [],
             'handlers': {}
         }
         
         self.logger.info("=" * 50)
         self.logger.info("Starting Swasthya Cron Scheduler")
-        self.logger.info(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+        self.logger.info(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}, workers: {max_workers}")
         self.logger.info("=" * 50)
         
-        for name, handler_class in self.handlers.items():
-            try:
-                handler = handler_class()
-                result = handler.run(dry_run=dry_run)
-                results['handlers'][name] = result
-            except Exception as e:
-                self.logger.error(f"Handler {name} crashed: {e}")
-                results['handlers'][name] = {
-                    'handler': name,
-                    'error': str(e),
-                    'success': 0,
-                    'failed': 0,
-                    'skipped': 0
-                }
+        pending = {name: set(cls.depends_on) | set(cls.runs_after) for name, cls in self.handlers.items()}
+        ready = []
+        running = {}  # future -> (name, deadline)
+        
+        def release_ready():
+            for name, deps in list(pending.items()):
+                if not deps:
+                    del pending[name]
+                    heapq.heappush(ready, (self.handlers[name].priority, name))
+        
+        def finish(name, result, ok):
+            results['handlers'][name] = result
+            for dep_name, deps in list(pending.items()):
+                if name not in deps:
+                    continue
+                if ok or name not in self.handlers[dep_name].depends_on:
+                    deps.discard(name)
+                else:
+                    # Dependent of a crashed / timed out handler: skip it and its dependents
+                    del pending[dep_name]
+                    self.logger.warning(f"Skipping {dep_name}: dependency {name} did not complete")
+                    finish(dep_name, self._error_result(dep_name, f"Skipped: dependency {name} did not complete"), False)
+        
+        # Timed out threads keep their pool slot, so size the pool for every
+        # handler and enforce max_workers on live handlers ourselves
+        executor = ThreadPoolExecutor(max_workers=len(self.handlers), thread_name_prefix='cron')
+        try:
+            release_ready()
+            while ready or running:
+                while ready and len(running) < max_workers:
+                    _, name = heapq.heappop(ready)
+                    timeout = self.handlers[name].timeout_seconds
+                    future = executor.submit(self.run_in_context, app, name, dry_run)
+                    running[future] = (name, time.monotonic() + timeout if timeout else None)
+                    results['execution_order'].append(name)
+                
+                deadlines = [d for _, d in running.values() if d is not None]
+                wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name, _ = running.pop(future)
+                    try:
+                        result = future.result()
+                        ok = not result.get('error')
+                    except Exception as e:
+                        self.logger.error(f"Handler {name} crashed: {e}")
+                        result, ok = self._error_result(name, str(e)), False
+                    finish(name, result, ok)
+                
+                now = time.monotonic()
+                for future, (name, deadline) in list(running.items()):
+                    if deadline is not None and now >= deadline and not future.done():
+                        running.pop(future)
+                        timeout = self.handlers[name].timeout_seconds
+                        self.logger.error(f"Handler {name} timed out after {timeout}s")
+                        result = self._error_result(name, f"Timed out after {timeout}s")
+                        result['timed_out'] = True
+                        result['duration_seconds'] = timeout
+                        finish(name, result, False)
+                
+                release_ready()
+        finally:
+            executor.shutdown(wait=False)
         
         end_time = datetime.utcnow()
+        wall_seconds = time.perf_counter() - wall_start
         results['end_time'] = end_time.isoformat()
-        results['total_duration_seconds'] = (end_time - start_time).total_seconds()
+        results['total_duration_seconds'] = wall_seconds
         
         # Calculate totals
-        total_success = sum(h.get('success', 0) for h in results['handlers'].values())
-        total_failed = sum(h.get('failed', 0) for h in results['handlers'].values())
-        total_skipped = sum(h.get('skipped', 0) for h in results['handlers'].values())
+        handler_results = results['handlers'].values()
+        total_success = sum(h.get('success', 0) for h in handler_results)
+        total_failed = sum(h.get('failed', 0) for h in handler_results)
+        total_skipped = sum(h.get('skipped', 0) for h in handler_results)
+        handler_seconds = sum(h.get('duration_seconds', 0) for h in handler_results)
+        cpu_seconds = sum(h.get('cpu_seconds', 0) for h in handler_results)
         
         results['totals'] = {
             'success': total_success,
             'failed': total_failed,
             'skipped': total_skipped
         }
+        # Handler time vs wall clock shows the gain from parallelism; low CPU
+        # vs wall clock means handlers are waiting on I/O (LLM, OneSignal, DB)
+        results['timing'] = {
+            'wall_clock_seconds': round(wall_seconds, 3),
+            'handler_seconds': round(handler_seconds, 3),
+            'cpu_seconds': round(cpu_seconds, 3),
+            'parallel_speedup': round(handler_seconds / wall_seconds, 2) if wall_seconds else None
+        }
         
         self.logger.info("=" * 50)
         self.logger.info(
-            f"Cron completed in {results['total_duration_seconds']:.2f}s - "
+            f"Cron completed in {wall_seconds:.2f}s (handlers {handler_seconds:.2f}s, CPU {cpu_seconds:.2f}s) - "
             f"Success: {total_success}, Failed: {total_failed}, Skipped: {total_skipped}"
         )
         self.logger.info("=" * 50)
         
         return results
     
+    def _get_app(self):
+        """The Flask app to push a context for in worker threads (if any)"""
+        from flask import current_app, has_app_context
+        return current_app._get_current_object() if has_app_context() else None
+    
+    def run_in_context(self, app, name: str, dry_run: bool) -> dict:
+        """Run one handler in its own app context (and DB session)"""
+        handler = self.handlers[name]()
+        if app is None:
+            return handler.run(dry_run=dry_run)
+        with app.app_context():
+            return handler.run(dry_run=dry_run)
+    
+    def _error_result(self, name: str, error: str) -> dict:
+        return {
+            'handler': name,
+            'error': error,
+            'success': 0,
+            'failed': 0,
+            'skipped': 0
+        }
+    
     def run_handler(self, handler_name: str, dry_run: bool = False) -> dict:
         """
         Run a specific handler
@@ -9,6 +9,7 @@ import json
 import os
 import re
 from .base import BaseCronHandler
+from .lease import LeaseLost
 
 
 class UserHealthInsightsHandler(BaseCronHandler):
@@ -17,6 +18,10 @@ class UserHealthInsightsHandler(BaseCronHandler):
     """
     
     name = "UserHealthInsightsHandler"
+    # LLM-bound
+    priority = 50
+    timeout_seconds = 600
+    interval_seconds = 3600
     
     # Only send insights once per day (24 hours)
     INSIGHT_COOLDOWN_HOURS = int(os.getenv('CRON_HEALTH_INSIGHT_HOURS', '24'))
@@ -34,23 +39,22 @@ class UserHealthInsightsHandler(BaseCronHandler):
             MedicalRecord, MedicalCondition, MedicalAllergy, 
             MedicalMedication, MedicalSurgery, MedicalVaccination
         )
-        from app.routes.notifications import send_onesignal_notification
+        from app.utils.alert_dedup import not_sent_clause, mark_sent
+        from app.utils.notification_outbox import enqueue_notification
         
-        # Get users who have push notifications enabled
+        # Get users who have push notifications enabled and haven't had an
+        # insight within the cooldown
         users = User.query.filter(
             User.is_active == True,
-            User.notification_push == True
+            User.notification_push == True,
+            not_sent_clause('health_insight', db.cast(User.id, db.String))
         ).limit(self.MAX_USERS_PER_RUN).all()
+        self.count_scanned(len(users))
         
         self.logger.info(f"Processing health insights for {len(users)} users")
         
         for user in users:
             try:
-                # Check if we already sent insight today
-                if self._was_insight_sent_today(user.id):
-                    self.log_skipped(f"User {user.id} already received insight today")
-                    continue
-                
                 # Get user's medical data
                 medical_data = self._get_user_medical_data(user)
                 
@@ -73,7 +77,8 @@ class UserHealthInsightsHandler(BaseCronHandler):
                     self.log_success(f"[DRY RUN] User {user.id}")
                 else:
                     # Send push notification
-                    result = send_onesignal_notification(
+                    self.check_lease()
+                    enqueue_notification(
                         title=insight['title'],
                         message=insight['message'],
                         user_ids=[str(user.id)],
@@ -82,19 +87,19 @@ class UserHealthInsightsHandler(BaseCronHandler):
                             'user_id': str(user.id),
                             'insight_type': insight.get('type', 'general'),
                             'action': insight.get('action', 'open_health')
-                        }
+                        },
+                        source=self.name
                     )
+                    mark_sent('health_insight', [user.id], timedelta(hours=self.INSIGHT_COOLDOWN_HOURS))
+                    db.session.commit()
                     
-                    if 'id' in result or 'recipients' in result:
-                        self.log_success(f"Sent health insight to {user.full_name}")
-                        self._mark_insight_sent(user.id)
-                    else:
-                        self.log_failed(
-                            f"Failed to send insight to user {user.id}",
-                            error=str(result.get('errors', result))
-                        )
+                    self.count_sent()
+                    self.log_success(f"Queued health insight for {user.full_name}")
             
+            except LeaseLost:
+                raise
             except Exception as e:
+                db.session.rollback()
                 self.log_failed(f"Error processing user {user.id}", error=str(e))
     
     def _get_user_medical_data(self, user) -> dict:
@@ -323,30 +328,3 @@ OUTPUT ONLY THE JSON, NO OTHER TEXT."""
         except Exception as e:
             self.logger.error(f"AI call failed: {e}")
             return None
-    
-    def _was_insight_sent_today(self, user_id: int) -> bool:
-        """Check if insight was already sent to user within cooldown period"""
-        from app import db
-        from app.models.reminder import ReminderLog
-        
-        # Use reminder log with special reminder_id = -1 for health insights
-        # Or we could create a separate table for insight logs
-        cutoff = datetime.utcnow() - timedelta(hours=self.INSIGHT_COOLDOWN_HOURS)
-        
-        # Check if we have a log entry for health insight
-        # For simplicity, we'll use an in-memory cache for now
-        # In production, you'd want to use a database table
-        cache_key = f"insight_{user_id}_{datetime.utcnow().date()}"
-        
-        if hasattr(self, '_insight_cache') and cache_key in self._insight_cache:
-            return True
-        
-        return False
-    
-    def _mark_insight_sent(self, user_id: int):
-        """Mark that we've sent an insight to this user today"""
-        if not hasattr(self, '_insight_cache'):
-            self._insight_cache = {}
-        
-        cache_key = f"insight_{user_id}_{datetime.utcnow().date()}"
-        self._insight_cache[cache_key] = datetime.utcnow()
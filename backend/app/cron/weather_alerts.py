@@ -4,16 +4,43 @@ Fetches weather data using Open-Meteo API (free, no API key needed)
 and sends alerts for extreme conditions
 """
 
-from datetime import datetime, timedelta
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from .base import BaseCronHandler
+from .lease import LeaseLost
+
+# Cities per multi-coordinate Open-Meteo request
+WEATHER_BATCH_SIZE = int(os.getenv('WEATHER_BATCH_SIZE', '50'))
+
+# Concurrent Open-Meteo requests (forecast and air quality batches)
+WEATHER_FETCH_WORKERS = int(os.getenv('WEATHER_FETCH_WORKERS', '4'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Keep-alive session shared by the fetch threads"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_maxsize=WEATHER_FETCH_WORKERS))
+                _session = session
+    return _session
 
 
 class WeatherAlertHandler(BaseCronHandler):
     """Handles fetching weather data and sending alerts for extreme conditions"""
     
     name = "WeatherAlertHandler"
+    priority = 20
+    interval_seconds = 1800
     
     # Open-Meteo API (free, no API key required)
     OPEN_METEO_URL = 'https://api.open-meteo.com/v1/forecast'
@@ -25,6 +52,10 @@ class WeatherAlertHandler(BaseCronHandler):
     AQI_THRESHOLD = int(os.getenv('WEATHER_AQI_THRESHOLD', '150'))  # PM2.5 threshold
     HUMIDITY_HIGH_THRESHOLD = float(os.getenv('WEATHER_HUMIDITY_HIGH', '85'))
     
+    # Users within this distance of a monitored city get its alerts (only
+    # from the nearest one where the circles overlap, e.g. Kathmandu Valley)
+    ALERT_RADIUS_KM = float(os.getenv('WEATHER_ALERT_RADIUS_KM', '25'))
+    
     # Major cities in Nepal to monitor
     MONITORED_CITIES = [
         {'name': 'Kathmandu', 'lat': 27.7172, 'lon': 85.3240},
@@ -35,62 +66,71 @@ class WeatherAlertHandler(BaseCronHandler):
         {'name': 'Birgunj', 'lat': 27.0104, 'lon': 84.8821},
     ]
     
-    # Cache to prevent repeated alerts
-    _last_alerts = {}
+    # Don't repeat the same alert type for a city within this many hours
+    ALERT_COOLDOWN_HOURS = int(os.getenv('WEATHER_ALERT_COOLDOWN_HOURS', '6'))
     
     def execute(self, dry_run: bool = False):
         """
         Check weather conditions and send alerts for extreme conditions
         """
         from app import db
-        from app.models.user import User
-        from app.routes.notifications import send_onesignal_notification
+        from app.utils.alert_dedup import sent_keys, mark_sent
+        from app.utils.audience import iter_radius_audience_ids
+        from app.utils.notification_outbox import enqueue_notification
+        
+        # Fetch weather data from Open-Meteo (no API key needed!) for all
+        # cities up front: batched multi-coordinate requests, run concurrently
+        weather_by_city = self._fetch_all_weather(self.MONITORED_CITIES)
+        
+        # Check for extreme conditions, and which alerts went out recently
+        # (one lookup for every city)
+        alerts_by_city = {
+            name: self._check_conditions(data, name) for name, data in weather_by_city.items()
+        }
+        recently_sent = sent_keys('weather', [
+            self._dedup_key(name, alert['type'])
+            for name, alerts in alerts_by_city.items() for alert in alerts
+        ])
         
         for city in self.MONITORED_CITIES:
             try:
-                # Fetch weather data from Open-Meteo (no API key needed!)
-                weather_data = self._fetch_weather(city['lat'], city['lon'])
+                weather_data = weather_by_city.get(city['name'])
                 
                 if not weather_data:
                     self.log_failed(f"Failed to fetch weather for {city['name']}")
                     continue
                 
-                # Check for extreme conditions
-                alerts = self._check_conditions(weather_data, city['name'])
-                
+                alerts = alerts_by_city[city['name']]
                 if not alerts:
                     self.log_skipped(f"{city['name']}: Weather normal")
                     continue
                 
-                # Check if we've already sent these alerts recently
-                cache_key = f"{city['name']}_{','.join([a['type'] for a in alerts])}"
-                if self._was_alert_sent_recently(cache_key):
+                alerts = [
+                    alert for alert in alerts
+                    if self._dedup_key(city['name'], alert['type']) not in recently_sent
+                ]
+                if not alerts:
                     self.log_skipped(f"{city['name']}: Alerts already sent recently")
                     continue
                 
-                # Find users in this city
-                users = User.query.filter(
-                    User.is_active == True,
-                    User.notification_push == True,
-                    User.city.ilike(f'%{city["name"]}%')
-                ).all()
-                
-                if not users:
-                    self.log_skipped(f"{city['name']}: No users to notify")
-                    continue
-                
-                # Build and send notification
+                # Build and queue each alert for users near the city (or, without
+                # shared coordinates, registered in it), in provider-sized ID chunks.
+                # Users nearer another monitored city get that city's alerts instead.
+                other_cities = [
+                    (other['lat'], other['lon']) for other in self.MONITORED_CITIES
+                    if other['name'] != city['name']
+                ]
                 for alert in alerts:
-                    if dry_run:
-                        self.logger.info(
-                            f"[DRY RUN] Would send {alert['type']} alert to "
-                            f"{len(users)} users in {city['name']}"
-                        )
-                        self.log_success(f"[DRY RUN] {city['name']} - {alert['type']}")
-                    else:
-                        user_ids = [str(u.id) for u in users]
-                        
-                        result = send_onesignal_notification(
+                    total_users = 0
+                    for user_ids in iter_radius_audience_ids(
+                        city['lat'], city['lon'], self.ALERT_RADIUS_KM,
+                        fallback_city=city['name'], exclude_closer_to=other_cities
+                    ):
+                        total_users += len(user_ids)
+                        if dry_run:
+                            continue
+                        self.check_lease()
+                        enqueue_notification(
                             title=alert['title'],
                             message=alert['message'],
                             user_ids=user_ids,
@@ -99,64 +139,104 @@ class WeatherAlertHandler(BaseCronHandler):
                                 'alert_type': alert['type'],
                                 'city': city['name'],
                                 'value': str(alert['value'])
-                            }
+                            },
+                            source=self.name
+                        )
+                    
+                    if not total_users:
+                        self.log_skipped(f"{city['name']}: No users to notify")
+                        break
+                    self.count_scanned(total_users)
+                    
+                    if dry_run:
+                        self.logger.info(
+                            f"[DRY RUN] Would send {alert['type']} alert to "
+                            f"{total_users} users in {city['name']}"
                         )
+                        self.log_success(f"[DRY RUN] {city['name']} - {alert['type']}")
+                    else:
+                        mark_sent(
+                            'weather',
+                            [self._dedup_key(city['name'], alert['type'])],
+                            timedelta(hours=self.ALERT_COOLDOWN_HOURS)
+                        )
+                        db.session.commit()
                         
-                        if 'id' in result or 'recipients' in result:
-                            self.log_success(
-                                f"Sent {alert['type']} alert to {len(users)} users in {city['name']}"
-                            )
-                            self._mark_alert_sent(cache_key)
-                        else:
-                            self.log_failed(
-                                f"Failed to send {alert['type']} alert for {city['name']}",
-                                error=str(result.get('errors', result))
-                            )
+                        self.count_sent(total_users)
+                        self.log_success(
+                            f"Queued {alert['type']} alert for {total_users} users in {city['name']}"
+                        )
             
+            except LeaseLost:
+                raise
             except Exception as e:
+                db.session.rollback()
                 self.log_failed(f"Error processing {city['name']}", error=str(e))
     
-    def _fetch_weather(self, lat: float, lon: float) -> dict:
-        """Fetch weather data from Open-Meteo API (free, no API key)"""
-        try:
-            # Fetch current weather
-            params = {
-                'latitude': lat,
-                'longitude': lon,
+    def _fetch_all_weather(self, cities: list) -> dict:
+        """
+        Fetch current weather and air quality for every city
+        
+        Open-Meteo accepts comma-separated coordinates and answers with one
+        result per location, so each batch of WEATHER_BATCH_SIZE cities costs
+        one forecast and one air quality request; all requests run on a
+        thread pool.
+        
+        Returns:
+            {city name: forecast data with pm2_5/pm10/aqi added}; cities whose
+            forecast could not be fetched are missing
+        """
+        batches = [cities[i:i + WEATHER_BATCH_SIZE] for i in range(0, len(cities), WEATHER_BATCH_SIZE)]
+        
+        with ThreadPoolExecutor(max_workers=WEATHER_FETCH_WORKERS, thread_name_prefix='weather') as pool:
+            forecasts = [pool.submit(self._fetch_locations, self.OPEN_METEO_URL, batch, {
                 'current': 'temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m',
                 'timezone': 'auto'
-            }
-            
-            response = requests.get(self.OPEN_METEO_URL, params=params, timeout=10)
+            }) for batch in batches]
+            air_quality = [pool.submit(self._fetch_locations, self.AIR_QUALITY_URL, batch, {
+                'current': 'pm2_5,pm10,us_aqi'
+            }) for batch in batches]
             
-            if response.status_code == 200:
-                data = response.json()
-                current = data.get('current', {})
-                
-                # Fetch air quality data
-                try:
-                    aqi_response = requests.get(self.AIR_QUALITY_URL, params={
-                        'latitude': lat,
-                        'longitude': lon,
-                        'current': 'pm2_5,pm10,us_aqi'
-                    }, timeout=10)
-                    
-                    if aqi_response.status_code == 200:
-                        aqi_data = aqi_response.json()
-                        aqi_current = aqi_data.get('current', {})
-                        data['pm2_5'] = aqi_current.get('pm2_5', 0)
-                        data['pm10'] = aqi_current.get('pm10', 0)
-                        data['aqi'] = aqi_current.get('us_aqi', 0)
-                except Exception as e:
-                    self.logger.warning(f"AQI fetch failed: {e}")
-                    data['pm2_5'] = 0
-                    data['aqi'] = 0
+            weather_by_city = {}
+            for batch, forecast_future, aqi_future in zip(batches, forecasts, air_quality):
+                forecast_results = forecast_future.result()
+                if forecast_results is None:
+                    continue
+                aqi_results = aqi_future.result()
+                if aqi_results is None:
+                    self.logger.warning(f"AQI fetch failed for {len(batch)} cities")
+                    aqi_results = [{}] * len(batch)
                 
-                return data
-            else:
+                for city, data, aqi_data in zip(batch, forecast_results, aqi_results):
+                    aqi_current = aqi_data.get('current', {})
+                    data['pm2_5'] = aqi_current.get('pm2_5') or 0
+                    data['pm10'] = aqi_current.get('pm10') or 0
+                    data['aqi'] = aqi_current.get('us_aqi') or 0
+                    weather_by_city[city['name']] = data
+        
+        return weather_by_city
+    
+    def _fetch_locations(self, url: str, cities: list, params: dict) -> list:
+        """One multi-coordinate Open-Meteo request; a result per city, in order, or None"""
+        try:
+            response = _get_session().get(url, params={
+                **params,
+                'latitude': ','.join(str(city['lat']) for city in cities),
+                'longitude': ','.join(str(city['lon']) for city in cities)
+            }, timeout=10)
+            
+            if response.status_code != 200:
                 self.logger.error(f"Weather API error: {response.status_code}")
                 return None
-                
+            
+            data = response.json()
+            # A single location comes back as an object, several as a list
+            results = data if isinstance(data, list) else [data]
+            if len(results) != len(cities):
+                self.logger.error(f"Weather API returned {len(results)} results for {len(cities)} cities")
+                return None
+            return results
+            
         except Exception as e:
             self.logger.error(f"Weather fetch error: {e}")
             return None
@@ -235,14 +315,7 @@ class WeatherAlertHandler(BaseCronHandler):
         
         return alerts
     
-    def _was_alert_sent_recently(self, cache_key: str) -> bool:
-        """Check if this alert was sent in the last 6 hours"""
-        if cache_key in self._last_alerts:
-            last_sent = self._last_alerts[cache_key]
-            if datetime.utcnow() - last_sent < timedelta(hours=6):
-                return True
-        return False
-    
-    def _mark_alert_sent(self, cache_key: str):
-        """Mark an alert as sent"""
-        self._last_alerts[cache_key] = datetime.utcnow()
+    @staticmethod
+    def _dedup_key(city_name: str, alert_type: str) -> str:
+        """alert_dedup key for one alert type in one city"""
+        return f"{city_name}:{alert_type}"
@@ -25,29 +25,33 @@ COUNTRY_BOUNDS = {
 }
 
 
-def get_earthquakes(country: str = None, min_magnitude: float = 2.5, days: int = 7) -> List[Dict]:
+def get_earthquakes(country: str = None, min_magnitude: float = 2.5, days: int = 7,
+                    since: Optional[datetime] = None) -> List[Dict]:
     """
     Fetch recent earthquakes
     
     Args:
         country: Country to filter (optional)
         min_magnitude: Minimum magnitude to fetch
-        days: Number of days to look back
+        days: Number of days to look back (whole UTC days)
+        since: Exact UTC start time instead of days; open-ended up to now
     
     Returns:
         List of earthquake events
     """
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=days)
-    
     params = {
         'format': 'geojson',
-        'starttime': start_time.strftime('%Y-%m-%d'),
-        'endtime': end_time.strftime('%Y-%m-%d'),
         'minmagnitude': min_magnitude,
         'orderby': 'time',
         'limit': 100
     }
+    if since is not None:
+        params['starttime'] = since.strftime('%Y-%m-%dT%H:%M:%S')
+    else:
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(days=days)
+        params['starttime'] = start_time.strftime('%Y-%m-%d')
+        params['endtime'] = end_time.strftime('%Y-%m-%d')
     
     # Add country bounds if specified
     if country and country.lower() in COUNTRY_BOUNDS:
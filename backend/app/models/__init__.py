@@ -5,7 +5,7 @@ from app.models.hospital import (
     HospitalService, HospitalImage
 )
 from app.models.appointment import Appointment, ChatMessage
-from app.models.reminder import MedicineReminder, ReminderLog
+from app.models.reminder import MedicineReminder, ReminderLog, ReminderScheduleSlot
 from app.models.health_alert import HealthAlert, BloodBank, EmergencyContact
 from app.models.medicine import Medicine, Pharmacy, Order, OrderItem
 from app.models.prevention import PreventionTip, DailyGoal, SimulationProgress
@@ -16,9 +16,13 @@ from app.models.disease_surveillance import (
 from app.models.simulation import Simulation, SimulationStep, UserSimulationProgress
 from app.models.medical_history import (
     MedicalRecord, MedicalCondition, MedicalAllergy, MedicalMedication,
-    MedicalDocument, MedicalDocumentImage, MedicalSurgery, MedicalVaccination
+    MedicalDocument, MedicalDocumentImage, MedicalSurgery, MedicalVaccination,
+    DocumentAnalysisJob, LabResult
 )
 from app.models.ai_conversation import AIConversation, AIMessage
+from app.models.image_analysis import ImageAnalysisCache
+from app.models.cron import CronLock, CronRun
+from app.models.notification import NotificationOutbox, AlertDedup
 
 __all__ = [
     'User',
@@ -34,6 +38,7 @@ __all__ = [
     'ChatMessage',
     'MedicineReminder',
     'ReminderLog',
+    'ReminderScheduleSlot',
     'HealthAlert',
     'BloodBank',
     'EmergencyContact',
@@ -64,7 +69,17 @@ __all__ = [
     'MedicalDocumentImage',
     'MedicalSurgery',
     'MedicalVaccination',
+    'DocumentAnalysisJob',
+    'LabResult',
     # AI Conversation History
     'AIConversation',
     'AIMessage',
+    # Image Analysis Cache
+    'ImageAnalysisCache',
+    # Cron
+    'CronLock',
+    'CronRun',
+    # Push notification outbox
+    'NotificationOutbox',
+    'AlertDedup',
 ]
@@ -0,0 +1,75 @@
+import json
+from datetime import datetime
+from app import db
+
+
+class CronLock(db.Model):
+    """Lease held by the process currently running a cron handler"""
+    __tablename__ = 'cron_locks'
+
+    name = db.Column(db.String(100), primary_key=True)
+    # host:pid:thread of the current holder
+    owner = db.Column(db.String(150), nullable=True)
+    # Fencing token - incremented on every acquisition, so a holder whose
+    # lease expired can tell it has been superseded
+    token = db.Column(db.BigInteger, nullable=False, default=0)
+    acquired_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'owner': self.owner,
+            'token': self.token,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'held': self.owner is not None and self.expires_at > datetime.utcnow()
+        }
+
+
+class CronRun(db.Model):
+    """One execution of a cron handler, for run history and duration metrics"""
+    __tablename__ = 'cron_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    handler = db.Column(db.String(100), nullable=False)
+    host = db.Column(db.String(100))
+
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=False)
+    duration_seconds = db.Column(db.Float, nullable=False)
+    cpu_seconds = db.Column(db.Float)
+
+    success = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    skipped = db.Column(db.Integer, default=0, nullable=False)
+    rows_scanned = db.Column(db.Integer, default=0, nullable=False)
+    notifications_sent = db.Column(db.Integer, default=0, nullable=False)
+    errors = db.Column(db.Text)  # JSON list, truncated
+
+    dry_run = db.Column(db.Boolean, default=False, nullable=False)
+    lease_token = db.Column(db.BigInteger)
+
+    __table_args__ = (
+        db.Index('idx_cron_runs_handler_started', 'handler', 'started_at'),
+        db.Index('idx_cron_runs_started', 'started_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'handler': self.handler,
+            'host': self.host,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': self.duration_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'success': self.success,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'rows_scanned': self.rows_scanned,
+            'notifications_sent': self.notifications_sent,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'dry_run': self.dry_run,
+            'lease_token': self.lease_token
+        }
@@ -0,0 +1,52 @@
+from datetime import datetime
+from app import db
+
+
+class ImageAnalysisCache(db.Model):
+    """Stored vision-model analysis of an image, reused for repeat uploads"""
+    __tablename__ = 'image_analysis_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # sha256 of the image bytes sent to the model
+    image_sha256 = db.Column(db.String(64), nullable=False)
+    # 64-bit difference hash (hex) for near-duplicate detection
+    perceptual_hash = db.Column(db.String(16), nullable=True)
+    # sha256 over prompt version, analysis type, language and rendered prompt
+    prompt_key = db.Column(db.String(64), nullable=False)
+
+    analysis_type = db.Column(db.String(50), nullable=False)
+    language = db.Column(db.String(10), default='en')
+    prompt_version = db.Column(db.String(20), nullable=False)
+
+    # Uploader, used to scope near-duplicate flags to the same user
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+
+    analysis = db.Column(db.Text, nullable=False)
+    model = db.Column(db.String(100))
+    # Local OCR pre-pass output; ocr_confidence is NULL when OCR did not run
+    ocr_text = db.Column(db.Text, nullable=True)
+    ocr_confidence = db.Column(db.Float, nullable=True)
+
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('image_sha256', 'prompt_key', name='uq_image_analysis_cache_key'),
+        db.Index('idx_image_analysis_cache_user_type', 'user_id', 'analysis_type', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'image_sha256': self.image_sha256,
+            'perceptual_hash': self.perceptual_hash,
+            'analysis_type': self.analysis_type,
+            'language': self.language,
+            'prompt_version': self.prompt_version,
+            'model': self.model,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_hit_at': self.last_hit_at.isoformat() if self.last_hit_at else None
+        }
@@ -214,6 +214,7 @@ class MedicalDocument(db.Model):
     
     # File Storage
     file_url = db.Column(db.Text)  # Primary document file
+    file_key = db.Column(db.String(255))  # Object storage key (content-addressed)
     file_type = db.Column(db.String(50))  # pdf, image, etc.
     file_size = db.Column(db.Integer)  # Size in bytes
     
@@ -236,6 +237,11 @@ class MedicalDocument(db.Model):
     # Relationships
     images = db.relationship('MedicalDocumentImage', backref='document', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Document search over OCR text (MySQL FULLTEXT)
+        db.Index('ft_medical_documents_search', 'title', 'ocr_text', 'ai_summary', mysql_prefix='FULLTEXT'),
+    )
+    
     def to_dict(self, include_images=True):
         data = {
             'id': self.id,
@@ -245,7 +251,7 @@ class MedicalDocument(db.Model):
             'document_date': self.document_date.isoformat() if self.document_date else None,
             'doctor_name': self.doctor_name,
             'hospital_name': self.hospital_name,
-            'file_url': self.file_url,
+            'file_url': _storage_url(self.file_key) if self.file_key else self.file_url,
             'file_type': self.file_type,
             'ai_analysis': self.ai_analysis,
             'ai_summary': self.ai_summary,
@@ -260,6 +266,12 @@ class MedicalDocument(db.Model):
         return data
 
 
+def _storage_url(key):
+    """Short-lived download URL for a stored object (signed / presigned)"""
+    from app.utils.storage import get_storage
+    return get_storage().url(key)
+
+
 class MedicalDocumentImage(db.Model):
     """Multiple images for a medical document"""
     __tablename__ = 'medical_document_images'
@@ -268,6 +280,7 @@ class MedicalDocumentImage(db.Model):
     document_id = db.Column(db.Integer, db.ForeignKey('medical_documents.id'), nullable=False)
     
     image_url = db.Column(db.Text, nullable=False)
+    image_key = db.Column(db.String(255))  # Object storage key (content-addressed)
     thumbnail_url = db.Column(db.Text)
     caption = db.Column(db.String(255))
     page_number = db.Column(db.Integer, default=1)
@@ -281,7 +294,7 @@ class MedicalDocumentImage(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
-            'image_url': self.image_url,
+            'image_url': _storage_url(self.image_key) if self.image_key else self.image_url,
             'thumbnail_url': self.thumbnail_url,
             'caption': self.caption,
             'page_number': self.page_number,
@@ -377,3 +390,96 @@ class MedicalVaccination(db.Model):
             'manufacturer': self.manufacturer,
             'notes': self.notes
         }
+
+
+class DocumentAnalysisJob(db.Model):
+    """Queued AI analysis of an uploaded document image (processed by a worker)"""
+    __tablename__ = 'document_analysis_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('medical_documents.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    status = db.Column(db.Enum('queued', 'running', 'completed', 'failed'), default='queued', nullable=False)
+    
+    # Input image (already downscaled) - object storage key
+    input_path = db.Column(db.String(500))
+    filename = db.Column(db.String(255))
+    mime_type = db.Column(db.String(50))
+    document_type = db.Column(db.String(50))
+    language = db.Column(db.String(10), default='en')
+    
+    # Retry / locking
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    worker_id = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    document = db.relationship('MedicalDocument', backref=db.backref('analysis_jobs', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.Index('idx_analysis_jobs_status_run_after', 'status', 'run_after'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class LabResult(db.Model):
+    """One lab measurement (analyte value) extracted from a document - per-user time series"""
+    __tablename__ = 'lab_results'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('medical_documents.id', ondelete='CASCADE'), index=True)
+    
+    # Canonical analyte key (e.g. 'hba1c') and the name as printed on the report
+    analyte = db.Column(db.String(50), nullable=False)
+    analyte_name = db.Column(db.String(100))
+    
+    value = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(30))
+    ref_low = db.Column(db.Float)
+    ref_high = db.Column(db.Float)
+    flag = db.Column(db.Enum('low', 'normal', 'high', 'unknown'), default='unknown', nullable=False)
+    
+    measured_on = db.Column(db.Date, nullable=False)
+    source = db.Column(db.Enum('ocr', 'ai', 'manual'), default='ai')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    document = db.relationship('MedicalDocument', backref=db.backref('lab_results', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.Index('idx_lab_results_user_analyte_date', 'user_id', 'analyte', 'measured_on'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'analyte': self.analyte,
+            'analyte_name': self.analyte_name,
+            'value': self.value,
+            'unit': self.unit,
+            'ref_low': self.ref_low,
+            'ref_high': self.ref_high,
+            'flag': self.flag,
+            'measured_on': self.measured_on.isoformat() if self.measured_on else None,
+            'source': self.source
+        }
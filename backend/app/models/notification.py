@@ -0,0 +1,85 @@
+from datetime import datetime
+from app import db
+
+
+class NotificationOutbox(db.Model):
+    """
+    Push notification waiting to be delivered (or already delivered)
+
+    Written in the same transaction as whatever triggered it; the outbox
+    dispatcher sends it and writes the delivery status back.
+    """
+    __tablename__ = 'notification_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Sent to OneSignal so a retried request can't deliver twice
+    idempotency_key = db.Column(db.String(36), unique=True, nullable=False)
+    # Optional caller key that makes enqueueing the same notification a no-op
+    dedup_key = db.Column(db.String(191), unique=True, nullable=True)
+    source = db.Column(db.String(100))  # handler or route that queued it
+
+    status = db.Column(db.Enum('queued', 'sending', 'sent', 'failed'), default='queued', nullable=False)
+
+    title = db.Column(db.String(255), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    data = db.Column(db.JSON)
+    url = db.Column(db.String(500))
+    # Exactly one target: external user IDs (at most one provider chunk), player IDs or segments
+    user_ids = db.Column(db.JSON)
+    player_ids = db.Column(db.JSON)
+    segments = db.Column(db.JSON)
+
+    # Retry / locking
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    worker_id = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+
+    # Delivery result
+    provider_id = db.Column(db.String(64))
+    recipients = db.Column(db.Integer)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_notification_outbox_status_run_after', 'status', 'run_after'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'status': self.status,
+            'title': self.title,
+            'recipients': self.recipients,
+            'provider_id': self.provider_id,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+
+class AlertDedup(db.Model):
+    """
+    "Already notified" marker for an alert, kept until expires_at
+
+    Checked by the alert handlers so cooldowns hold across process restarts;
+    expired rows are ignored and pruned periodically.
+    """
+    __tablename__ = 'alert_dedup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(50), nullable=False)  # e.g. 'weather', 'health_insight'
+    key = db.Column(db.String(191), nullable=False)  # what was notified within the scope
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_alert_dedup_scope_key'),
+        db.Index('idx_alert_dedup_expires_at', 'expires_at'),
+    )
@@ -1,6 +1,78 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
+import pytz
 from app import db
 
+# days_of_week bitmask: bit 0 = Monday ... bit 6 = Sunday (date.weekday())
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+ALL_DAYS_MASK = 0b1111111
+
+
+def parse_minute_of_day(time_str):
+    """'HH:MM' -> minutes since midnight, or None if invalid"""
+    try:
+        hour, minute = (int(part) for part in str(time_str).split(':')[:2])
+    except (ValueError, TypeError):
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+
+def days_of_week_mask(days_of_week):
+    """Bitmask from a days_of_week list (0-6 with Monday = 0, or day names); empty = every day"""
+    if not days_of_week:
+        return ALL_DAYS_MASK
+    mask = 0
+    for day in days_of_week:
+        if isinstance(day, int) and 0 <= day <= 6:
+            mask |= 1 << day
+        elif isinstance(day, str) and day[:3].lower() in WEEKDAY_NAMES:
+            mask |= 1 << WEEKDAY_NAMES.index(day[:3].lower())
+    return mask or ALL_DAYS_MASK
+
+
+def get_timezone(tz_name):
+    """pytz timezone for an IANA name, falling back to the default timezone"""
+    from app.models.user import DEFAULT_TIMEZONE
+    try:
+        return pytz.timezone(tz_name or DEFAULT_TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(DEFAULT_TIMEZONE)
+
+
+def next_fire_time(minute_of_day, days_mask, tz_name, after, start_date=None, end_date=None):
+    """
+    Next occurrence of a local time of day, strictly after `after`
+    
+    Args:
+        minute_of_day: Local time as minutes since midnight
+        days_mask: days_of_week bitmask
+        tz_name: IANA timezone the time is local to
+        after: Naive UTC datetime
+        start_date, end_date: Optional local date bounds of the schedule
+    
+    Returns:
+        Naive UTC datetime, or None if the schedule has no further occurrence
+    """
+    tz = get_timezone(tz_name)
+    day = pytz.UTC.localize(after).astimezone(tz).date()
+    if start_date and start_date > day:
+        day = start_date
+    
+    # A week plus today covers any non-empty mask
+    for _ in range(8):
+        if end_date and day > end_date:
+            return None
+        if days_mask & (1 << day.weekday()):
+            # Times skipped by a DST jump resolve to the same wall-clock offset
+            # (02:30 becomes 03:30); repeated times fire once, on standard time
+            local = tz.localize(datetime.combine(day, time(minute_of_day // 60, minute_of_day % 60)))
+            fire = local.astimezone(pytz.UTC).replace(tzinfo=None)
+            if fire > after:
+                return fire
+        day += timedelta(days=1)
+    return None
+
 
 class MedicineReminder(db.Model):
     __tablename__ = 'medicine_reminders'
@@ -25,6 +97,41 @@ class MedicineReminder(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     logs = db.relationship('ReminderLog', backref='reminder')
+    schedule_slots = db.relationship('ReminderScheduleSlot', backref='reminder', cascade='all, delete-orphan')
+    
+    def sync_schedule_slots(self, tz_name=None):
+        """
+        Rebuild the dispatch index from reminder_times / days_of_week and
+        reschedule every slot (call after changing them, is_active, the dates
+        or the user's timezone)
+        """
+        if tz_name is None:
+            from app.models.user import User
+            user = db.session.get(User, self.user_id) if self.user_id else None
+            tz_name = user.timezone if user else None
+        
+        mask = days_of_week_mask(self.days_of_week)
+        wanted = {}
+        for time_str in self.reminder_times or []:
+            minute = parse_minute_of_day(time_str)
+            if minute is not None:
+                wanted[minute] = f"{minute // 60:02d}:{minute % 60:02d}"
+        
+        for slot in list(self.schedule_slots):
+            if slot.minute_of_day in wanted:
+                slot.days_mask = mask
+                wanted.pop(slot.minute_of_day)
+            else:
+                self.schedule_slots.remove(slot)
+        
+        for minute, time_str in wanted.items():
+            self.schedule_slots.append(ReminderScheduleSlot(
+                minute_of_day=minute, days_mask=mask, time_str=time_str
+            ))
+        
+        now = datetime.utcnow()
+        for slot in self.schedule_slots:
+            slot.next_fire_at = slot.compute_next_fire(self, tz_name, now)
     
     def to_dict(self):
         return {
@@ -36,6 +143,7 @@ class MedicineReminder(db.Model):
             'frequency': self.frequency,
             'times_per_day': self.times_per_day,
             'reminder_times': self.reminder_times,
+            'days_of_week': self.days_of_week,
             'instructions': self.instructions,
             'is_active': self.is_active,
             'refill_reminder': self.refill_reminder,
@@ -43,7 +151,39 @@ class MedicineReminder(db.Model):
         }
 
 
+class ReminderScheduleSlot(db.Model):
+    """
+    One reminder time of day with its next occurrence precomputed in UTC
+    
+    The cron sweep reads only slots with next_fire_at <= now and advances
+    them; next_fire_at is NULL when the reminder is inactive or has ended.
+    """
+    __tablename__ = 'reminder_schedule_slots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    reminder_id = db.Column(db.Integer, db.ForeignKey('medicine_reminders.id', ondelete='CASCADE'), nullable=False)
+    minute_of_day = db.Column(db.SmallInteger, nullable=False)  # 0-1439, reminder's local time
+    days_mask = db.Column(db.SmallInteger, nullable=False, default=ALL_DAYS_MASK)
+    time_str = db.Column(db.String(5), nullable=False)  # 'HH:MM' as shown to the user
+    next_fire_at = db.Column(db.DateTime)  # UTC
+    
+    __table_args__ = (
+        db.UniqueConstraint('reminder_id', 'minute_of_day', name='uq_reminder_slot'),
+        db.Index('idx_reminder_slots_next_fire', 'next_fire_at'),
+    )
+    
+    def compute_next_fire(self, reminder, tz_name, after):
+        """Next UTC occurrence after `after`, or None if the reminder won't fire again"""
+        if not reminder.is_active:
+            return None
+        return next_fire_time(
+            self.minute_of_day, self.days_mask, tz_name, after,
+            start_date=reminder.start_date, end_date=reminder.end_date
+        )
+
+
 class ReminderLog(db.Model):
+    """Sent / taken doses; all times are naive UTC"""
     __tablename__ = 'reminder_logs'
     
     id = db.Column(db.Integer, primary_key=True)
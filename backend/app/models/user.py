@@ -1,6 +1,52 @@
+import os
+import logging
+import unicodedata
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
 from app import db
+from app.utils.geo import encode_geohash
+
+logger = logging.getLogger(__name__)
+
+# Timezone for users who haven't set one (IANA name)
+DEFAULT_TIMEZONE = os.getenv('DEFAULT_TIMEZONE', 'Asia/Kathmandu')
+
+# Administrative suffixes dropped from location keys, longest first
+LOCATION_SUFFIXES = (
+    ' sub metropolitan city', ' metropolitan city', ' rural municipality',
+    ' municipality', ' district', ' province', ' city',
+    ' उपमहानगरपालिका', ' महानगरपालिका', ' गाउँपालिका', ' नगरपालिका', ' जिल्ला', ' प्रदेश'
+)
+
+# Trailing country names dropped from location keys ('Kathmandu, Nepal')
+LOCATION_COUNTRIES = (' nepal', ' नेपाल')
+
+
+def _strip_suffix(key, suffixes):
+    for suffix in suffixes:
+        if key.endswith(suffix) and len(key) > len(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def normalize_location_key(value):
+    """
+    Canonical form of a city/province name for exact, indexable matching
+
+    'Kathmandu Metropolitan City, Nepal' -> 'kathmandu', ' Bagmati  Province' -> 'bagmati',
+    'काठमाडौं महानगरपालिका' -> 'काठमाडौं'. Letters, digits and combining marks
+    (Devanagari vowel signs) are kept; everything else separates words.
+    """
+    if not value:
+        return None
+    value = unicodedata.normalize('NFKC', value).casefold()
+    key = ' '.join(''.join(
+        ch if ch.isalnum() or unicodedata.category(ch).startswith('M') else ' '
+        for ch in value
+    ).split())
+    key = _strip_suffix(_strip_suffix(key, LOCATION_COUNTRIES), LOCATION_SUFFIXES)
+    return key[:100] or None
 
 
 class User(db.Model):
@@ -18,9 +64,15 @@ class User(db.Model):
     address = db.Column(db.Text)
     city = db.Column(db.String(100))
     province = db.Column(db.String(100))
+    # Normalized city/province (normalize_location_key) for alert audience lookups
+    city_key = db.Column(db.String(100), index=True)
+    province_key = db.Column(db.String(100), index=True)
     country = db.Column(db.String(100), default='Nepal')
     latitude = db.Column(db.Numeric(10, 8))
     longitude = db.Column(db.Numeric(11, 8))
+    # Geohash of latitude/longitude (app.utils.geo) for radius-targeted alerts
+    geohash = db.Column(db.String(12), index=True)
+    timezone = db.Column(db.String(50), default=DEFAULT_TIMEZONE)  # IANA name; reminder times are local to it
     is_verified = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     notification_email = db.Column(db.Boolean, default=True)
@@ -54,6 +106,22 @@ class User(db.Model):
     reminders = db.relationship('MedicineReminder', backref='user')
     emergency_contacts = db.relationship('EmergencyContact', backref='user')
     
+    @validates('city', 'province')
+    def _set_location_key(self, field, value):
+        key = normalize_location_key(value)
+        if key is None and value and value.strip():
+            logger.warning(f"{field} {value!r} normalizes to no location key; {field} alerts will miss this user")
+        setattr(self, f'{field}_key', key)
+        return value
+    
+    @validates('latitude', 'longitude')
+    def _set_geohash(self, field, value):
+        if field == 'latitude':
+            self.geohash = encode_geohash(value, self.longitude)
+        else:
+            self.geohash = encode_geohash(self.latitude, value)
+        return value
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -79,6 +147,7 @@ class User(db.Model):
             'profile_image': self.profile_image,
             'city': self.city,
             'province': self.province,
+            'timezone': self.timezone,
             'role': self.role,
             'hospital_id': self.hospital_id,
             'is_verified': self.is_verified,
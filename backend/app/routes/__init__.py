@@ -22,6 +22,7 @@ def register_blueprints(app):
     from app.routes.drug_info import drug_info_bp
     from app.routes.cron_routes import cron_bp
     from app.routes.ai_history import ai_history_bp
+    from app.routes.files import files_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
@@ -46,4 +47,5 @@ def register_blueprints(app):
     app.register_blueprint(diseases_bp)  # Disease encyclopedia - uses /api/diseases from blueprint
     app.register_blueprint(drug_info_bp)  # Drug info - uses /api/drug-info from blueprint
     app.register_blueprint(cron_bp, url_prefix='/api/cron')  # Cron job endpoints
+    app.register_blueprint(files_bp, url_prefix='/api/files')  # Signed upload downloads (local storage)
 
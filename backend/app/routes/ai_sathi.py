@@ -124,6 +124,10 @@ PATIENT PROFILE:
         surgeries_text = ", ".join([s.procedure_name for s in surgeries]) if surgeries else "None"
         vaccines_text = ", ".join([v.vaccine_name for v in vaccinations]) if vaccinations else "None recorded"
         
+        from app.utils.lab_values import get_recent_abnormal_values, format_abnormal_values
+        abnormal_labs = get_recent_abnormal_values(user_id)
+        labs_text = format_abnormal_values(abnormal_labs) if abnormal_labs else "None on file"
+        
         # Calculate age from date_of_birth if available
         age_text = "Unknown"
         if hasattr(user, 'date_of_birth') and user.date_of_birth:
@@ -146,6 +150,7 @@ ALLERGIES (IMPORTANT): {allergies_text}
 CURRENT MEDICATIONS: {medications_text}
 PAST SURGERIES: {surgeries_text}
 RECENT VACCINATIONS: {vaccines_text}
+RECENT ABNORMAL LAB VALUES: {labs_text}
 
 LIFESTYLE:
 - Smoking: {record.smoking_status or 'Not specified'}
@@ -1198,6 +1203,7 @@ def _get_fallback_questions(category):
 def analyze_image():
     """Analyze medical images (skin conditions, etc.) using g4f PollinationsAI"""
     from app.utils.ai_image_service import analyze_medical_image
+    from app.utils.image_ingest import spool_upload, prepare_for_vision, UploadTooLarge
     
     user_id = get_jwt_identity()
     
@@ -1212,10 +1218,11 @@ def analyze_image():
     logger.info(f"[Image Analysis] Starting analysis: type={analysis_type}, desc={description[:50]}...")
     
     try:
-        # Read image bytes
-        image_bytes = image.read()
-        filename = image.filename or 'uploaded_image.jpg'
-        logger.info(f"[Image Analysis] Image loaded: {filename}, size={len(image_bytes)} bytes")
+        # Spool + hash the upload, then downscale before it reaches the model
+        with spool_upload(image, max_bytes=current_app.config.get('MAX_IMAGE_UPLOAD_BYTES')) as upload:
+            image_bytes, mime_type = prepare_for_vision(upload, analysis_type=analysis_type)
+        filename = upload.filename
+        logger.info(f"[Image Analysis] Image loaded: {filename}, size={upload.size} bytes, sent={len(image_bytes)} bytes")
         
         # Add user medical context to description if logged in
         full_context = description
@@ -1230,7 +1237,9 @@ def analyze_image():
             filename=filename,
             analysis_type=analysis_type,
             context=full_context,
-            language=language
+            language=language,
+            mime_type=mime_type,
+            user_id=user_id
         )
         
         logger.info(f"[Image Analysis] Result type: {type(result)}")
@@ -1259,6 +1268,9 @@ def analyze_image():
             'analysis_type': analysis_type,
             'model_used': model_used,
             'success': success,
+            'cached': result.get('cached', False) if isinstance(result, dict) else False,
+            'near_duplicate': result.get('near_duplicate') if isinstance(result, dict) else None,
+            'preprocessing': {'original_bytes': upload.size, 'sent_bytes': len(image_bytes)},
             'severity': severity,
             'recommendations': [
                 'Keep the affected area clean and dry',
@@ -1280,6 +1292,8 @@ def analyze_image():
         logger.info(f"[Image Analysis] Success: returning analysis")
         return jsonify(response)
         
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e), 'success': False, 'disclaimer': DISCLAIMER}), 413
     except Exception as e:
         logger.error(f"[Image Analysis Error] {type(e).__name__}: {str(e)}")
         import traceback
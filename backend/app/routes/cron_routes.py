@@ -139,6 +139,29 @@ def run_weather_alerts():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@cron_bp.route('/earthquake-alerts', methods=['POST', 'GET'])
+def run_earthquake_alerts():
+    """Run only earthquake alerts cron"""
+    if not verify_cron_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    
+    try:
+        from app.cron import CronScheduler
+        
+        scheduler = CronScheduler()
+        result = scheduler.run_handler('earthquake_alerts', dry_run=dry_run)
+        
+        return jsonify({
+            'status': 'success',
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @cron_bp.route('/user-health-insights', methods=['POST', 'GET'])
 def run_user_health_insights():
     """
@@ -191,6 +214,29 @@ def run_general_health_tips():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@cron_bp.route('/notification-dispatch', methods=['POST', 'GET'])
+def run_notification_dispatch():
+    """Send queued push notifications from the outbox"""
+    if not verify_cron_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    
+    try:
+        from app.cron import CronScheduler
+        
+        scheduler = CronScheduler()
+        result = scheduler.run_handler('notification_dispatch', dry_run=dry_run)
+        
+        return jsonify({
+            'status': 'success',
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @cron_bp.route('/status', methods=['GET'])
 def cron_status():
     """Get cron status and last run info"""
@@ -198,14 +244,50 @@ def cron_status():
         return jsonify({'error': 'Unauthorized'}), 401
     
     from app.cron import CronScheduler
+    from app.cron.history import get_last_runs
+    from app.models.cron import CronLock
+    from app.utils.notification_outbox import get_outbox_counts
     
     scheduler = CronScheduler()
     
     return jsonify({
         'status': 'ok',
         'available_handlers': scheduler.get_handler_names(),
+        # In-process info from this worker's last /run call
         'last_run': _last_run_info['last_run'],
-        'last_result': _last_run_info['result']
+        'last_result': _last_run_info['result'],
+        # Shared across workers and hosts
+        'last_runs': get_last_runs(),
+        'locks': [lock.to_dict() for lock in CronLock.query.order_by(CronLock.name).all()],
+        'notification_outbox': get_outbox_counts()
+    })
+
+
+@cron_bp.route('/metrics', methods=['GET'])
+def cron_metrics():
+    """
+    Handler duration percentiles from the run history
+    
+    Query params:
+        - days: Look-back window (default 7, max 90)
+        - bucket: 'day' (default) or 'hour' for the per-handler series
+        - handler: Limit to one handler (e.g. MedicineReminderHandler)
+    """
+    if not verify_cron_auth():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    from app.cron.history import get_duration_stats
+    
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ('day', 'hour'):
+        return jsonify({'error': "bucket must be 'day' or 'hour'"}), 400
+    
+    return jsonify({
+        'status': 'ok',
+        'days': days,
+        'bucket': bucket,
+        'handlers': get_duration_stats(days=days, bucket=bucket, handler=request.args.get('handler'))
     })
 
 
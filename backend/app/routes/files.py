@@ -0,0 +1,48 @@
+"""
+Signed file downloads for the local storage backend
+
+S3-compatible backends hand out presigned URLs instead, so this route only
+serves objects written by LocalStorage.
+"""
+import time
+
+from flask import Blueprint, jsonify, request, send_file
+
+from app.utils.file_serving import guess_mimetype
+from app.utils.storage import LocalStorage, get_storage
+
+files_bp = Blueprint('files', __name__)
+
+
+@files_bp.route('/<path:key>', methods=['GET'])
+def download_file(key):
+    """Serve a stored object if the URL signature is valid and unexpired"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return jsonify({'error': 'Not found'}), 404
+    
+    try:
+        expires_at = int(request.args.get('expires', '0'))
+    except ValueError:
+        expires_at = 0
+    if not storage.verify(key, expires_at, request.args.get('signature', '')):
+        return jsonify({'error': 'Invalid or expired link'}), 403
+    
+    try:
+        path = storage.path(key)
+    except ValueError:
+        return jsonify({'error': 'Not found'}), 404
+    if not storage.exists(key):
+        return jsonify({'error': 'Not found'}), 404
+    
+    # Content-addressed objects never change; the link itself expires
+    response = send_file(
+        path,
+        mimetype=guess_mimetype(key),
+        conditional=True,
+        download_name=request.args.get('filename') or None,
+        max_age=max(0, expires_at - int(time.time()))
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
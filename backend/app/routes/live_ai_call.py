@@ -7,13 +7,14 @@ Provides voice-based AI medical consultations with:
 - Session management for ongoing consultations
 """
 
-from flask import Blueprint, request, jsonify, g, send_file, current_app
+from flask import Blueprint, request, jsonify, g, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import os
 import uuid
 import asyncio
 import logging
 import time
+import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
@@ -94,7 +95,7 @@ try:
     from app.utils.tts_service import (
         get_speech_generator, generate_speech_async,
         get_optimal_voice, AUDIO_OUTPUT_DIR, LANGUAGE_NAMES, clean_text_for_tts,
-        EDGE_TTS_AVAILABLE
+        shape_text_for_speech, EDGE_TTS_AVAILABLE
     )
     TTS_AVAILABLE = EDGE_TTS_AVAILABLE
     speech_generator = get_speech_generator()
@@ -231,6 +232,7 @@ class LiveCallSession:
     last_activity: datetime
     conversation_history: deque = field(default_factory=lambda: deque(maxlen=50))
     language_code: str = "en-US"
+    speech_rate: float = 1.0
     total_interactions: int = 0
     patient_context: str = ""
     
@@ -371,6 +373,15 @@ def start_live_call():
         if specialist not in MEDICAL_SPECIALISTS:
             specialist = 'physician'
         
+        # Same 0.5x-2.0x range the TTS layer supports
+        try:
+            speech_rate = float(data.get('speech_rate', 1.0) or 1.0)
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "speech_rate must be a number"}), 400
+        if not math.isfinite(speech_rate):
+            return jsonify({"status": "error", "message": "speech_rate must be a number"}), 400
+        speech_rate = max(0.5, min(2.0, speech_rate))
+        
         session_id = str(uuid.uuid4())
         
         session = LiveCallSession(
@@ -380,6 +391,7 @@ def start_live_call():
             created_at=datetime.now(),
             last_activity=datetime.now(),
             language_code=data.get('language', 'en-US'),
+            speech_rate=speech_rate,
             patient_context=data.get('patient_context', '')
         )
         
@@ -462,15 +474,6 @@ def process_speech():
             except Exception as e:
                 logger.error(f"Error saving to AI history: {e}")
         
-        # Generate audio if TTS available
-        audio_result = None
-        if TTS_AVAILABLE and speech_generator:
-            audio_result = speech_generator.generate_speech(
-                text=ai_response,
-                voice=get_optimal_voice(session.language_code),
-                language_code=session.language_code
-            )
-        
         response = {
             "status": "success",
             "text": ai_response,
@@ -478,6 +481,26 @@ def process_speech():
             "interaction_count": session.total_interactions
         }
         
+        # Generate audio if TTS available - only the part that fits the voice budget
+        audio_result = None
+        if TTS_AVAILABLE and speech_generator:
+            shaped = shape_text_for_speech(
+                ai_response,
+                language_code=session.language_code,
+                speed=session.speech_rate,
+                max_seconds=current_app.config.get('VOICE_RESPONSE_MAX_SECONDS', 20.0)
+            )
+            response['spoken_text'] = shaped['spoken']
+            response['text_only'] = shaped['overflow']
+            response['estimated_speech_seconds'] = round(shaped['estimated_seconds'], 1)
+            
+            audio_result = speech_generator.generate_speech(
+                text=shaped['spoken'],
+                voice=get_optimal_voice(session.language_code),
+                speed=session.speech_rate,
+                language_code=session.language_code
+            )
+        
         if audio_result and audio_result.get('status') == 'success':
             # Build audio URL - use direct path without duplication
             server_url = request.url_root.rstrip('/')
@@ -548,11 +571,67 @@ def keep_alive():
 
 @live_ai_bp.route('/audio/<filename>')
 def serve_audio(filename):
-    """Serve generated audio files"""
-    file_path = os.path.join(AUDIO_OUTPUT_DIR, filename)
-    if os.path.exists(file_path):
-        return send_file(file_path, mimetype='audio/wav')
-    return jsonify({"status": "error", "message": "Audio file not found"}), 404
+    """Serve generated audio files (ETag, immutable caching, Range requests)"""
+    from app.utils.file_serving import send_immutable_file
+    return send_immutable_file(
+        AUDIO_OUTPUT_DIR,
+        filename,
+        accel_prefix=current_app.config.get('AUDIO_ACCEL_REDIRECT_PREFIX') or None
+    )
+
+
+@live_ai_bp.route('/tts/batch', methods=['POST'])
+@jwt_required()
+def render_tts_batch_route():
+    """
+    Render many TTS items at once (admin only)
+    
+    Request body:
+    {
+        "items": [{"text": "...", "language": "ne-NP", "voice": "nova", "speed": 1.0}, ...],
+        "concurrency": 4  // Optional
+    }
+    """
+    from app.models.user import User
+    from app.utils.tts_batch import render_tts_batch, TTS_BATCH_MAX_ITEMS, SUPPORTED_AUDIO_FORMATS
+    
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role not in ['admin', 'super_admin']:
+        return jsonify({"status": "error", "message": "Not authorized"}), 403
+    
+    data = request.get_json() or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"status": "error", "message": "items must be a non-empty list"}), 400
+    if len(items) > TTS_BATCH_MAX_ITEMS:
+        return jsonify({"status": "error", "message": f"At most {TTS_BATCH_MAX_ITEMS} items per batch"}), 400
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({"status": "error", "message": "Each item must be an object"}), 400
+    for field in ('text', 'language', 'voice'):
+        if any(item.get(field) is not None and not isinstance(item[field], str) for item in items):
+            return jsonify({"status": "error", "message": f"Item {field} must be a string"}), 400
+    if any(item.get('format') and item.get('format') not in SUPPORTED_AUDIO_FORMATS for item in items):
+        return jsonify({"status": "error", "message": "Only mp3 output is supported"}), 400
+    
+    concurrency = data.get('concurrency')
+    if concurrency is not None:
+        try:
+            concurrency = max(1, min(int(concurrency), 8))
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "concurrency must be an integer"}), 400
+    
+    try:
+        result = render_tts_batch(items, concurrency=concurrency)
+    except Exception as e:
+        logger.error(f"Error rendering TTS batch: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    
+    server_url = request.url_root.rstrip('/')
+    for item in result['results']:
+        if item.get('url'):
+            item['url'] = f"{server_url}{item['url']}"
+    
+    return jsonify({"status": "success", **result})
 
 
 @live_ai_bp.route('/specialists', methods=['GET'])
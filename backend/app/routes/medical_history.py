@@ -1,16 +1,16 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import text
 import os
 import uuid
-import base64
 
 from app import db
 from app.models import (
     MedicalRecord, MedicalCondition, MedicalAllergy, MedicalMedication,
     MedicalDocument, MedicalDocumentImage, MedicalSurgery, MedicalVaccination,
-    User
+    DocumentAnalysisJob, User
 )
 
 medical_history_bp = Blueprint('medical_history', __name__)
@@ -394,9 +394,10 @@ def delete_medication(medication_id):
 @medical_history_bp.route('/documents', methods=['GET'])
 @jwt_required()
 def get_documents():
-    """Get user's medical documents"""
+    """Get user's medical documents (optionally searched by title/OCR text with ?q=)"""
     user_id = get_jwt_identity()
     doc_type = request.args.get('type')
+    search = (request.args.get('q') or '').strip()
     
     record = get_or_create_medical_record(user_id)
     query = record.documents
@@ -404,6 +405,20 @@ def get_documents():
     if doc_type:
         query = query.filter_by(document_type=doc_type)
     
+    if search:
+        if db.engine.dialect.name == 'mysql':
+            # Served by the ft_medical_documents_search FULLTEXT index
+            query = query.filter(text(
+                "MATCH (title, ocr_text, ai_summary) AGAINST (:search IN NATURAL LANGUAGE MODE)"
+            ).bindparams(search=search))
+        else:
+            pattern = f"%{search}%"
+            query = query.filter(db.or_(
+                MedicalDocument.title.ilike(pattern),
+                MedicalDocument.ocr_text.ilike(pattern),
+                MedicalDocument.ai_summary.ilike(pattern)
+            ))
+    
     documents = query.order_by(MedicalDocument.document_date.desc()).all()
     return jsonify([d.to_dict() for d in documents])
 
@@ -411,9 +426,10 @@ def get_documents():
 @medical_history_bp.route('/documents', methods=['POST'])
 @jwt_required()
 def add_document():
-    """Add a medical document with optional AI analysis"""
-    from app.utils.ai_image_service import analyze_document_for_storage
-    import base64
+    """Add a medical document; an attached image is analyzed by the job queue"""
+    from app.utils.image_ingest import spool_base64, prepare_for_vision, UploadTooLarge
+    from app.utils.ai_image_service import get_document_analysis_type
+    from app.utils.document_jobs import enqueue_document_analysis
     
     user_id = get_jwt_identity()
     data = request.get_json()
@@ -424,32 +440,24 @@ def add_document():
     
     # Check if image data is provided for AI analysis
     image_data = data.get('image_data')  # Base64 encoded image
-    ai_analysis = None
-    ai_summary = None
+    image_bytes = None
     
     if image_data:
         try:
-            # Decode base64 image and analyze with AI
-            image_bytes = base64.b64decode(image_data)
+            # Decode base64 image in chunks and downscale for the worker
             filename = data.get('filename', 'document.jpg')
-            
-            result = analyze_document_for_storage(
-                image_bytes=image_bytes,
-                filename=filename,
-                document_type=doc_type
-            )
-            
-            ai_analysis = result.get('ai_analysis')
-            ai_summary = result.get('ai_summary')
+            with spool_base64(
+                image_data, filename, max_bytes=current_app.config.get('MAX_IMAGE_UPLOAD_BYTES')
+            ) as upload:
+                stored = _store_original(upload)
+                image_bytes, mime_type = prepare_for_vision(
+                    upload, analysis_type=get_document_analysis_type(doc_type)
+                )
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
         except Exception as e:
-            print(f"[AI Analysis Error] {str(e)}")
-            # Fall back to demo analysis if AI fails
-            ai_analysis = DEMO_AI_ANALYSIS.get(doc_type, DEMO_AI_ANALYSIS['default'])
-            ai_summary = f"AI Analysis completed for {doc_type.replace('_', ' ').title()}"
-    else:
-        # No image provided, use demo analysis
-        ai_analysis = DEMO_AI_ANALYSIS.get(doc_type, DEMO_AI_ANALYSIS['default'])
-        ai_summary = f"AI Analysis completed for {doc_type.replace('_', ' ').title()}"
+            print(f"[Image Decode Error] {str(e)}")
+            return jsonify({'error': f'Invalid image data: {str(e)}'}), 400
     
     document = MedicalDocument(
         record_id=record.id,
@@ -463,16 +471,31 @@ def add_document():
         doctor_id=data.get('doctor_id'),
         file_url=data.get('file_url'),
         file_type=data.get('file_type'),
-        ai_analysis=ai_analysis,
-        ai_summary=ai_summary,
-        ai_analyzed_at=datetime.utcnow(),
         is_critical=data.get('is_critical', False)
     )
     
+    if not image_bytes:
+        # No image provided, use demo analysis
+        document.ai_analysis = DEMO_AI_ANALYSIS.get(doc_type, DEMO_AI_ANALYSIS['default'])
+        document.ai_summary = f"AI Analysis completed for {doc_type.replace('_', ' ').title()}"
+        document.ai_analyzed_at = datetime.utcnow()
+    
     db.session.add(document)
+    db.session.flush()
+    
+    if image_bytes:
+        _attach_original(document, stored)
+    else:
+        db.session.commit()
+        return jsonify({'message': 'Document added', 'document': document.to_dict()}), 201
+    
+    job = enqueue_document_analysis(
+        document, user_id, image_bytes, filename,
+        mime_type=mime_type, language=data.get('language', 'en')
+    )
     db.session.commit()
     
-    return jsonify({'message': 'Document added', 'document': document.to_dict()}), 201
+    return jsonify(_job_accepted_response('Document added, analysis queued', document, job)), 202
 
 
 @medical_history_bp.route('/documents/<int:document_id>', methods=['GET'])
@@ -483,7 +506,9 @@ def get_document(document_id):
     record = get_or_create_medical_record(user_id)
     document = MedicalDocument.query.filter_by(id=document_id, record_id=record.id).first_or_404()
     
-    return jsonify(document.to_dict(include_images=True))
+    data = document.to_dict(include_images=True)
+    data['ocr_text'] = document.ocr_text
+    return jsonify(data)
 
 
 @medical_history_bp.route('/documents/<int:document_id>', methods=['PUT'])
@@ -545,8 +570,10 @@ def add_document_image(document_id):
 @medical_history_bp.route('/documents/<int:document_id>/analyze', methods=['POST'])
 @jwt_required()
 def analyze_document_with_ai(document_id):
-    """Analyze document images with AI to extract and summarize information"""
-    from app.utils.ai_image_service import analyze_document_for_storage
+    """Queue AI analysis of a document image to extract and summarize information"""
+    from app.utils.image_ingest import spool_upload, prepare_for_vision, UploadTooLarge
+    from app.utils.ai_image_service import get_document_analysis_type
+    from app.utils.document_jobs import enqueue_document_analysis
     
     user_id = get_jwt_identity()
     record = get_or_create_medical_record(user_id)
@@ -558,35 +585,26 @@ def analyze_document_with_ai(document_id):
     image = request.files['image']
     
     try:
-        image_bytes = image.read()
+        with spool_upload(image, max_bytes=current_app.config.get('MAX_IMAGE_UPLOAD_BYTES')) as upload:
+            stored = _store_original(upload)
+            image_bytes, mime_type = prepare_for_vision(
+                upload, analysis_type=get_document_analysis_type(document.document_type)
+            )
         filename = image.filename or 'document_image.jpg'
+        _attach_original(document, stored)
         
-        # Analyze document image with AI
-        result = analyze_document_for_storage(
-            image_bytes=image_bytes,
-            filename=filename,
-            document_type=document.document_type
+        job = enqueue_document_analysis(
+            document, user_id, image_bytes, filename,
+            mime_type=mime_type, language=request.form.get('language', 'en')
         )
-        
-        # Update document with AI analysis
-        document.ai_analysis = result.get('ai_analysis')
-        document.ai_summary = result.get('ai_summary')
-        document.ai_analyzed_at = datetime.utcnow()
-        
-        if result.get('ocr_text'):
-            document.ocr_text = result['ocr_text']
-        
         db.session.commit()
         
-        return jsonify({
-            'message': 'Document analyzed successfully',
-            'analysis': result.get('ai_analysis'),
-            'summary': result.get('ai_summary'),
-            'success': result.get('analysis_success', False),
-            'document': document.to_dict()
-        })
+        return jsonify(_job_accepted_response('Document analysis queued', document, job)), 202
         
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e), 'success': False}), 413
     except Exception as e:
+        db.session.rollback()
         print(f"[Document Analysis Error] {str(e)}")
         return jsonify({
             'error': f'Analysis failed: {str(e)}',
@@ -597,8 +615,10 @@ def analyze_document_with_ai(document_id):
 @medical_history_bp.route('/documents/upload-and-analyze', methods=['POST'])
 @jwt_required()
 def upload_and_analyze_document():
-    """Upload a document image and analyze it in one step"""
-    from app.utils.ai_image_service import analyze_document_for_storage
+    """Upload a document image and queue its analysis in one step"""
+    from app.utils.image_ingest import spool_upload, prepare_for_vision, UploadTooLarge
+    from app.utils.ai_image_service import get_document_analysis_type
+    from app.utils.document_jobs import enqueue_document_analysis
     
     user_id = get_jwt_identity()
     record = get_or_create_medical_record(user_id)
@@ -616,16 +636,14 @@ def upload_and_analyze_document():
     is_critical = request.form.get('is_critical', 'false').lower() == 'true'
     
     try:
-        # Read and analyze image
-        image_bytes = image.read()
+        # Spool and downscale image for the worker
+        with spool_upload(image, max_bytes=current_app.config.get('MAX_IMAGE_UPLOAD_BYTES')) as upload:
+            stored = _store_original(upload)
+            image_bytes, mime_type = prepare_for_vision(
+                upload, analysis_type=get_document_analysis_type(document_type)
+            )
         filename = image.filename or 'document_image.jpg'
         
-        result = analyze_document_for_storage(
-            image_bytes=image_bytes,
-            filename=filename,
-            document_type=document_type
-        )
-        
         # Parse document date
         doc_date = datetime.utcnow().date()
         if document_date_str:
@@ -634,7 +652,7 @@ def upload_and_analyze_document():
             except:
                 pass
         
-        # Create document with AI analysis
+        # Create document; analysis fields are filled in by the job
         document = MedicalDocument(
             record_id=record.id,
             title=title,
@@ -643,23 +661,23 @@ def upload_and_analyze_document():
             document_date=doc_date,
             doctor_name=doctor_name,
             hospital_name=hospital_name,
-            ai_analysis=result.get('ai_analysis'),
-            ai_summary=result.get('ai_summary'),
-            ai_analyzed_at=datetime.utcnow(),
             is_critical=is_critical
         )
         
         db.session.add(document)
+        db.session.flush()
+        _attach_original(document, stored)
+        
+        job = enqueue_document_analysis(
+            document, user_id, image_bytes, filename,
+            mime_type=mime_type, language=request.form.get('language', 'en')
+        )
         db.session.commit()
         
-        return jsonify({
-            'message': 'Document uploaded and analyzed',
-            'document': document.to_dict(),
-            'analysis': result.get('ai_analysis'),
-            'summary': result.get('ai_summary'),
-            'success': result.get('analysis_success', False)
-        }), 201
+        return jsonify(_job_accepted_response('Document uploaded, analysis queued', document, job)), 202
         
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e), 'success': False}), 413
     except Exception as e:
         db.session.rollback()
         print(f"[Upload and Analyze Error] {str(e)}")
@@ -669,6 +687,84 @@ def upload_and_analyze_document():
         }), 500
 
 
+@medical_history_bp.route('/documents/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_document_analysis_job(job_id):
+    """Poll the status of a queued document analysis"""
+    user_id = get_jwt_identity()
+    job = DocumentAnalysisJob.query.filter_by(id=job_id, user_id=int(user_id)).first_or_404()
+    
+    response = {'job': job.to_dict(), 'status': job.status}
+    if job.status in ('completed', 'failed') and job.document:
+        response['document'] = job.document.to_dict()
+        response['analysis'] = job.document.ai_analysis
+        response['summary'] = job.document.ai_summary
+    elif job.status == 'queued':
+        response['retry_after'] = 5
+    return jsonify(response)
+
+
+def _store_original(upload):
+    """Keep the original upload in object storage (deduplicated by content hash)"""
+    from app.utils.storage import get_storage
+    
+    return get_storage().put_content_addressed(
+        upload.file, upload.extension, prefix='documents',
+        content_type=upload.mime_type, sha256=upload.sha256, size=upload.size
+    )
+
+
+def _attach_original(document, stored):
+    """Record a stored upload as the document's file and next page image"""
+    if not document.file_key:
+        document.file_key = stored.key
+        document.file_type = stored.content_type
+        document.file_size = stored.size
+    
+    db.session.add(MedicalDocumentImage(
+        document_id=document.id,
+        image_url=stored.key,
+        image_key=stored.key,
+        page_number=document.images.count() + 1
+    ))
+
+
+def _job_accepted_response(message, document, job):
+    """Body for a 202 response pointing the client at the job status endpoint"""
+    return {
+        'message': message,
+        'document': document.to_dict(),
+        'job_id': job.id,
+        'job': job.to_dict(),
+        'status': job.status,
+        'status_url': f"/api/medical-history/documents/jobs/{job.id}"
+    }
+
+
+# ==================== LAB RESULTS ====================
+
+@medical_history_bp.route('/lab-results/trends', methods=['GET'])
+@jwt_required()
+def get_lab_trends():
+    """Lab value trends per analyte (e.g. ?analytes=hba1c,hemoglobin&months=24)"""
+    from app.utils.lab_values import get_lab_trends as build_lab_trends
+    
+    user_id = get_jwt_identity()
+    analytes = [a.strip().lower() for a in request.args.get('analytes', '').split(',') if a.strip()]
+    
+    since = None
+    months = request.args.get('months', type=int)
+    if months:
+        since = (datetime.utcnow() - timedelta(days=months * 30)).date()
+    
+    trends = build_lab_trends(user_id, analytes=analytes or None, since=since)
+    return jsonify({
+        'trends': trends,
+        'analytes': sorted(trends.keys()),
+        'since': since.isoformat() if since else None
+    })
+
+
 # ==================== SURGERIES ====================
 
 @medical_history_bp.route('/surgeries', methods=['GET'])
@@ -761,6 +857,8 @@ def add_vaccination():
 @jwt_required()
 def get_ai_context():
     """Get medical history formatted for AI consultation context"""
+    from app.utils.lab_values import get_recent_abnormal_values, format_abnormal_values
+    
     user_id = get_jwt_identity()
     record = get_or_create_medical_record(user_id)
     user = User.query.get(user_id)
@@ -814,6 +912,11 @@ def get_ai_context():
     else:
         context += "- No documents uploaded\n"
     
+    abnormal_values = get_recent_abnormal_values(user_id)
+    if abnormal_values:
+        context += "\n**Recent Abnormal Lab Values:**\n"
+        context += f"- {format_abnormal_values(abnormal_values)}\n"
+    
     if record.emergency_notes:
         context += f"\n**Emergency Notes:**\n{record.emergency_notes}\n"
     
@@ -823,6 +926,7 @@ def get_ai_context():
             'conditions_count': record.conditions.filter_by(status='active').count(),
             'allergies_count': record.allergies.count(),
             'medications_count': record.medications.filter_by(is_active=True).count(),
-            'documents_count': record.documents.count()
+            'documents_count': record.documents.count(),
+            'abnormal_lab_values': abnormal_values
         }
     })
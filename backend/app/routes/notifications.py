@@ -5,36 +5,32 @@ Send user-based push notifications through OneSignal API
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import os
-import requests
 import json
 from app import db
 from app.models import User
+from app.utils.push import build_payload, post_notification
+from app.utils.notification_outbox import enqueue_notification
 
 notifications_bp = Blueprint('notifications', __name__)
 
-# OneSignal API Configuration
-ONESIGNAL_APP_ID = os.getenv('ONESIGNAL_APP_ID', '')
-ONESIGNAL_REST_API_KEY = os.getenv('ONESIGNAL_REST_API_KEY', '')
-ONESIGNAL_API_URL = 'https://onesignal.com/api/v1/notifications'
-
 
 def send_onesignal_notification(
     title: str,
     message: str,
-    user_ids: list = None,
     player_ids: list = None,
     segments: list = None,
     data: dict = None,
     url: str = None
 ) -> dict:
     """
-    Send push notification via OneSignal API
+    Send push notification via OneSignal API right away
+    
+    Only for sends whose response is needed inline (the test endpoint);
+    user-targeted notifications go through the outbox (enqueue_notification).
     
     Args:
         title: Notification title
         message: Notification body
-        user_ids: List of external user IDs (backend user IDs)
         player_ids: List of OneSignal player IDs
         segments: List of segments (e.g., ['All', 'Active Users'])
         data: Additional data payload
@@ -43,48 +39,22 @@ def send_onesignal_notification(
     Returns:
         Response from OneSignal API
     """
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Basic {ONESIGNAL_REST_API_KEY}'
-    }
-    
-    payload = {
-        'app_id': ONESIGNAL_APP_ID,
-        'headings': {'en': title},
-        'contents': {'en': message},
-    }
-    
-    # Target by external user IDs (recommended)
-    if user_ids:
-        payload['include_aliases'] = {'external_id': user_ids}
-        payload['target_channel'] = 'push'
-    # Target by player IDs
-    elif player_ids:
-        payload['include_player_ids'] = player_ids
-    # Target by segments
-    elif segments:
-        payload['included_segments'] = segments
-    else:
-        # Default to all subscribed users
-        payload['included_segments'] = ['Subscribed Users']
-    
-    # Add additional data
-    if data:
-        payload['data'] = data
-    
-    # Add deep link URL
-    if url:
-        payload['url'] = url
-    
-    try:
-        response = requests.post(
-            ONESIGNAL_API_URL,
-            headers=headers,
-            json=payload
-        )
-        return response.json()
-    except Exception as e:
-        return {'error': str(e)}
+    # Target by player IDs, segments, or default to all subscribed users
+    if not player_ids and not segments:
+        segments = ['Subscribed Users']
+    return post_notification(build_payload(
+        title, message, player_ids=player_ids, segments=segments, data=data, url=url
+    ))
+
+
+def _queued_response(rows, message: str):
+    """202 for notifications handed to the outbox dispatcher"""
+    db.session.commit()
+    return jsonify({
+        'status': 'queued',
+        'message': message,
+        'notification_ids': [row.id for row in rows]
+    }), 202
 
 
 @notifications_bp.route('', methods=['POST'])
@@ -128,24 +98,18 @@ def send_notification():
     if data.get('target_id'):
         notification_data['target_id'] = str(data['target_id'])
     
-    # Send notification
-    result = send_onesignal_notification(
+    # Queue notification
+    rows = enqueue_notification(
         title=title,
         message=message,
         user_ids=user_ids,
         player_ids=player_ids,
         segments=segments,
-        data=notification_data if notification_data else None
+        data=notification_data if notification_data else None,
+        source='api'
     )
     
-    if 'error' in result and 'errors' not in result:
-        return jsonify({'status': 'error', 'message': result['error']}), 500
-    
-    return jsonify({
-        'status': 'success',
-        'message': 'Notification sent',
-        'onesignal_response': result
-    })
+    return _queued_response(rows, 'Notification queued')
 
 
 @notifications_bp.route('/broadcast', methods=['POST'])
@@ -161,18 +125,15 @@ def broadcast_notification():
     
     segments = data.get('segments', ['Subscribed Users'])
     
-    result = send_onesignal_notification(
+    rows = enqueue_notification(
         title=data['title'],
         message=data['message'],
         segments=segments,
-        data=data.get('data')
+        data=data.get('data'),
+        source='api'
     )
     
-    return jsonify({
-        'status': 'success',
-        'message': 'Broadcast sent',
-        'onesignal_response': result
-    })
+    return _queued_response(rows, 'Broadcast queued')
 
 
 @notifications_bp.route('/appointment-reminder', methods=['POST'])
@@ -191,21 +152,18 @@ def send_appointment_reminder():
     if not user_id:
         return jsonify({'error': 'user_id is required'}), 400
     
-    result = send_onesignal_notification(
+    rows = enqueue_notification(
         title='📅 Appointment Reminder',
         message=f'Your appointment with {doctor_name} is scheduled for {appointment_time}',
         user_ids=[str(user_id)],
         data={
             'type': 'appointment',
             'target_id': str(appointment_id) if appointment_id else None
-        }
+        },
+        source='api'
     )
     
-    return jsonify({
-        'status': 'success',
-        'message': 'Reminder sent',
-        'onesignal_response': result
-    })
+    return _queued_response(rows, 'Reminder queued')
 
 
 @notifications_bp.route('/medicine-reminder', methods=['POST'])
@@ -223,21 +181,18 @@ def send_medicine_reminder():
     if not user_id:
         return jsonify({'error': 'user_id is required'}), 400
     
-    result = send_onesignal_notification(
+    rows = enqueue_notification(
         title='💊 Medicine Reminder',
         message=f"It's time to take {medicine_name}",
         user_ids=[str(user_id)],
         data={
             'type': 'reminder',
             'target_id': str(reminder_id) if reminder_id else None
-        }
+        },
+        source='api'
     )
     
-    return jsonify({
-        'status': 'success',
-        'message': 'Reminder sent',
-        'onesignal_response': result
-    })
+    return _queued_response(rows, 'Reminder queued')
 
 
 @notifications_bp.route('/health-alert', methods=['POST'])
@@ -254,7 +209,7 @@ def send_health_alert():
     segments = data.get('segments')  # Optional: segments
     alert_id = data.get('alert_id')
     
-    result = send_onesignal_notification(
+    rows = enqueue_notification(
         title=title,
         message=message,
         user_ids=[str(uid) for uid in user_ids] if user_ids else None,
@@ -262,14 +217,30 @@ def send_health_alert():
         data={
             'type': 'health_alert',
             'target_id': str(alert_id) if alert_id else None
-        }
+        },
+        source='api'
     )
     
-    return jsonify({
-        'status': 'success',
-        'message': 'Health alert sent',
-        'onesignal_response': result
-    })
+    return _queued_response(rows, 'Health alert queued')
+
+
+@notifications_bp.route('/<int:notification_id>', methods=['GET'])
+@jwt_required()
+def get_notification_status(notification_id):
+    """
+    Delivery status of a queued notification (admins, or a recipient of it)
+    """
+    from app.models.notification import NotificationOutbox
+    
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    notification = NotificationOutbox.query.get_or_404(notification_id)
+    
+    is_admin = user is not None and user.role in ['admin', 'super_admin']
+    if not is_admin and str(user_id) not in [str(uid) for uid in notification.user_ids or []]:
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    return jsonify(notification.to_dict())
 
 
 @notifications_bp.route('/register-device', methods=['POST'])
@@ -316,6 +287,7 @@ def test_notification():
     if not player_id:
         return jsonify({'error': 'player_id is required for test'}), 400
     
+    # Sent inline rather than queued, so the response shows OneSignal's answer
     result = send_onesignal_notification(
         title='🎉 Test Notification',
         message='OneSignal is working correctly with Swasthya!',
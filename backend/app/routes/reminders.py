@@ -28,8 +28,10 @@ def create_reminder():
         reminder_times=data.get('reminder_times', ['08:00']),
         instructions=data.get('instructions'),
         refill_reminder=data.get('refill_reminder', True),
-        critical_alert=data.get('critical_alert', False)
+        critical_alert=data.get('critical_alert', False),
+        days_of_week=data.get('days_of_week')
     )
+    reminder.sync_schedule_slots()
     
     db.session.add(reminder)
     db.session.commit()
@@ -102,12 +104,15 @@ def update_reminder(reminder_id):
     
     updatable = ['medicine_name', 'form', 'strength', 'unit', 'frequency', 
                  'times_per_day', 'reminder_times', 'instructions', 
-                 'refill_reminder', 'critical_alert', 'is_active']
+                 'refill_reminder', 'critical_alert', 'is_active', 'days_of_week']
     
     for field in updatable:
         if field in data:
             setattr(reminder, field, data[field])
     
+    if any(field in data for field in ('reminder_times', 'days_of_week', 'is_active')):
+        reminder.sync_schedule_slots()
+    
     db.session.commit()
     return jsonify(reminder.to_dict())
 
@@ -131,10 +136,11 @@ def mark_taken(reminder_id):
     reminder = MedicineReminder.query.filter_by(id=reminder_id, user_id=user_id).first_or_404()
     data = request.get_json()
     
+    now = datetime.utcnow()
     log = ReminderLog(
         reminder_id=reminder_id,
-        scheduled_time=datetime.now(),
-        taken_at=datetime.now(),
+        scheduled_time=now,
+        taken_at=now,
         is_taken=True
     )
     db.session.add(log)
@@ -8,6 +8,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
 from app.models.simulation import Simulation, SimulationStep, UserSimulationProgress
+from app.utils.file_serving import send_immutable_file
+from app.utils.simulation_voice_packs import (
+    SIMULATION_PACK_DIR, load_manifest, get_step_audio_urls
+)
 
 simulations_bp = Blueprint('simulations', __name__, url_prefix='/api/simulations')
 
@@ -71,11 +75,36 @@ def get_simulation(slug):
     if not simulation:
         return jsonify({'error': 'Simulation not found'}), 404
     
+    # Attach pre-rendered voice pack URLs (see utils/simulation_voice_packs.py)
+    manifest = load_manifest()
+    server_url = request.url_root.rstrip('/')
+    steps = []
+    for step in simulation.steps.all():
+        step_data = step.to_dict(lang=lang)
+        audio_urls = {
+            pack_lang: f"{server_url}{path}"
+            for pack_lang, path in get_step_audio_urls(simulation.slug, step, manifest).items()
+        }
+        step_data['audio_urls'] = audio_urls
+        if not step_data.get('audio_url'):
+            step_data['audio_url'] = audio_urls.get(lang)
+        steps.append(step_data)
+    
+    data = simulation.to_dict(lang=lang)
+    data['steps'] = steps
+    data['voice_pack_version'] = manifest.get('version')
+    
     return jsonify({
-        'simulation': simulation.to_dict(include_steps=True, lang=lang)
+        'simulation': data
     })
 
 
+@simulations_bp.route('/audio/<filename>', methods=['GET'])
+def serve_voice_pack_audio(filename):
+    """Serve a pre-rendered simulation narration clip"""
+    return send_immutable_file(SIMULATION_PACK_DIR, filename)
+
+
 @simulations_bp.route('/<int:sim_id>/start', methods=['POST'])
 @jwt_required()
 def start_simulation(sim_id):
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import pytz
 from app import db
 from app.models import User
 
@@ -20,11 +21,21 @@ def update_location():
     user = User.query.get(user_id)
     data = request.get_json()
     
+    timezone = data.get('timezone')
+    if timezone and timezone not in pytz.all_timezones_set:
+        return jsonify({'error': f'Unknown timezone: {timezone}'}), 400
+    
     user.latitude = data.get('latitude')
     user.longitude = data.get('longitude')
     user.city = data.get('city')
     user.province = data.get('province')
     
+    # Reminder times are local to the user's timezone, so moving reschedules them
+    if timezone and timezone != user.timezone:
+        user.timezone = timezone
+        for reminder in user.reminders:
+            reminder.sync_schedule_slots(timezone)
+    
     db.session.commit()
     return jsonify({'message': 'Location updated'})
 
@@ -3,9 +3,21 @@ AI Image Analysis Service using g4f
 Provides real image analysis for medical documents and skin conditions
 """
 import g4f
-import base64
 from flask import current_app
 
+from app.utils.image_ingest import MIME_TYPES, get_vision_profile, split_into_tiles
+from app.utils.ocr_service import OCR_ANALYSIS_TYPES, extract_text
+from app.utils.image_analysis_cache import (
+    IMAGE_ANALYSIS_CACHE_ENABLED, compute_image_sha256, compute_perceptual_hash,
+    get_prompt_key, get_cached_analysis, find_near_duplicate, store_analysis
+)
+
+# Bump when the analysis prompts change so cached results are not reused
+PROMPT_VERSION = '1'
+
+# OCR text beyond this is truncated before text-model analysis
+OCR_TEXT_MAX_CHARS = 8000
+
 
 def get_provider_class(provider_name: str):
     """Get the g4f provider class from string name"""
@@ -19,19 +31,22 @@ def get_provider_class(provider_name: str):
     except Exception:
         return None
 
-def analyze_medical_image(image_bytes: bytes, filename: str, analysis_type: str = 'general', context: str = '', language: str = 'en') -> dict:
+def analyze_medical_image(image_bytes: bytes, filename: str, analysis_type: str = 'general', context: str = '', language: str = 'en', mime_type: str = None, user_id: int = None, use_cache: bool = True) -> dict:
     """
     Analyze a medical image using g4f
     
     Args:
-        image_bytes: The image file bytes
+        image_bytes: The image file bytes (ideally already downscaled, see image_ingest)
         filename: Original filename
         analysis_type: Type of analysis (skin, document, xray, etc.)
         context: Additional context about the image
         language: Response language ('en' for English, 'ne' for Nepali, etc.)
+        mime_type: Image mime type (guessed from filename if not given)
+        user_id: Uploader, used to flag near-duplicate uploads
+        use_cache: Reuse a stored analysis of the exact same image and prompt
     
     Returns:
-        dict with analysis results
+        dict with analysis results ('cached' / 'near_duplicate' describe cache use)
     """
     
     # Language instruction
@@ -92,84 +107,96 @@ Include appropriate medical disclaimers in your response.{lang_instruction}"""
     
     prompt = prompts.get(analysis_type, prompts['general'])
     
+    # Repeat uploads (app retries, the same photo twice) are answered from the cache
+    cache_keys = None
+    if use_cache and IMAGE_ANALYSIS_CACHE_ENABLED:
+        try:
+            cache_keys = {
+                'image_sha256': compute_image_sha256(image_bytes),
+                'prompt_key': get_prompt_key(prompt, analysis_type, language, PROMPT_VERSION)
+            }
+            cached = get_cached_analysis(cache_keys['image_sha256'], cache_keys['prompt_key'])
+            if cached:
+                print(f"[AI Image Service] Cache hit for {cache_keys['image_sha256'][:12]} ({analysis_type})")
+                ocr_text, ocr_confidence = cached.ocr_text, cached.ocr_confidence
+                # Entries stored before OCR was recorded: OCR locally, it is still cheap
+                if ocr_confidence is None and analysis_type in OCR_ANALYSIS_TYPES:
+                    ocr_result = extract_text(image_bytes, language)
+                    if ocr_result:
+                        ocr_text = ocr_result.text if ocr_result.text.strip() else None
+                        ocr_confidence = round(ocr_result.confidence, 1)
+                return {
+                    'success': True,
+                    'analysis': cached.analysis,
+                    'analysis_type': analysis_type,
+                    'model': cached.model,
+                    'cached': True,
+                    'cache_id': cached.id,
+                    'near_duplicate': None,
+                    'ocr_text': ocr_text,
+                    'ocr_confidence': ocr_confidence
+                }
+        except Exception as cache_err:
+            print(f"[AI Image Service] Cache lookup failed: {cache_err}")
+            cache_keys = None
+    
     try:
-        # Convert image to base64 for the prompt
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
         # Determine image type from filename
-        ext = filename.lower().split('.')[-1] if '.' in filename else 'jpg'
-        mime_type = {
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'webp': 'image/webp'
-        }.get(ext, 'image/jpeg')
+        if not mime_type:
+            ext = filename.lower().split('.')[-1] if '.' in filename else 'jpg'
+            mime_type = MIME_TYPES.get(ext, 'image/jpeg')
         
         print(f"[AI Image Service] Sending request...")
         print(f"[AI Image Service] Analysis type: {analysis_type}")
         print(f"[AI Image Service] Image size: {len(image_bytes)} bytes")
         
-        # Get provider and model from config
-        provider_name = current_app.config.get('AI_IMAGE_ANALYSIS_PROVIDER', 'DeepInfra')
-        model_name = current_app.config.get('AI_IMAGE_ANALYSIS_MODEL', 'meta-llama/Llama-3.2-90B-Vision-Instruct')
-        provider_class = get_provider_class(provider_name)
+        # Local OCR first: documents that read cleanly go to the cheaper text model
+        analysis_text = None
+        ocr_result = None
+        if analysis_type in OCR_ANALYSIS_TYPES:
+            ocr_result = extract_text(image_bytes, language)
+            if ocr_result and ocr_result.is_sufficient:
+                analysis_text = analyze_document_text(ocr_result.text, prompt)
+                model_used = 'ocr-text'
         
-        print(f"[AI Image Service] Using provider: {provider_name}, model: {model_name}")
+        if analysis_text is None:
+            analysis_text, model_used = _analyze_with_vision(image_bytes, filename, prompt, context, analysis_type)
         
-        # Try using configured provider
-        try:
-            from g4f.client import Client
-            
-            data_url = f"data:{mime_type};base64,{image_base64}"
-            
-            # Use Client pattern
-            client = Client(provider=provider_class) if provider_class else Client()
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=[{"role": "user", "content": prompt}],
-                image=data_url,
-                web_search=False
+        print(f"[AI Image Service] Success! Analysis length: {len(analysis_text)} chars")
+        ocr_text = ocr_result.text if ocr_result and ocr_result.text.strip() else None
+        ocr_confidence = round(ocr_result.confidence, 1) if ocr_result else None
+        
+        # Only answers that actually read the image are worth reusing
+        near_duplicate = None
+        if cache_keys and model_used in ('g4f-vision', 'ocr-text'):
+            perceptual_hash = compute_perceptual_hash(image_bytes)
+            near_duplicate = find_near_duplicate(
+                perceptual_hash, analysis_type, user_id,
+                exclude_sha256=cache_keys['image_sha256']
             )
-            
-            print(f"[AI Image Service] Response received")
-            analysis_text = response.choices[0].message.content
-                
-        except Exception as primary_err:
-            print(f"[AI Image Service] Primary failed: {primary_err}, trying text-only fallback")
-            
-            from g4f.client import Client
-            from g4f import Provider
-            
-            # Fallback: Use text-only analysis with working DeepInfra model
-            fallback_prompt = f"""Based on the user's description, provide medical guidance.
-
-User says: {context if context else 'User uploaded a medical image for analysis'}
-
-Analysis type requested: {analysis_type}
-
-{prompt}
-
-Note: I cannot see the actual image, so I'm providing general guidance based on the description provided. For accurate diagnosis, please consult a healthcare professional who can examine you in person."""
-
-            fallback_model = current_app.config.get('AI_CHAT_MODEL', 'meta-llama/Llama-3.3-70B-Instruct')
-            
-            client = Client(provider=Provider.DeepInfra)
-            response = client.chat.completions.create(
-                model=fallback_model,
-                messages=[{"role": "user", "content": fallback_prompt}],
-                web_search=False
+            store_analysis(
+                image_sha256=cache_keys['image_sha256'],
+                perceptual_hash=perceptual_hash,
+                prompt_key=cache_keys['prompt_key'],
+                analysis_type=analysis_type,
+                language=language,
+                prompt_version=PROMPT_VERSION,
+                analysis=analysis_text,
+                model=model_used,
+                user_id=user_id,
+                ocr_text=ocr_text,
+                ocr_confidence=ocr_confidence
             )
-            
-            analysis_text = response.choices[0].message.content
-        
-        print(f"[AI Image Service] Success! Analysis length: {len(analysis_text)} chars")
         
         return {
             'success': True,
             'analysis': analysis_text,
             'analysis_type': analysis_type,
-            'model': 'g4f-vision'
+            'model': model_used,
+            'cached': False,
+            'near_duplicate': near_duplicate,
+            'ocr_text': ocr_text,
+            'ocr_confidence': ocr_confidence
         }
         
     except Exception as e:
@@ -185,6 +212,130 @@ Note: I cannot see the actual image, so I'm providing general guidance based on
         }
 
 
+def _analyze_with_vision(image_bytes: bytes, filename: str, prompt: str, context: str, analysis_type: str):
+    """
+    Vision-model analysis, falling back to a text-only answer from the context
+
+    Returns:
+        (analysis text, model label)
+    """
+    # Get provider and model from config
+    provider_name = current_app.config.get('AI_IMAGE_ANALYSIS_PROVIDER', 'DeepInfra')
+    model_name = current_app.config.get('AI_IMAGE_ANALYSIS_MODEL', 'meta-llama/Llama-3.2-90B-Vision-Instruct')
+    provider_class = get_provider_class(provider_name)
+    
+    print(f"[AI Image Service] Using provider: {provider_name}, model: {model_name}")
+    
+    # Try using configured provider
+    try:
+        from g4f.client import Client
+        
+        # Large documents go as an overview plus overlapping tiles so
+        # small print survives; everything else as a single image
+        profile = get_vision_profile(analysis_type)
+        overview, tiles = (None, [])
+        if profile['tile_size']:
+            overview, tiles = split_into_tiles(image_bytes, profile['tile_size'])
+        
+        # Pass raw bytes - g4f builds the provider payload itself, so we
+        # never hold a separate base64 string / data URL copy
+        client = Client(provider=provider_class) if provider_class else Client()
+        if tiles:
+            print(f"[AI Image Service] Sending overview + {len(tiles)} tiles")
+            tiled_prompt = (
+                f"{prompt}\n\nThe first image is the whole page; the next {len(tiles)} images "
+                f"are overlapping close-ups of it in reading order (left to right, top to bottom)."
+            )
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": tiled_prompt}],
+                images=[[overview, f"overview_{filename}"]] + [
+                    [tile, f"tile{index + 1}_{filename}"] for index, tile in enumerate(tiles)
+                ],
+                web_search=False
+            )
+        else:
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                image=image_bytes,
+                image_name=filename,
+                web_search=False
+            )
+        
+        print(f"[AI Image Service] Response received")
+        analysis_text = response.choices[0].message.content
+        model_used = 'g4f-vision'
+            
+    except Exception as primary_err:
+        print(f"[AI Image Service] Primary failed: {primary_err}, trying text-only fallback")
+        
+        from g4f.client import Client
+        from g4f import Provider
+        
+        # Fallback: Use text-only analysis with working DeepInfra model
+        fallback_prompt = f"""Based on the user's description, provide medical guidance.
+
+User says: {context if context else 'User uploaded a medical image for analysis'}
+
+Analysis type requested: {analysis_type}
+
+{prompt}
+
+Note: I cannot see the actual image, so I'm providing general guidance based on the description provided. For accurate diagnosis, please consult a healthcare professional who can examine you in person."""
+
+        fallback_model = current_app.config.get('AI_CHAT_MODEL', 'meta-llama/Llama-3.3-70B-Instruct')
+        
+        client = Client(provider=Provider.DeepInfra)
+        response = client.chat.completions.create(
+            model=fallback_model,
+            messages=[{"role": "user", "content": fallback_prompt}],
+            web_search=False
+        )
+        
+        analysis_text = response.choices[0].message.content
+        model_used = 'g4f-text-fallback'
+    
+    return analysis_text, model_used
+
+
+def analyze_document_text(ocr_text: str, prompt: str):
+    """
+    Analyze OCR-extracted document text with the (cheaper) text analysis model
+
+    Returns:
+        Analysis text, or None if every model failed
+    """
+    from g4f.client import Client
+    
+    text_prompt = f"""{prompt}
+
+The document was read with OCR. Its text is below (OCR may contain minor errors):
+---
+{ocr_text[:OCR_TEXT_MAX_CHARS]}
+---"""
+    
+    provider_class = get_provider_class(current_app.config.get('AI_DEFAULT_PROVIDER', 'DeepInfra'))
+    models = [current_app.config.get('AI_ANALYSIS_MODEL', 'deepseek-ai/DeepSeek-V3')]
+    models += [m.strip() for m in current_app.config.get('AI_ANALYSIS_MODEL_FALLBACKS', []) if m.strip()]
+    
+    client = Client(provider=provider_class) if provider_class else Client()
+    for model in models:
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": text_prompt}],
+                web_search=False
+            )
+            content = response.choices[0].message.content
+            if content:
+                print(f"[AI Image Service] OCR text analyzed with {model}")
+                return content
+        except Exception as e:
+            print(f"[AI Image Service] Text analysis with {model} failed: {e}")
+    return None
+
+
 def get_fallback_analysis(analysis_type: str) -> str:
     """Return fallback analysis text when AI service is unavailable"""
     
@@ -235,34 +386,43 @@ Your image has been saved to your medical records for future reference.
     return fallbacks.get(analysis_type, fallbacks['general'])
 
 
-def analyze_document_for_storage(image_bytes: bytes, filename: str, document_type: str) -> dict:
+# Map document types to analysis types
+DOCUMENT_ANALYSIS_TYPES = {
+    'lab_report': 'lab_report',
+    'blood_test': 'lab_report',
+    'xray': 'xray',
+    'mri': 'xray',
+    'ct_scan': 'xray',
+    'ultrasound': 'xray',
+    'ecg': 'document',
+    'prescription': 'document',
+    'discharge_summary': 'document',
+    'pathology': 'lab_report',
+}
+
+
+def get_document_analysis_type(document_type: str) -> str:
+    """Analysis type (and vision profile) used for a medical document type"""
+    return DOCUMENT_ANALYSIS_TYPES.get(document_type, 'document')
+
+
+def analyze_document_for_storage(image_bytes: bytes, filename: str, document_type: str, mime_type: str = None, user_id: int = None, language: str = 'en') -> dict:
     """
     Analyze a medical document and extract key information for storage
     
     Returns structured data for database storage
     """
     
-    # Map document types to analysis types
-    doc_type_mapping = {
-        'lab_report': 'lab_report',
-        'blood_test': 'lab_report',
-        'xray': 'xray',
-        'mri': 'xray',
-        'ct_scan': 'xray',
-        'ultrasound': 'xray',
-        'ecg': 'document',
-        'prescription': 'document',
-        'discharge_summary': 'document',
-        'pathology': 'lab_report',
-    }
-    
-    analysis_type = doc_type_mapping.get(document_type, 'document')
+    analysis_type = get_document_analysis_type(document_type)
     
     result = analyze_medical_image(
         image_bytes=image_bytes,
         filename=filename,
         analysis_type=analysis_type,
-        context=f"Document type: {document_type}"
+        context=f"Document type: {document_type}",
+        language=language,
+        mime_type=mime_type,
+        user_id=user_id
     )
     
     analysis_text = result.get('analysis', '')
@@ -274,6 +434,8 @@ def analyze_document_for_storage(image_bytes: bytes, filename: str, document_typ
     return {
         'ai_analysis': analysis_text,
         'ai_summary': summary,
-        'ocr_text': None,  # Could add OCR integration later
-        'analysis_success': result.get('success', False)
+        'ocr_text': result.get('ocr_text'),
+        'analysis_success': result.get('success', False),
+        'cached': result.get('cached', False),
+        'near_duplicate': result.get('near_duplicate')
     }
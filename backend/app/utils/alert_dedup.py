@@ -0,0 +1,104 @@
+"""
+Alert Dedup Store for Swasthya
+Persistent "already notified" markers (alert_dedup table) that alert
+handlers use for their cooldowns, so suppression survives cron_runner.py
+restarts and is shared by every host:
+
+- sent_keys() answers "already sent?" for a whole list of keys in a few
+  IN queries
+- not_sent_clause() does the same inside a SQL query, so an audience can be
+  selected without the users already notified
+- mark_sent() adds/extends markers in the caller's session, so they are
+  committed together with the queued notifications
+"""
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Set
+
+from sqlalchemy import delete
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN (...) lookup
+ALERT_DEDUP_LOOKUP_BATCH = int(os.getenv('ALERT_DEDUP_LOOKUP_BATCH', '1000'))
+
+_last_purge = {'at': 0.0}
+
+
+def sent_keys(scope: str, keys: Iterable[str]) -> Set[str]:
+    """The subset of keys with an unexpired marker in scope"""
+    from app.models.notification import AlertDedup
+
+    keys = list(dict.fromkeys(str(key) for key in keys))
+    now = datetime.utcnow()
+    found = set()
+    for i in range(0, len(keys), ALERT_DEDUP_LOOKUP_BATCH):
+        found.update(row[0] for row in db.session.query(AlertDedup.key).filter(
+            AlertDedup.scope == scope,
+            AlertDedup.key.in_(keys[i:i + ALERT_DEDUP_LOOKUP_BATCH]),
+            AlertDedup.expires_at > now
+        ))
+    return found
+
+
+def not_sent_clause(scope: str, key_expr):
+    """
+    SQL condition that is true when key_expr (e.g. db.cast(User.id, db.String))
+    has no unexpired marker in scope
+    """
+    from app.models.notification import AlertDedup
+
+    return ~db.session.query(AlertDedup.id).filter(
+        AlertDedup.scope == scope,
+        AlertDedup.key == key_expr,
+        AlertDedup.expires_at > datetime.utcnow()
+    ).exists()
+
+
+def mark_sent(scope: str, keys: Iterable[str], ttl: timedelta):
+    """
+    Record keys as notified until now + ttl (the caller commits)
+
+    Existing markers, expired or not, are extended with one bulk UPDATE;
+    the rest are inserted.
+    """
+    from app.models.notification import AlertDedup
+
+    keys = list(dict.fromkeys(str(key) for key in keys))
+    if not keys:
+        return
+    expires_at = datetime.utcnow() + ttl
+    for i in range(0, len(keys), ALERT_DEDUP_LOOKUP_BATCH):
+        batch = keys[i:i + ALERT_DEDUP_LOOKUP_BATCH]
+        existing = {row[0] for row in db.session.query(AlertDedup.key).filter(
+            AlertDedup.scope == scope,
+            AlertDedup.key.in_(batch)
+        )}
+        if existing:
+            AlertDedup.query.filter(
+                AlertDedup.scope == scope,
+                AlertDedup.key.in_(existing)
+            ).update({'expires_at': expires_at}, synchronize_session=False)
+        db.session.add_all(
+            AlertDedup(scope=scope, key=key, expires_at=expires_at)
+            for key in batch if key not in existing
+        )
+    _purge_expired()
+
+
+def _purge_expired():
+    """Drop expired markers (in the caller's transaction), at most once an hour per process"""
+    from app.models.notification import AlertDedup
+
+    if time.time() - _last_purge['at'] < 3600:
+        return
+    _last_purge['at'] = time.time()
+
+    table = AlertDedup.__table__
+    deleted = db.session.execute(delete(table).where(table.c.expires_at <= datetime.utcnow())).rowcount
+    if deleted:
+        logger.info(f"Purged {deleted} expired alert dedup markers")
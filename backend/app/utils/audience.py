@@ -0,0 +1,130 @@
+"""
+Push Audience Resolution for Swasthya
+Finds the users an alert should go to without loading User objects: a
+projection of users.id over the indexed city_key/province_key or geohash
+columns, read in keyset-paginated chunks sized for one outbox row /
+OneSignal call.
+"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app import db
+from app.models.user import User, normalize_location_key
+from app.utils.geo import covering_cells, haversine_km
+from app.utils.push import ONESIGNAL_MAX_EXTERNAL_IDS
+
+
+def push_audience_filters(city: Optional[str] = None, province: Optional[str] = None) -> list:
+    """
+    Filters for active users with push enabled in a city, else a province,
+    else everywhere
+
+    A city/province that normalizes to no key matches nobody (comparing with
+    None would compile to IS NULL and match every user without a key).
+    """
+    filters = [User.is_active == True, User.notification_push == True]
+    if city or province:
+        column = User.city_key if city else User.province_key
+        key = normalize_location_key(city or province)
+        filters.append(column == key if key is not None else db.false())
+    return filters
+
+
+def _iter_rows(filters: list, chunk_size: int):
+    """Keyset-paginated `id > last_id ORDER BY id LIMIT n` reads of users.id"""
+    last_id = 0
+    while True:
+        rows = db.session.query(User.id).filter(
+            *filters, User.id > last_id
+        ).order_by(User.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _iter_cell_rows(cell: str, filters: list, chunk_size: int):
+    """
+    Users whose geohash starts with `cell`, paginated on (geohash, id) so each
+    page is a contiguous read of the geohash index
+    """
+    cell_filter = User.geohash.like(f'{cell}%') if cell else User.geohash.isnot(None)
+    last = None
+    while True:
+        query = db.session.query(User.id, User.latitude, User.longitude, User.geohash).filter(
+            *filters, cell_filter
+        )
+        if last:
+            query = query.filter(db.or_(
+                User.geohash > last[0],
+                db.and_(User.geohash == last[0], User.id > last[1])
+            ))
+        rows = query.order_by(User.geohash, User.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1][3], rows[-1][0])
+
+
+def iter_audience_ids(
+    city: Optional[str] = None,
+    province: Optional[str] = None,
+    chunk_size: int = None
+) -> Iterator[List[int]]:
+    """
+    Yield the matching user IDs in ascending chunks
+
+    Memory stays bounded by chunk_size however large the audience is.
+    """
+    chunk_size = chunk_size or ONESIGNAL_MAX_EXTERNAL_IDS
+    for rows in _iter_rows(push_audience_filters(city, province), chunk_size):
+        yield [row[0] for row in rows]
+
+
+def iter_radius_audience_ids(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    fallback_city: Optional[str] = None,
+    chunk_size: int = None,
+    exclude_closer_to: Iterable[Tuple[float, float]] = ()
+) -> Iterator[List[int]]:
+    """
+    Yield IDs of push-enabled users within radius_km of a point, in chunks
+
+    Candidates come from a few geohash prefix range scans covering the
+    circle and are then filtered by exact distance. With fallback_city,
+    users in that city who never shared coordinates are included as well.
+    Users strictly closer to one of exclude_closer_to's (lat, lon) points
+    are left out, so overlapping areas each reach only their nearest users.
+    """
+    chunk_size = chunk_size or ONESIGNAL_MAX_EXTERNAL_IDS
+    others = list(exclude_closer_to)
+    base_filters = push_audience_filters()
+    buffer = []
+    for cell in sorted(covering_cells(latitude, longitude, radius_km)):
+        for rows in _iter_cell_rows(cell, base_filters, chunk_size):
+            for user_id, lat, lon, _ in rows:
+                distance = haversine_km(latitude, longitude, lat, lon)
+                if distance <= radius_km and not any(
+                    haversine_km(other_lat, other_lon, lat, lon) < distance
+                    for other_lat, other_lon in others
+                ):
+                    buffer.append(user_id)
+            while len(buffer) >= chunk_size:
+                yield buffer[:chunk_size]
+                buffer = buffer[chunk_size:]
+
+    if fallback_city:
+        filters = push_audience_filters(city=fallback_city) + [User.geohash.is_(None)]
+        for rows in _iter_rows(filters, chunk_size):
+            buffer.extend(row[0] for row in rows)
+            while len(buffer) >= chunk_size:
+                yield buffer[:chunk_size]
+                buffer = buffer[chunk_size:]
+
+    if buffer:
+        yield buffer
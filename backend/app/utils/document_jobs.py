@@ -0,0 +1,281 @@
+"""
+Document Analysis Job Queue for Swasthya
+DB-backed queue that moves the vision-LLM call (and its text-only fallback
+chain) out of the upload request. Uploads enqueue a job and return 202; a
+local worker pool claims jobs, runs the analysis and fills in
+MedicalDocument.ai_analysis / ai_summary.
+
+Workers run from the cron scheduler (DocumentAnalysisHandler) or as a
+long-running process: python cron_runner.py --analysis-worker
+"""
+import os
+import uuid
+import socket
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Parallel analyses per worker process
+ANALYSIS_WORKERS = int(os.getenv('DOCUMENT_ANALYSIS_WORKERS', '2'))
+
+# Max jobs processed per cron tick
+ANALYSIS_JOBS_PER_RUN = int(os.getenv('DOCUMENT_ANALYSIS_JOBS_PER_RUN', '10'))
+
+# A running job older than this is considered abandoned and requeued
+ANALYSIS_JOB_TIMEOUT_SECONDS = int(os.getenv('DOCUMENT_ANALYSIS_JOB_TIMEOUT', '600'))
+
+# Base delay for retry backoff (doubles each attempt)
+ANALYSIS_RETRY_BASE_SECONDS = int(os.getenv('DOCUMENT_ANALYSIS_RETRY_SECONDS', '30'))
+
+ANALYSIS_PENDING_SUMMARY = "AI analysis in progress"
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue_document_analysis(document, user_id: int, image_bytes: bytes, filename: str,
+                              mime_type: str = 'image/jpeg', language: str = 'en'):
+    """
+    Store the (already downscaled) image and queue its analysis
+
+    The input goes to object storage so any worker node can pick up the job.
+    The caller commits the session.
+    """
+    from app.models.medical_history import DocumentAnalysisJob
+    from app.utils.storage import get_storage
+
+    input_path = f"analysis_jobs/{uuid.uuid4().hex}.img"
+    get_storage().put_bytes(input_path, image_bytes, mime_type)
+
+    document.ai_summary = ANALYSIS_PENDING_SUMMARY
+
+    job = DocumentAnalysisJob(
+        document_id=document.id,
+        user_id=int(user_id),
+        status='queued',
+        input_path=input_path,
+        filename=filename,
+        mime_type=mime_type,
+        document_type=document.document_type,
+        language=language,
+        run_after=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """Put jobs whose worker died back on the queue"""
+    from app.models.medical_history import DocumentAnalysisJob
+
+    cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_TIMEOUT_SECONDS)
+    count = DocumentAnalysisJob.query.filter(
+        DocumentAnalysisJob.status == 'running',
+        DocumentAnalysisJob.locked_at < cutoff
+    ).update({'status': 'queued', 'worker_id': None, 'locked_at': None}, synchronize_session=False)
+    db.session.commit()
+    if count:
+        logger.warning(f"Requeued {count} stale document analysis jobs")
+    return count
+
+
+def claim_jobs(limit: int, worker_id: Optional[str] = None) -> List[int]:
+    """
+    Atomically claim up to `limit` runnable jobs
+
+    Each claim is a conditional UPDATE on status='queued', so two workers can
+    never pick up the same job.
+    """
+    from app.models.medical_history import DocumentAnalysisJob
+
+    worker_id = worker_id or get_worker_id()
+    now = datetime.utcnow()
+
+    candidate_ids = [
+        row[0] for row in db.session.query(DocumentAnalysisJob.id).filter(
+            DocumentAnalysisJob.status == 'queued',
+            DocumentAnalysisJob.run_after <= now
+        ).order_by(DocumentAnalysisJob.id).limit(limit * 2).all()
+    ]
+
+    claimed = []
+    for job_id in candidate_ids:
+        updated = DocumentAnalysisJob.query.filter_by(id=job_id, status='queued').update({
+            'status': 'running',
+            'worker_id': worker_id,
+            'locked_at': now,
+            'started_at': now,
+            'attempts': DocumentAnalysisJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            claimed.append(job_id)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def process_job(job_id: int) -> str:
+    """
+    Run one claimed job (inside an app context)
+
+    Returns:
+        Final job status ('completed', 'queued' for retry, or 'failed')
+    """
+    from app.models.medical_history import DocumentAnalysisJob, MedicalDocument
+    from app.utils.ai_image_service import analyze_document_for_storage
+    from app.utils.lab_values import LAB_DOCUMENT_TYPES, store_document_lab_values
+
+    job = DocumentAnalysisJob.query.get(job_id)
+    if not job:
+        return 'missing'
+
+    try:
+        image_bytes = _read_input(job.input_path)
+
+        result = analyze_document_for_storage(
+            image_bytes=image_bytes,
+            filename=job.filename or 'document.jpg',
+            document_type=job.document_type,
+            mime_type=job.mime_type,
+            user_id=job.user_id,
+            language=job.language or 'en'
+        )
+        del image_bytes
+
+        is_last_attempt = job.attempts >= job.max_attempts
+        if not result.get('analysis_success') and not is_last_attempt:
+            raise RuntimeError("Vision analysis unavailable, will retry")
+
+        document = MedicalDocument.query.get(job.document_id)
+        if document:
+            document.ai_analysis = result.get('ai_analysis')
+            document.ai_summary = result.get('ai_summary')
+            document.ai_analyzed_at = datetime.utcnow()
+            if result.get('ocr_text'):
+                document.ocr_text = result['ocr_text']
+            if result.get('analysis_success') and document.document_type in LAB_DOCUMENT_TYPES:
+                try:
+                    store_document_lab_values(document, job.user_id)
+                except Exception as e:
+                    logger.warning(f"Lab value extraction failed for document {document.id}: {e}")
+
+        job.status = 'completed'
+        job.error = None if result.get('analysis_success') else 'Stored fallback analysis'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        _remove_input(job.input_path)
+        logger.info(f"Document analysis job {job_id} completed")
+        return job.status
+
+    except Exception as e:
+        db.session.rollback()
+        job = DocumentAnalysisJob.query.get(job_id)
+        job.error = str(e)
+        job.worker_id = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            document = MedicalDocument.query.get(job.document_id)
+            if document and document.ai_summary == ANALYSIS_PENDING_SUMMARY:
+                document.ai_summary = "AI analysis unavailable. Please try again later."
+            _remove_input(job.input_path)
+            logger.error(f"Document analysis job {job_id} failed: {e}")
+        else:
+            delay = ANALYSIS_RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Document analysis job {job_id} attempt {job.attempts} failed: {e}. Retry in {delay}s")
+        db.session.commit()
+        return job.status
+
+
+def _read_input(path: str) -> bytes:
+    from app.utils.storage import get_storage
+
+    # Jobs queued before object storage hold an absolute local path
+    if os.path.isabs(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return get_storage().read_bytes(path)
+
+
+def _remove_input(path: Optional[str]):
+    from app.utils.storage import get_storage
+
+    if not path:
+        return
+    try:
+        if os.path.isabs(path):
+            os.remove(path)
+        else:
+            get_storage().delete(path)
+    except Exception as e:
+        logger.warning(f"Could not remove job input {path}: {e}")
+
+
+def _process_in_context(app, job_id: int) -> str:
+    with app.app_context():
+        try:
+            return process_job(job_id)
+        finally:
+            db.session.remove()
+
+
+def run_pending_jobs(app, max_jobs: int = None, workers: int = None) -> dict:
+    """
+    Claim and process up to max_jobs jobs on a thread pool
+
+    Each thread gets its own app context (and therefore its own DB session).
+    """
+    max_jobs = max_jobs or ANALYSIS_JOBS_PER_RUN
+    workers = workers or ANALYSIS_WORKERS
+
+    with app.app_context():
+        requeue_stale_jobs()
+        job_ids = claim_jobs(max_jobs)
+
+    counts = {'claimed': len(job_ids), 'completed': 0, 'retry': 0, 'failed': 0}
+    if not job_ids:
+        return counts
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='doc-analysis') as pool:
+        for status in pool.map(lambda job_id: _process_in_context(app, job_id), job_ids):
+            if status == 'completed':
+                counts['completed'] += 1
+            elif status == 'queued':
+                counts['retry'] += 1
+            else:
+                counts['failed'] += 1
+    return counts
+
+
+def run_worker(app, workers: int = None, poll_interval: float = 5.0):
+    """
+    Long-running worker loop; stops cleanly on SIGINT/SIGTERM
+    """
+    workers = workers or ANALYSIS_WORKERS
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        logger.info(f"Signal {signum} received, finishing current jobs...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    logger.info(f"Document analysis worker started ({workers} threads)")
+    while not stop.is_set():
+        counts = run_pending_jobs(app, max_jobs=workers, workers=workers)
+        if counts['claimed'] == 0:
+            stop.wait(poll_interval)
+    logger.info("Document analysis worker stopped")
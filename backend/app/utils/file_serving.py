@@ -0,0 +1,107 @@
+"""
+Static File Serving Helpers for Swasthya
+Serves generated media (TTS audio, rendered packs) with correct content types,
+strong content-hash ETags, immutable caching, HTTP Range support and optional
+X-Accel-Redirect / X-Sendfile offload to the front web server.
+"""
+import os
+import hashlib
+import logging
+import mimetypes
+from functools import lru_cache
+from typing import Optional
+
+from flask import current_app, jsonify, make_response, request, send_file
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Audio types that mimetypes does not always know about on minimal images
+mimetypes.add_type('audio/mpeg', '.mp3')
+mimetypes.add_type('audio/wav', '.wav')
+mimetypes.add_type('audio/ogg', '.ogg')
+mimetypes.add_type('audio/webm', '.webm')
+mimetypes.add_type('audio/mp4', '.m4a')
+
+# One year - generated files never change once written (names are unique)
+DEFAULT_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(file_path: str, mtime_ns: int, size: int) -> str:
+    """Hash file contents; mtime/size are part of the key so edits invalidate it"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_content_hash(file_path: str) -> str:
+    """Get the sha256 content hash of a file (memoized per mtime/size)"""
+    stat = os.stat(file_path)
+    return _hash_file(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+def guess_mimetype(filename: str, default: str = 'application/octet-stream') -> str:
+    """Guess mimetype from the file extension"""
+    mimetype, _ = mimetypes.guess_type(filename)
+    return mimetype or default
+
+
+def send_immutable_file(
+    directory: str,
+    filename: str,
+    accel_prefix: Optional[str] = None,
+    max_age: Optional[int] = None
+):
+    """
+    Send a generated, never-modified file with caching and range support
+
+    Args:
+        directory: Directory the file lives in
+        filename: File name relative to directory (path traversal is rejected)
+        accel_prefix: nginx internal location to hand the file off to via
+            X-Accel-Redirect (defaults to FILE_ACCEL_REDIRECT_PREFIX config)
+        max_age: Cache-Control max-age in seconds (defaults to FILE_CACHE_MAX_AGE)
+
+    Returns:
+        Flask response (206 for ranges, 304 when the ETag matches, 404 if missing)
+    """
+    file_path = safe_join(directory, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        return jsonify({"status": "error", "message": "File not found"}), 404
+
+    config = current_app.config
+    if accel_prefix is None:
+        accel_prefix = config.get('FILE_ACCEL_REDIRECT_PREFIX', '')
+    if max_age is None:
+        max_age = config.get('FILE_CACHE_MAX_AGE', DEFAULT_IMMUTABLE_MAX_AGE)
+
+    etag = get_content_hash(file_path)
+    mimetype = guess_mimetype(filename)
+
+    if accel_prefix:
+        # nginx serves the bytes (and handles Range); we only answer revalidation
+        response = make_response('', 200)
+        response.set_etag(etag)
+        response.headers['Content-Type'] = mimetype
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        response = response.make_conditional(request)
+    else:
+        # send_file handles Range/If-Range/If-None-Match and honours USE_X_SENDFILE
+        response = send_file(
+            file_path,
+            mimetype=mimetype,
+            etag=etag,
+            conditional=True,
+            max_age=max_age
+        )
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,111 @@
+"""
+Geohash helpers for Swasthya
+Users' coordinates are stored with a geohash (users.geohash) so that "within
+R km of a point" becomes a handful of indexed prefix range scans instead of a
+distance computation over every row:
+
+1. covering_cells() picks the finest geohash length whose cells cover the
+   circle's bounding box in at most MAX_COVER_CELLS cells
+2. each cell is a `geohash LIKE 'cell%'` index range
+3. haversine_km() drops the candidates in the box corners
+"""
+import math
+from typing import Optional, Set
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Stored precision: 9 characters is a ~5 m cell
+GEOHASH_PRECISION = 9
+
+# Upper bound on prefix scans per radius query
+MAX_COVER_CELLS = 16
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode_geohash(latitude, longitude, precision: int = GEOHASH_PRECISION) -> Optional[str]:
+    """Geohash of a point, or None if either coordinate is missing/out of range"""
+    if latitude is None or longitude is None:
+        return None
+    lat, lon = float(latitude), float(longitude)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision: int) -> tuple:
+    """(height, width) of a geohash cell in degrees"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle distance in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _bounding_box(latitude: float, longitude: float, radius_km: float) -> tuple:
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if max_lat >= 90 or min_lat <= -90 or cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    dlon = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return min_lat, max_lat, longitude - dlon, longitude + dlon
+
+
+def _cells_for_box(min_lat, max_lat, min_lon, max_lon, precision: int) -> Set[str]:
+    height, width = cell_size_degrees(precision)
+    lat_steps = int((max_lat - min_lat) / height) + 2
+    lon_steps = min(int((max_lon - min_lon) / width) + 2, int(360 / width) + 1)
+    cells = set()
+    for i in range(lat_steps):
+        lat = min(min_lat + i * height, max_lat)
+        for j in range(lon_steps):
+            lon = min(min_lon + j * width, max_lon)
+            # Wrap across the antimeridian
+            lon = (lon + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(lat, lon, precision))
+    return cells
+
+
+def covering_cells(latitude, longitude, radius_km: float, max_cells: int = MAX_COVER_CELLS) -> Set[str]:
+    """
+    Geohash prefixes whose union covers the circle of radius_km around the point
+
+    Uses the longest prefix length that needs at most max_cells cells; an
+    empty prefix ('') means the whole world.
+    """
+    box = _bounding_box(float(latitude), float(longitude), radius_km)
+    best = {''}
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size_degrees(precision)
+        estimate = ((box[1] - box[0]) / height + 2) * ((box[3] - box[2]) / width + 2)
+        if estimate > max_cells * 4:
+            break
+        cells = _cells_for_box(*box, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return best
@@ -0,0 +1,177 @@
+"""
+Image Analysis Cache for Swasthya
+Reuses vision-model results for repeat uploads of the same image (app retries,
+the same prescription photographed twice) instead of paying for another call.
+
+Exact repeats are matched on the sha256 of the image plus a prompt key covering
+analysis type, language, prompt version and the rendered prompt. Near-duplicates
+(re-shot or re-compressed photos) are detected with a 64-bit difference hash and
+only flagged - their stored analysis is never returned as a substitute.
+"""
+import io
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+IMAGE_ANALYSIS_CACHE_ENABLED = os.getenv('IMAGE_ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+
+# Cached analyses older than this are ignored and overwritten
+IMAGE_ANALYSIS_CACHE_TTL_DAYS = int(os.getenv('IMAGE_ANALYSIS_CACHE_TTL_DAYS', '30'))
+
+# Max differing bits (out of 64) for two images to count as near-duplicates
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv('IMAGE_NEAR_DUPLICATE_DISTANCE', '6'))
+
+# How many of a user's recent analyses are compared for near-duplicates
+NEAR_DUPLICATE_SCAN_LIMIT = 200
+
+
+def compute_image_sha256(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def compute_perceptual_hash(image_bytes: bytes) -> Optional[str]:
+    """
+    64-bit difference hash (dHash) as 16 hex chars
+
+    Robust to re-encoding, resizing and small exposure changes; returns None if
+    Pillow is missing or the image cannot be decoded.
+    """
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft('L', (64, 64))
+            small = img.convert('L').resize((9, 8), Image.LANCZOS)
+            pixels = list(small.getdata())
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {e}")
+        return None
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:016x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def get_prompt_key(prompt: str, analysis_type: str, language: str, prompt_version: str) -> str:
+    """Key for everything besides the image that determines the answer"""
+    content = '\x1f'.join([prompt_version, analysis_type, language or 'en', prompt])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(days=IMAGE_ANALYSIS_CACHE_TTL_DAYS)
+
+
+def get_cached_analysis(image_sha256: str, prompt_key: str):
+    """Return a fresh cache entry for the exact image + prompt, recording the hit"""
+    from app.models.image_analysis import ImageAnalysisCache
+
+    entry = ImageAnalysisCache.query.filter_by(
+        image_sha256=image_sha256, prompt_key=prompt_key
+    ).first()
+    if not entry or (entry.created_at and entry.created_at < _cutoff()):
+        return None
+
+    try:
+        ImageAnalysisCache.query.filter_by(id=entry.id).update({
+            'hit_count': ImageAnalysisCache.hit_count + 1,
+            'last_hit_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not record cache hit: {e}")
+    return entry
+
+
+def find_near_duplicate(perceptual_hash: Optional[str], analysis_type: str, user_id: Optional[int],
+                        exclude_sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Closest recent analysis by the same user whose image looks the same
+
+    Returns:
+        Dict with cache_id, distance and created_at, or None
+    """
+    from app.models.image_analysis import ImageAnalysisCache
+
+    if not perceptual_hash or not user_id:
+        return None
+
+    candidates = db.session.query(
+        ImageAnalysisCache.id, ImageAnalysisCache.perceptual_hash,
+        ImageAnalysisCache.image_sha256, ImageAnalysisCache.created_at
+    ).filter(
+        ImageAnalysisCache.user_id == int(user_id),
+        ImageAnalysisCache.analysis_type == analysis_type,
+        ImageAnalysisCache.perceptual_hash.isnot(None),
+        ImageAnalysisCache.created_at >= _cutoff()
+    ).order_by(ImageAnalysisCache.created_at.desc()).limit(NEAR_DUPLICATE_SCAN_LIMIT).all()
+
+    best = None
+    for cache_id, candidate_hash, candidate_sha256, created_at in candidates:
+        if candidate_sha256 == exclude_sha256:
+            continue
+        distance = hamming_distance(perceptual_hash, candidate_hash)
+        if distance <= NEAR_DUPLICATE_MAX_DISTANCE and (best is None or distance < best['distance']):
+            best = {
+                'cache_id': cache_id,
+                'distance': distance,
+                'created_at': created_at.isoformat() if created_at else None
+            }
+    return best
+
+
+def store_analysis(image_sha256: str, perceptual_hash: Optional[str], prompt_key: str,
+                   analysis_type: str, language: str, prompt_version: str, analysis: str,
+                   model: str, user_id: Optional[int] = None, ocr_text: Optional[str] = None,
+                   ocr_confidence: Optional[float] = None):
+    """Insert or refresh the cache entry for an image + prompt"""
+    from app.models.image_analysis import ImageAnalysisCache
+
+    try:
+        entry = ImageAnalysisCache.query.filter_by(
+            image_sha256=image_sha256, prompt_key=prompt_key
+        ).first()
+        if entry is None:
+            entry = ImageAnalysisCache(image_sha256=image_sha256, prompt_key=prompt_key)
+            db.session.add(entry)
+        entry.perceptual_hash = perceptual_hash
+        entry.analysis_type = analysis_type
+        entry.language = language
+        entry.prompt_version = prompt_version
+        entry.user_id = int(user_id) if user_id else None
+        entry.analysis = analysis
+        entry.model = model
+        entry.ocr_text = ocr_text
+        entry.ocr_confidence = ocr_confidence
+        entry.hit_count = 0
+        entry.created_at = datetime.utcnow()
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request for the same image stored it first
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not store image analysis in cache: {e}")
@@ -0,0 +1,356 @@
+"""
+Streaming Image Ingest for Swasthya
+Spools uploaded medical images to disk while hashing them on the fly, then
+downscales/re-encodes with Pillow so only a small JPEG ever reaches the vision
+provider - no full-size bytes, base64 strings or data URLs held in memory.
+
+Each analysis type has its own vision profile: skin photos only need a modest
+resolution, while documents are kept sharper and split into overlapping tiles
+so small print stays legible to the model.
+"""
+import io
+import os
+import math
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional, Tuple, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError as e:
+    PIL_AVAILABLE = False
+    logger.warning(f"Pillow not available: {e}. Images will be sent without resizing")
+
+CHUNK_SIZE = 64 * 1024
+
+# Uploads bigger than this are spooled to a temp file instead of memory
+SPOOL_MEMORY_LIMIT = 512 * 1024
+
+# Longest edge sent to the vision model and JPEG quality used for re-encoding
+VISION_MAX_DIMENSION = int(os.getenv('VISION_MAX_DIMENSION', '1600'))
+VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', '85'))
+
+# Re-encode format sent to the provider: JPEG (default) or WEBP
+VISION_OUTPUT_FORMAT = os.getenv('VISION_OUTPUT_FORMAT', 'JPEG').upper()
+
+# Upper bound on tiles per document (overview image not included); 0 disables tiling
+VISION_MAX_TILES = int(os.getenv('VISION_MAX_TILES', '6'))
+
+MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
+FORMAT_MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+# analysis_type -> longest edge kept, JPEG/WebP quality and tile size (None = no tiling)
+VISION_PROFILES = {
+    'skin': {'max_dimension': 1024, 'quality': 85, 'tile_size': None},
+    'xray': {'max_dimension': 1600, 'quality': 90, 'tile_size': None},
+    'general': {'max_dimension': VISION_MAX_DIMENSION, 'quality': VISION_JPEG_QUALITY, 'tile_size': None},
+    'document': {'max_dimension': 3200, 'quality': 85, 'tile_size': 1600},
+    'prescription': {'max_dimension': 3200, 'quality': 85, 'tile_size': 1600},
+    'lab_report': {'max_dimension': 3200, 'quality': 85, 'tile_size': 1600},
+}
+
+# Fraction of a tile shared with its neighbour so text on a seam is not cut
+TILE_OVERLAP = 0.1
+
+# Running byte-savings totals for this process (see get_vision_savings)
+_savings_lock = threading.Lock()
+_savings = {'images': 0, 'original_bytes': 0, 'sent_bytes': 0}
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the allowed size"""
+
+
+class SpooledUpload:
+    """
+    A seekable, hashed view of an uploaded image
+
+    Werkzeug already spools large multipart files to disk; when the incoming
+    stream is seekable we hash it in place instead of copying it again.
+    """
+
+    def __init__(self, fileobj, filename: str, sha256: str, size: int, owned: bool):
+        self.file = fileobj
+        self.filename = filename
+        self.sha256 = sha256
+        self.size = size
+        self._owned = owned
+
+    @property
+    def extension(self) -> str:
+        """Extension of the uploaded filename if it is a known image type, else 'jpg'"""
+        extension = self.filename.lower().rsplit('.', 1)[-1] if '.' in self.filename else ''
+        return extension if extension in MIME_TYPES else 'jpg'
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES.get(self.extension, 'image/jpeg')
+
+    def read(self) -> bytes:
+        """Read the whole upload (only for callers that really need raw bytes)"""
+        self.file.seek(0)
+        data = self.file.read()
+        self.file.seek(0)
+        return data
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _is_seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except Exception:
+        return False
+
+
+def spool_upload(file_storage, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Spool a Werkzeug FileStorage and hash it in one pass
+
+    Args:
+        file_storage: request.files[...] entry
+        max_bytes: Reject uploads larger than this
+
+    Raises:
+        UploadTooLarge: If the upload exceeds max_bytes
+    """
+    filename = file_storage.filename or 'uploaded_image.jpg'
+    stream = file_storage.stream
+    digest = hashlib.sha256()
+    size = 0
+
+    if _is_seekable(stream):
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        stream.seek(0)
+        return SpooledUpload(stream, filename, digest.hexdigest(), size, owned=False)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledUpload(spool, filename, digest.hexdigest(), size, owned=True)
+
+
+def spool_base64(data: str, filename: str = 'document.jpg', max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Decode a base64 (or data URL) payload into a spooled file chunk by chunk
+
+    Avoids materializing a second full-size bytes object next to the JSON string.
+    """
+    if data.startswith('data:') and ',' in data:
+        data = data.split(',', 1)[1]
+    if any(c in data for c in ('\n', '\r', ' ')):
+        data = ''.join(data.split())
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    digest = hashlib.sha256()
+    size = 0
+    # Chunk length must be a multiple of 4 base64 chars
+    step = CHUNK_SIZE // 3 * 4
+    try:
+        for start in range(0, len(data), step):
+            chunk = base64.b64decode(data[start:start + step])
+            digest.update(chunk)
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            spool.write(chunk)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return SpooledUpload(spool, filename, digest.hexdigest(), size, owned=True)
+
+
+def get_vision_profile(analysis_type: Optional[str]) -> Dict[str, Any]:
+    """Preprocessing profile for an analysis type (falls back to 'general')"""
+    return VISION_PROFILES.get(analysis_type or 'general', VISION_PROFILES['general'])
+
+
+def _record_savings(original: int, sent: int):
+    with _savings_lock:
+        _savings['images'] += 1
+        _savings['original_bytes'] += original
+        _savings['sent_bytes'] += sent
+
+
+def get_vision_savings() -> Dict[str, Any]:
+    """Bytes received vs. bytes sent to the vision provider since startup"""
+    with _savings_lock:
+        report = dict(_savings)
+    saved = report['original_bytes'] - report['sent_bytes']
+    report['saved_bytes'] = saved
+    report['saved_percent'] = round(100.0 * saved / report['original_bytes'], 1) if report['original_bytes'] else 0.0
+    return report
+
+
+def _encode(img, output_format: str, quality: int) -> bytes:
+    """Encode without EXIF/XMP - GPS and device tags never leave the server"""
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    if output_format == 'WEBP':
+        img.save(buffer, format='WEBP', quality=quality, method=4)
+    else:
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_for_vision(
+    upload: SpooledUpload,
+    max_dimension: Optional[int] = None,
+    quality: Optional[int] = None,
+    analysis_type: Optional[str] = None,
+    output_format: Optional[str] = None
+) -> Tuple[bytes, str]:
+    """
+    Auto-orient, EXIF-strip, downscale and re-encode an upload for the vision model
+
+    Args:
+        upload: Spooled upload
+        max_dimension: Longest edge (default from the analysis_type profile)
+        quality: Encoder quality (default from the profile)
+        analysis_type: skin, document, prescription, lab_report, xray, general
+        output_format: 'JPEG' or 'WEBP' (default VISION_OUTPUT_FORMAT)
+
+    Returns:
+        (image bytes, mime type) - no larger than max_dimension on its longest
+        edge, or the original bytes if Pillow cannot decode it
+    """
+    profile = get_vision_profile(analysis_type)
+    max_dimension = max_dimension or profile['max_dimension']
+    quality = quality or profile['quality']
+    output_format = (output_format or VISION_OUTPUT_FORMAT).upper()
+    if output_format not in FORMAT_MIME_TYPES:
+        output_format = 'JPEG'
+
+    if not PIL_AVAILABLE:
+        _record_savings(upload.size, upload.size)
+        return upload.read(), upload.mime_type
+
+    try:
+        upload.file.seek(0)
+        with Image.open(upload.file) as img:
+            if (img.format == output_format and max(img.size) <= max_dimension
+                    and not img.getexif() and 'xmp' not in img.info):
+                _record_savings(upload.size, upload.size)
+                return upload.read(), FORMAT_MIME_TYPES[output_format]
+
+            # JPEG decoder can scale by 1/2..1/8 while decoding - much cheaper
+            img.draft('RGB', (max_dimension, max_dimension))
+
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            data = _encode(img, output_format, quality)
+    except Exception as e:
+        logger.warning(f"Could not preprocess {upload.filename}: {e}. Sending original")
+        _record_savings(upload.size, upload.size)
+        return upload.read(), upload.mime_type
+    finally:
+        upload.file.seek(0)
+
+    _record_savings(upload.size, len(data))
+    saved = 100.0 * (upload.size - len(data)) / upload.size if upload.size else 0.0
+    logger.info(
+        f"Prepared {upload.filename} for vision ({analysis_type or 'general'}): "
+        f"{upload.size} -> {len(data)} bytes ({saved:.0f}% saved)"
+    )
+    return data, FORMAT_MIME_TYPES[output_format]
+
+
+def split_into_tiles(
+    image_bytes: bytes,
+    tile_size: int,
+    max_tiles: Optional[int] = None,
+    quality: int = VISION_JPEG_QUALITY,
+    output_format: Optional[str] = None
+) -> Tuple[Optional[bytes], List[bytes]]:
+    """
+    Split a large document image into overlapping tiles in reading order
+
+    Returns:
+        (overview, tiles) - an overview downscaled to tile_size plus the tiles,
+        or (None, []) when the image already fits in one tile or tiling is
+        disabled (max_tiles < 1)
+    """
+    max_tiles = VISION_MAX_TILES if max_tiles is None else max_tiles
+    if not PIL_AVAILABLE or max_tiles < 1:
+        return None, []
+    output_format = (output_format or VISION_OUTPUT_FORMAT).upper()
+    if output_format not in FORMAT_MIME_TYPES:
+        output_format = 'JPEG'
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.load()
+            width, height = img.size
+            if max(width, height) <= tile_size * 1.25:
+                return None, []
+
+            step = int(tile_size * (1 - TILE_OVERLAP))
+
+            def grid(w, h):
+                cols = max(1, math.ceil((w - tile_size) / step) + 1) if w > tile_size else 1
+                rows = max(1, math.ceil((h - tile_size) / step) + 1) if h > tile_size else 1
+                return cols, rows
+
+            # Shrink until the grid fits the tile budget
+            cols, rows = grid(width, height)
+            while cols * rows > max_tiles:
+                scale = 0.85
+                width, height = int(width * scale), int(height * scale)
+                cols, rows = grid(width, height)
+            if (width, height) != img.size:
+                img = img.resize((width, height), Image.LANCZOS)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+
+            tiles = []
+            for row in range(rows):
+                top = min(row * step, max(0, height - tile_size))
+                for col in range(cols):
+                    left = min(col * step, max(0, width - tile_size))
+                    box = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+                    tiles.append(_encode(img.crop(box), output_format, quality))
+
+            overview = img.copy()
+            overview.thumbnail((tile_size, tile_size), Image.LANCZOS)
+            return _encode(overview, output_format, quality), tiles
+    except Exception as e:
+        logger.warning(f"Could not tile image: {e}")
+        return None, []
@@ -0,0 +1,304 @@
+"""
+Lab Value Extraction for Swasthya
+Parses analyte / value / unit / reference range out of lab report text (OCR
+text first, the AI analysis otherwise) into the per-user LabResult time series,
+so trends and recent abnormal values never need the documents re-read.
+
+Parsing is deterministic (no model call): lines are matched against a table of
+common analytes and their aliases as printed on South Asian lab reports.
+"""
+import re
+import json
+import logging
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Document types whose analysis is mined for lab values
+LAB_DOCUMENT_TYPES = {'lab_report', 'blood_test', 'pathology'}
+
+# key -> (display name, aliases, usual unit, default reference range used
+# only when the report gives none and the unit matches)
+ANALYTES = {
+    'hba1c': ('HbA1c', ['hba1c', 'hb a1c', 'glycated hemoglobin', 'glycosylated hemoglobin', 'a1c'], '%', (4.0, 5.6)),
+    'hemoglobin': ('Hemoglobin', ['hemoglobin', 'haemoglobin', 'hgb', 'hb'], 'g/dL', (12.0, 17.5)),
+    'fasting_glucose': ('Fasting Blood Sugar', ['fasting blood sugar', 'fasting blood glucose', 'fasting glucose',
+                                                'glucose fasting', 'fbs'], 'mg/dL', (70.0, 100.0)),
+    'random_glucose': ('Random Blood Sugar', ['random blood sugar', 'random blood glucose', 'rbs'], 'mg/dL', (70.0, 140.0)),
+    'pp_glucose': ('Post-prandial Blood Sugar', ['post prandial blood sugar', 'postprandial blood sugar',
+                                                 'pp blood sugar', 'ppbs'], 'mg/dL', (70.0, 140.0)),
+    'total_cholesterol': ('Total Cholesterol', ['total cholesterol', 'serum cholesterol', 'cholesterol'], 'mg/dL', (None, 200.0)),
+    'ldl': ('LDL Cholesterol', ['ldl cholesterol', 'ldl-c', 'ldl'], 'mg/dL', (None, 100.0)),
+    'hdl': ('HDL Cholesterol', ['hdl cholesterol', 'hdl-c', 'hdl'], 'mg/dL', (40.0, None)),
+    'triglycerides': ('Triglycerides', ['triglycerides', 'triglyceride', 'tg'], 'mg/dL', (None, 150.0)),
+    'creatinine': ('Creatinine', ['serum creatinine', 'creatinine'], 'mg/dL', (0.6, 1.3)),
+    'urea': ('Urea', ['blood urea', 'urea', 'bun'], 'mg/dL', (15.0, 45.0)),
+    'uric_acid': ('Uric Acid', ['uric acid'], 'mg/dL', (3.5, 7.2)),
+    'tsh': ('TSH', ['tsh', 'thyroid stimulating hormone'], 'mIU/L', (0.4, 4.0)),
+    'alt': ('ALT (SGPT)', ['sgpt', 'alt'], 'U/L', (None, 40.0)),
+    'ast': ('AST (SGOT)', ['sgot', 'ast'], 'U/L', (None, 40.0)),
+    'vitamin_d': ('Vitamin D', ['25-oh vitamin d', 'vitamin d3', 'vitamin d'], 'ng/mL', (30.0, 100.0)),
+    'vitamin_b12': ('Vitamin B12', ['vitamin b12', 'b12'], 'pg/mL', (200.0, 900.0)),
+    'sodium': ('Sodium', ['sodium', 'na+'], 'mmol/L', (135.0, 145.0)),
+    'potassium': ('Potassium', ['potassium', 'k+'], 'mmol/L', (3.5, 5.1)),
+    'wbc': ('WBC Count', ['total leucocyte count', 'total leukocyte count', 'wbc count', 'wbc', 'tlc'], None, (None, None)),
+    'platelets': ('Platelet Count', ['platelet count', 'platelets'], None, (None, None)),
+    'esr': ('ESR', ['esr'], 'mm/hr', (None, 20.0)),
+}
+
+# Commas group digits (1,000,000 or Indian lakh grouping 2,50,000, last group
+# always three digits); a comma followed by only one or two digits is a decimal
+# comma ('HbA1c: 7,5 %')
+NUMBER = r'(?<![\d.,])(\d{1,3}(?:,\d{2,3})*,\d{3}(?![\d,])(?:\.\d+)?|\d+,\d{1,2}(?![\d,])|\d+(?:\.\d+)?)'
+NUMBER_PATTERN = re.compile(NUMBER)
+DECIMAL_COMMA_PATTERN = re.compile(r'\d+,\d{1,2}')
+# Parenthesised qualifier right after the analyte name: '(25-OH)', '(Fasting)'
+QUALIFIER_PATTERN = re.compile(r'\s*[(\[][^)\]]*[a-zA-Z][^)\]]*[)\]]')
+# Digits that are part of a name rather than a value: '25-OH'
+NAME_DIGITS_PATTERN = re.compile(r'-[a-zA-Z]')
+UNIT_PATTERN = re.compile(r'\s*((?:%|/?[a-zA-Zµμ][a-zA-Zµμ0-9^*]*(?:/[a-zA-Zµμ0-9^.]+)?))')
+RANGE_PATTERN = re.compile(NUMBER + r'\s*(?:-|–|to)\s*' + NUMBER)
+UPPER_BOUND_PATTERN = re.compile(r'(?:<|≤|less than|upto|up to)\s*' + NUMBER, re.IGNORECASE)
+LOWER_BOUND_PATTERN = re.compile(r'(?:>|≥|more than|greater than)\s*' + NUMBER, re.IGNORECASE)
+MARKDOWN_PATTERN = re.compile(r'[*_`#|•]')
+LIST_PREFIX_PATTERN = re.compile(r'^\s*(?:[-–]\s+|\d+[.)]\s+)')
+
+# (compiled alias pattern, analyte key), longest alias first so 'hdl cholesterol'
+# wins over 'cholesterol'
+_ALIAS_PATTERNS = sorted(
+    [
+        (re.compile(r'(?<![\w])' + re.escape(alias) + r'(?![\w])', re.IGNORECASE), key, len(alias))
+        for key, (_, aliases, _, _) in ANALYTES.items()
+        for alias in aliases
+    ],
+    key=lambda item: -item[2]
+)
+
+
+def _to_float(text: str) -> float:
+    if DECIMAL_COMMA_PATTERN.fullmatch(text):
+        return float(text.replace(',', '.'))
+    return float(text.replace(',', ''))
+
+
+def _flag(value: float, low: Optional[float], high: Optional[float]) -> str:
+    if low is None and high is None:
+        return 'unknown'
+    if low is not None and value < low:
+        return 'low'
+    if high is not None and value > high:
+        return 'high'
+    return 'normal'
+
+
+def _match_analyte(line: str):
+    """Earliest analyte alias in the line (longest alias on ties)"""
+    best = None
+    for pattern, key, length in _ALIAS_PATTERNS:
+        match = pattern.search(line)
+        if match and (best is None or match.start() < best[1].start()):
+            best = (key, match)
+    return best
+
+
+def parse_lab_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parse one report line like 'HbA1c : 7.2 % (4.0 - 5.6)'"""
+    line = LIST_PREFIX_PATTERN.sub('', MARKDOWN_PATTERN.sub(' ', line)).strip()
+    if not line:
+        return None
+
+    found = _match_analyte(line)
+    if not found:
+        return None
+    key, alias_match = found
+    _, _, default_unit, default_range = ANALYTES[key]
+
+    rest = line[alias_match.end():]
+    qualifier = QUALIFIER_PATTERN.match(rest)
+    while qualifier:
+        rest = rest[qualifier.end():]
+        qualifier = QUALIFIER_PATTERN.match(rest)
+
+    value_match = None
+    for number in NUMBER_PATTERN.finditer(rest):
+        if not NAME_DIGITS_PATTERN.match(rest, number.end()):
+            value_match = number
+            break
+    # The value must follow the name closely and must not itself be a range
+    if not value_match or value_match.start() > 40:
+        return None
+    if RANGE_PATTERN.match(rest, value_match.start()):
+        return None
+
+    value = _to_float(value_match.group(1))
+    tail = rest[value_match.end():]
+
+    unit = None
+    unit_match = UNIT_PATTERN.match(tail)
+    if unit_match and not re.match(r'\s*(?:normal|ref|range|high|low|to)\b', tail, re.IGNORECASE):
+        unit = unit_match.group(1)
+        tail = tail[unit_match.end():]
+
+    ref_low = ref_high = None
+    range_match = RANGE_PATTERN.search(tail)
+    if range_match:
+        ref_low, ref_high = _to_float(range_match.group(1)), _to_float(range_match.group(2))
+    else:
+        upper = UPPER_BOUND_PATTERN.search(tail)
+        lower = LOWER_BOUND_PATTERN.search(tail)
+        if upper:
+            ref_high = _to_float(upper.group(1))
+        if lower:
+            ref_low = _to_float(lower.group(1))
+
+    if ref_low is None and ref_high is None and unit and default_unit and unit.lower() == default_unit.lower():
+        ref_low, ref_high = default_range
+
+    return {
+        'analyte': key,
+        'analyte_name': alias_match.group(0),
+        'value': value,
+        'unit': unit or default_unit,
+        'ref_low': ref_low,
+        'ref_high': ref_high,
+        'flag': _flag(value, ref_low, ref_high)
+    }
+
+
+def parse_lab_values(text: str) -> List[Dict[str, Any]]:
+    """Extract lab values from report text (first occurrence of each analyte)"""
+    if not text:
+        return []
+    results = {}
+    for line in text.splitlines():
+        parsed = parse_lab_line(line)
+        if parsed and parsed['analyte'] not in results:
+            results[parsed['analyte']] = parsed
+    return list(results.values())
+
+
+def store_document_lab_values(document, user_id: int) -> int:
+    """
+    Replace the lab values extracted from a document
+
+    Uses OCR text when it yields values, otherwise the AI analysis. The caller
+    commits the session.
+
+    Returns:
+        Number of values stored
+    """
+    from app.models.medical_history import LabResult
+
+    values, source = parse_lab_values(document.ocr_text), 'ocr'
+    if not values:
+        values, source = parse_lab_values(document.ai_analysis), 'ai'
+
+    LabResult.query.filter_by(document_id=document.id).delete(synchronize_session=False)
+
+    measured_on = document.document_date or date.today()
+    for item in values:
+        db.session.add(LabResult(
+            user_id=int(user_id),
+            document_id=document.id,
+            measured_on=measured_on,
+            source=source,
+            **item
+        ))
+
+    if values:
+        document.results_json = json.dumps({
+            item['analyte']: {k: item[k] for k in ('value', 'unit', 'ref_low', 'ref_high', 'flag')}
+            for item in values
+        })
+    logger.info(f"Extracted {len(values)} lab values from document {document.id} ({source})")
+    return len(values)
+
+
+def get_lab_trends(user_id: int, analytes: Optional[List[str]] = None,
+                   since: Optional[date] = None) -> Dict[str, Any]:
+    """
+    All of a user's measurements per analyte in one indexed query
+
+    Returns:
+        Dict analyte -> {name, unit, points, latest, previous, change, abnormal_count}
+    """
+    from app.models.medical_history import LabResult
+
+    query = LabResult.query.filter(LabResult.user_id == int(user_id))
+    if analytes:
+        query = query.filter(LabResult.analyte.in_(analytes))
+    if since:
+        query = query.filter(LabResult.measured_on >= since)
+    rows = query.order_by(LabResult.analyte, LabResult.measured_on, LabResult.id).all()
+
+    trends: Dict[str, Any] = {}
+    for row in rows:
+        trend = trends.setdefault(row.analyte, {
+            'analyte': row.analyte,
+            'name': ANALYTES[row.analyte][0] if row.analyte in ANALYTES else row.analyte_name,
+            'unit': row.unit,
+            'points': [],
+            'abnormal_count': 0
+        })
+        trend['points'].append({
+            'date': row.measured_on.isoformat(),
+            'value': row.value,
+            'unit': row.unit,
+            'ref_low': row.ref_low,
+            'ref_high': row.ref_high,
+            'flag': row.flag,
+            'document_id': row.document_id
+        })
+        if row.flag in ('low', 'high'):
+            trend['abnormal_count'] += 1
+
+    for trend in trends.values():
+        points = trend['points']
+        trend['latest'] = points[-1]
+        trend['previous'] = points[-2] if len(points) > 1 else None
+        trend['change'] = round(points[-1]['value'] - points[-2]['value'], 3) if len(points) > 1 else None
+        trend['unit'] = points[-1]['unit']
+    return trends
+
+
+def get_recent_abnormal_values(user_id: int, days: int = 365, limit: int = 8) -> List[Dict[str, Any]]:
+    """Analytes whose latest reading is out of range, for the AI context (one query)"""
+    from app.models.medical_history import LabResult
+
+    since = date.today() - timedelta(days=days)
+    latest_dates = db.session.query(
+        LabResult.analyte,
+        db.func.max(LabResult.measured_on).label('measured_on')
+    ).filter(
+        LabResult.user_id == int(user_id),
+        LabResult.measured_on >= since
+    ).group_by(LabResult.analyte).subquery()
+
+    rows = LabResult.query.join(latest_dates, db.and_(
+        LabResult.analyte == latest_dates.c.analyte,
+        LabResult.measured_on == latest_dates.c.measured_on
+    )).filter(
+        LabResult.user_id == int(user_id)
+    ).order_by(LabResult.measured_on.desc(), LabResult.id.desc()).all()
+
+    # Latest reading of each analyte (newest row on same-day ties); a newer
+    # normal reading hides an older abnormal one
+    latest = {}
+    for row in rows:
+        if row.analyte not in latest:
+            latest[row.analyte] = row
+    abnormal = [row for row in latest.values() if row.flag in ('low', 'high')]
+    return [row.to_dict() for row in abnormal[:limit]]
+
+
+def format_abnormal_values(values: List[Dict[str, Any]]) -> str:
+    """One-line summary like 'HbA1c 7.2 % (high, 2024-05-01)'"""
+    parts = []
+    for v in values:
+        name = ANALYTES[v['analyte']][0] if v['analyte'] in ANALYTES else v['analyte_name']
+        unit = f" {v['unit']}" if v['unit'] else ''
+        parts.append(f"{name} {v['value']:g}{unit} ({v['flag']}, {v['measured_on']})")
+    return ", ".join(parts)
@@ -0,0 +1,353 @@
+"""
+Push Notification Outbox for Swasthya
+Cron handlers and the notification routes don't call OneSignal themselves:
+they add NotificationOutbox rows in the same transaction as the rest of
+their work and return. A dispatcher claims queued rows and sends them on a
+thread pool under a process-wide rate limit. Failed sends are retried with
+exponential backoff, and the outcome is written back to the row.
+
+Every row carries an idempotency key that is passed to OneSignal, so a send
+retried after a timeout or a crashed worker is delivered once.
+
+The dispatcher runs from the cron scheduler (NotificationDispatchHandler) or
+as a long-running process: python cron_runner.py --notification-worker.
+It also prunes finished rows past their retention, at most once an hour.
+"""
+import os
+import uuid
+import time
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from app import db
+from app.utils.document_jobs import get_worker_id
+
+logger = logging.getLogger(__name__)
+
+# Parallel sends per dispatcher process
+NOTIFICATION_DISPATCH_WORKERS = int(os.getenv('NOTIFICATION_DISPATCH_WORKERS', '4'))
+
+# Max notifications sent per cron tick
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '200'))
+
+# OneSignal API calls per second, per dispatcher process
+NOTIFICATION_RATE_LIMIT = float(os.getenv('NOTIFICATION_RATE_LIMIT', '10'))
+
+# Base delay for retry backoff (doubles each attempt)
+NOTIFICATION_RETRY_BASE_SECONDS = int(os.getenv('NOTIFICATION_RETRY_SECONDS', '15'))
+
+# A row stuck in 'sending' longer than this is considered abandoned and requeued
+NOTIFICATION_SEND_TIMEOUT_SECONDS = int(os.getenv('NOTIFICATION_SEND_TIMEOUT', '120'))
+
+# Days sent/failed rows are kept; rows with a dedup_key are kept longer so
+# the same notification is still recognised if it is queued again
+NOTIFICATION_OUTBOX_RETENTION_DAYS = int(os.getenv('NOTIFICATION_OUTBOX_RETENTION_DAYS', '7'))
+NOTIFICATION_DEDUP_RETENTION_DAYS = int(os.getenv('NOTIFICATION_DEDUP_RETENTION_DAYS', '30'))
+
+# Responses worth retrying; other 4xx mean the request itself is wrong
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` acquisitions per second, bursts of up to `rate`"""
+
+    def __init__(self, rate: float):
+        self.rate = max(rate, 0.1)
+        self.capacity = max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = RateLimiter(NOTIFICATION_RATE_LIMIT)
+
+_last_prune = {'at': 0.0}
+
+
+def enqueue_notification(
+    title: str,
+    message: str,
+    user_ids: list = None,
+    player_ids: list = None,
+    segments: list = None,
+    data: dict = None,
+    url: str = None,
+    source: str = None,
+    dedup_key: str = None
+) -> list:
+    """
+    Queue a push notification to external user IDs, player IDs or segments
+
+    Recipient lists larger than the provider's external_id limit become one
+    row per chunk. The caller commits the session, so the rows are stored
+    atomically with the caller's own changes.
+
+    Args:
+        dedup_key: Optional key; a notification already queued under it is
+            not queued again
+
+    Returns:
+        The NotificationOutbox rows added (empty if deduplicated)
+    """
+    from app.models.notification import NotificationOutbox
+    from app.utils.push import ONESIGNAL_MAX_EXTERNAL_IDS
+
+    if dedup_key and NotificationOutbox.query.filter_by(dedup_key=f"{dedup_key}:0").first():
+        return []
+
+    if user_ids:
+        user_ids = [str(uid) for uid in user_ids]
+        targets = [
+            {'user_ids': user_ids[i:i + ONESIGNAL_MAX_EXTERNAL_IDS]}
+            for i in range(0, len(user_ids), ONESIGNAL_MAX_EXTERNAL_IDS)
+        ]
+    elif player_ids:
+        targets = [{'player_ids': player_ids}]
+    else:
+        targets = [{'segments': segments or ['Subscribed Users']}]
+
+    rows = []
+    for index, target in enumerate(targets):
+        row = NotificationOutbox(
+            idempotency_key=str(uuid.uuid4()),
+            dedup_key=f"{dedup_key}:{index}" if dedup_key else None,
+            source=source,
+            status='queued',
+            title=title[:255],
+            message=message,
+            data=data,
+            url=url,
+            run_after=datetime.utcnow(),
+            **target
+        )
+        db.session.add(row)
+        rows.append(row)
+    return rows
+
+
+def requeue_stale_notifications() -> int:
+    """Put rows whose dispatcher died mid-send back on the queue"""
+    from app.models.notification import NotificationOutbox
+
+    cutoff = datetime.utcnow() - timedelta(seconds=NOTIFICATION_SEND_TIMEOUT_SECONDS)
+    count = NotificationOutbox.query.filter(
+        NotificationOutbox.status == 'sending',
+        NotificationOutbox.locked_at < cutoff
+    ).update({'status': 'queued', 'worker_id': None, 'locked_at': None}, synchronize_session=False)
+    db.session.commit()
+    if count:
+        logger.warning(f"Requeued {count} stale outbox notifications")
+    return count
+
+
+def claim_notifications(limit: int, worker_id: Optional[str] = None) -> List[int]:
+    """
+    Atomically claim up to `limit` due notifications
+
+    One conditional UPDATE (status='queued') over the candidate rows, tagged
+    with a per-claim worker id; rows another dispatcher got first are simply
+    not ours when read back.
+    """
+    from app.models.notification import NotificationOutbox
+
+    worker_id = f"{worker_id or get_worker_id()}:{uuid.uuid4().hex[:8]}"
+    now = datetime.utcnow()
+
+    candidate_ids = [
+        row[0] for row in db.session.query(NotificationOutbox.id).filter(
+            NotificationOutbox.status == 'queued',
+            NotificationOutbox.run_after <= now
+        ).order_by(NotificationOutbox.id).limit(limit).all()
+    ]
+    if not candidate_ids:
+        return []
+
+    NotificationOutbox.query.filter(
+        NotificationOutbox.id.in_(candidate_ids),
+        NotificationOutbox.status == 'queued'
+    ).update({
+        'status': 'sending',
+        'worker_id': worker_id,
+        'locked_at': now,
+        'attempts': NotificationOutbox.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+
+    return [
+        row[0] for row in db.session.query(NotificationOutbox.id).filter(
+            NotificationOutbox.id.in_(candidate_ids),
+            NotificationOutbox.status == 'sending',
+            NotificationOutbox.worker_id == worker_id
+        ).all()
+    ]
+
+
+def deliver_notification(outbox_id: int) -> tuple:
+    """
+    Send one claimed notification and record the outcome (inside an app context)
+
+    Returns:
+        (final status - 'sent', 'queued' for retry or 'failed', recipients)
+    """
+    from app.models.notification import NotificationOutbox
+    from app.utils.push import build_payload, post_notification
+
+    row = NotificationOutbox.query.get(outbox_id)
+    if not row:
+        return 'missing', 0
+
+    payload = build_payload(
+        row.title, row.message,
+        player_ids=row.player_ids, segments=row.segments,
+        data=row.data, url=row.url
+    )
+    if row.user_ids:
+        payload['include_aliases'] = {'external_id': row.user_ids}
+        payload['target_channel'] = 'push'
+    payload['idempotency_key'] = row.idempotency_key
+
+    _rate_limiter.acquire()
+    result = post_notification(payload)
+
+    row.worker_id = None
+    row.locked_at = None
+    if 'id' in result:
+        row.status = 'sent'
+        row.provider_id = result['id'] or None
+        row.recipients = result.get('recipients')
+        # Accepted, but e.g. some external IDs had no subscription
+        row.error = str(result['errors'])[:2000] if result.get('errors') else None
+        row.sent_at = datetime.utcnow()
+    else:
+        error = str(result.get('errors') or result.get('error') or result)[:2000]
+        retryable = 'error' in result or result.get('status_code') in RETRYABLE_STATUS_CODES
+        row.error = error
+        if retryable and row.attempts < row.max_attempts:
+            delay = NOTIFICATION_RETRY_BASE_SECONDS * (2 ** (row.attempts - 1))
+            row.status = 'queued'
+            row.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Outbox notification {outbox_id} attempt {row.attempts} failed: {error}. Retry in {delay}s")
+        else:
+            row.status = 'failed'
+            logger.error(f"Outbox notification {outbox_id} failed: {error}")
+    status, recipients = row.status, row.recipients or 0
+    db.session.commit()
+    return status, recipients
+
+
+def _deliver_in_context(app, outbox_id: int) -> tuple:
+    with app.app_context():
+        try:
+            return deliver_notification(outbox_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Outbox notification {outbox_id} dispatch error: {e}")
+            return 'error', 0
+        finally:
+            db.session.remove()
+
+
+def run_pending_notifications(app, max_notifications: int = None, workers: int = None) -> dict:
+    """
+    Claim and send up to max_notifications notifications on a thread pool
+
+    Each thread gets its own app context (and therefore its own DB session).
+    Rows whose send raised unexpectedly stay in 'sending' and are requeued
+    once NOTIFICATION_SEND_TIMEOUT has passed.
+    """
+    max_notifications = max_notifications or NOTIFICATION_BATCH_SIZE
+    workers = workers or NOTIFICATION_DISPATCH_WORKERS
+
+    with app.app_context():
+        requeue_stale_notifications()
+        prune_finished_notifications()
+        outbox_ids = claim_notifications(max_notifications)
+
+    counts = {'claimed': len(outbox_ids), 'sent': 0, 'recipients': 0, 'retry': 0, 'failed': 0}
+    if not outbox_ids:
+        return counts
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='push-outbox') as pool:
+        for status, recipients in pool.map(lambda outbox_id: _deliver_in_context(app, outbox_id), outbox_ids):
+            if status == 'sent':
+                counts['sent'] += 1
+                counts['recipients'] += recipients
+            elif status == 'queued':
+                counts['retry'] += 1
+            else:
+                counts['failed'] += 1
+    return counts
+
+
+def prune_finished_notifications() -> int:
+    """Drop sent/failed rows past retention, at most once an hour per process"""
+    from app.models.notification import NotificationOutbox
+
+    if time.time() - _last_prune['at'] < 3600:
+        return 0
+    _last_prune['at'] = time.time()
+
+    now = datetime.utcnow()
+    table = NotificationOutbox.__table__
+    finished = table.c.status.in_(['sent', 'failed'])
+    deleted = db.session.execute(table.delete().where(
+        finished,
+        table.c.run_after < now - timedelta(days=NOTIFICATION_OUTBOX_RETENTION_DAYS),
+        table.c.dedup_key.is_(None)
+    )).rowcount
+    deleted += db.session.execute(table.delete().where(
+        finished,
+        table.c.run_after < now - timedelta(days=NOTIFICATION_DEDUP_RETENTION_DAYS)
+    )).rowcount
+    db.session.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} finished outbox notifications")
+    return deleted
+
+
+def get_outbox_counts() -> dict:
+    """Number of outbox rows per status"""
+    from app.models.notification import NotificationOutbox
+
+    rows = db.session.query(
+        NotificationOutbox.status, db.func.count(NotificationOutbox.id)
+    ).group_by(NotificationOutbox.status).all()
+    return {status: count for status, count in rows}
+
+
+def run_worker(app, workers: int = None, poll_interval: float = 1.0):
+    """
+    Long-running dispatcher loop; stops cleanly on SIGINT/SIGTERM
+    """
+    workers = workers or NOTIFICATION_DISPATCH_WORKERS
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        logger.info(f"Signal {signum} received, finishing current sends...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    logger.info(f"Notification dispatcher started ({workers} threads, {NOTIFICATION_RATE_LIMIT}/s)")
+    while not stop.is_set():
+        counts = run_pending_notifications(app, workers=workers)
+        if counts['claimed'] == 0:
+            stop.wait(poll_interval)
+    logger.info("Notification dispatcher stopped")
@@ -0,0 +1,155 @@
+"""
+Local OCR Service for Swasthya
+CPU-only text extraction for prescriptions and lab reports, run before any
+vision-model call. When a document reads cleanly, its text is analyzed with the
+cheaper text model and the vision call is skipped entirely.
+
+Engines are pluggable: register a class with `register_ocr_engine` and select
+it with OCR_ENGINE (default 'auto' = first available, 'none' = disabled).
+Bundled engine: tesseract (pip install pytesseract + the tesseract binary).
+"""
+import io
+import os
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'auto').lower()
+
+# Minimum extracted characters / mean word confidence (0-100) for a document
+# to be analyzed from its text alone
+OCR_MIN_CHARS = int(os.getenv('OCR_MIN_CHARS', '80'))
+OCR_MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', '70'))
+
+# Analysis types where text carries the content (photos of skin etc. never are)
+OCR_ANALYSIS_TYPES = {'document', 'prescription', 'lab_report'}
+
+
+@dataclass
+class OCRResult:
+    text: str
+    confidence: float  # mean word confidence, 0-100
+    engine: str
+
+    @property
+    def is_sufficient(self) -> bool:
+        """Enough clean text to skip the vision model"""
+        return len(self.text.strip()) >= OCR_MIN_CHARS and self.confidence >= OCR_MIN_CONFIDENCE
+
+
+class OCREngine(ABC):
+    """Base class for OCR engines"""
+
+    name = 'base'
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return False
+
+    @abstractmethod
+    def extract(self, image, language: str = 'en') -> OCRResult:
+        """Text and mean word confidence of a PIL image"""
+        pass
+
+
+class TesseractEngine(OCREngine):
+    """Tesseract via pytesseract (English + Nepali/Devanagari)"""
+
+    name = 'tesseract'
+
+    LANGUAGES = {'en': 'eng', 'ne': 'nep+eng', 'hi': 'hin+eng'}
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def extract(self, image, language: str = 'en') -> OCRResult:
+        import pytesseract
+
+        lang = self.LANGUAGES.get(language, 'eng')
+        data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+
+        lines: Dict[tuple, list] = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            conf = float(data['conf'][i])
+            if not word or conf < 0:
+                continue
+            confidences.append(conf)
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+
+        text = '\n'.join(' '.join(words) for _, words in sorted(lines.items()))
+        confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return OCRResult(text=text, confidence=confidence, engine=self.name)
+
+
+OCR_ENGINES: Dict[str, Type[OCREngine]] = {
+    'tesseract': TesseractEngine,
+}
+
+_engine_cache: Dict[str, Optional[OCREngine]] = {}
+
+
+def register_ocr_engine(engine_class: Type[OCREngine]):
+    """Add an OCR engine so it can be selected with OCR_ENGINE"""
+    OCR_ENGINES[engine_class.name] = engine_class
+    _engine_cache.clear()
+
+
+def get_ocr_engine() -> Optional[OCREngine]:
+    """Configured OCR engine, or None if OCR is disabled/unavailable"""
+    if OCR_ENGINE in _engine_cache:
+        return _engine_cache[OCR_ENGINE]
+
+    engine = None
+    if OCR_ENGINE != 'none' and PIL_AVAILABLE:
+        candidates = list(OCR_ENGINES.values()) if OCR_ENGINE == 'auto' else [OCR_ENGINES.get(OCR_ENGINE)]
+        for engine_class in candidates:
+            if engine_class and engine_class.is_available():
+                engine = engine_class()
+                break
+        if engine is None:
+            logger.info(f"OCR disabled: no available engine for OCR_ENGINE={OCR_ENGINE}")
+
+    _engine_cache[OCR_ENGINE] = engine
+    return engine
+
+
+def extract_text(image_bytes: bytes, language: str = 'en') -> Optional[OCRResult]:
+    """
+    Run local OCR on an image
+
+    Returns:
+        OCRResult, or None if no engine is available or OCR failed
+    """
+    engine = get_ocr_engine()
+    if engine is None:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # Grayscale + autocontrast helps phone photos of paper
+            prepared = ImageOps.autocontrast(ImageOps.exif_transpose(img).convert('L'))
+            result = engine.extract(prepared, language)
+    except Exception as e:
+        logger.warning(f"OCR failed ({engine.name}): {e}")
+        return None
+
+    logger.info(f"OCR ({result.engine}): {len(result.text)} chars, confidence {result.confidence:.0f}")
+    return result
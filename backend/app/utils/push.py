@@ -0,0 +1,191 @@
+"""
+Push Notification Dispatch for Swasthya
+OneSignal client shared by the notification routes and the cron handlers:
+
+- one pooled requests.Session per process with connect/read timeouts and
+  retries on connection errors, 429 and 5xx (honouring Retry-After)
+- PushDispatcher collects per-user notifications and queues every group of
+  recipients sharing the same payload as one notification outbox entry
+  (split there into provider-sized chunks of external IDs)
+"""
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+ONESIGNAL_APP_ID = os.getenv('ONESIGNAL_APP_ID', '')
+ONESIGNAL_REST_API_KEY = os.getenv('ONESIGNAL_REST_API_KEY', '')
+# Point at scripts/onesignal_stub.py for load tests
+ONESIGNAL_API_URL = os.getenv('ONESIGNAL_API_URL', 'https://onesignal.com/api/v1/notifications')
+
+ONESIGNAL_CONNECT_TIMEOUT = float(os.getenv('ONESIGNAL_CONNECT_TIMEOUT', '5'))
+ONESIGNAL_READ_TIMEOUT = float(os.getenv('ONESIGNAL_READ_TIMEOUT', '15'))
+ONESIGNAL_MAX_RETRIES = int(os.getenv('ONESIGNAL_MAX_RETRIES', '3'))
+ONESIGNAL_POOL_SIZE = int(os.getenv('ONESIGNAL_POOL_SIZE', '10'))
+
+# OneSignal accepts at most 2000 external IDs per notification
+ONESIGNAL_MAX_EXTERNAL_IDS = int(os.getenv('ONESIGNAL_MAX_EXTERNAL_IDS', '2000'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide session with a keep-alive pool and retry policy"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Read timeouts are not retried: the notification may already
+                # have been accepted, and a retry would deliver it twice
+                retry = Retry(
+                    total=ONESIGNAL_MAX_RETRIES,
+                    connect=ONESIGNAL_MAX_RETRIES,
+                    read=0,
+                    status=ONESIGNAL_MAX_RETRIES,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(['POST']),
+                    backoff_factor=0.5,
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(
+                    max_retries=retry,
+                    pool_connections=1,
+                    pool_maxsize=ONESIGNAL_POOL_SIZE
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Content-Type': 'application/json',
+                    'Authorization': f'Basic {ONESIGNAL_REST_API_KEY}'
+                })
+                _session = session
+    return _session
+
+
+def post_notification(payload: dict) -> dict:
+    """
+    POST one notification payload
+
+    Returns:
+        The OneSignal response body on success, {'errors': ..., 'status_code': ...}
+        on an API error, or {'error': ...} if the request itself failed
+    """
+    try:
+        response = get_session().post(
+            ONESIGNAL_API_URL,
+            json=payload,
+            timeout=(ONESIGNAL_CONNECT_TIMEOUT, ONESIGNAL_READ_TIMEOUT)
+        )
+    except requests.RequestException as e:
+        logger.warning(f"OneSignal request failed: {e}")
+        return {'error': str(e)}
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+
+    if not response.ok:
+        errors = body.get('errors', body) if isinstance(body, dict) else response.text[:500]
+        logger.warning(f"OneSignal API error {response.status_code}: {errors}")
+        return {'errors': errors, 'status_code': response.status_code}
+    if not isinstance(body, dict):
+        return {'errors': f'Unexpected response: {response.text[:200]}', 'status_code': response.status_code}
+    return body
+
+
+def build_payload(
+    title: str,
+    message: str,
+    player_ids: list = None,
+    segments: list = None,
+    data: dict = None,
+    url: str = None
+) -> dict:
+    """Notification payload without recipients (targets segments/player IDs if given)"""
+    payload = {
+        'app_id': ONESIGNAL_APP_ID,
+        'headings': {'en': title},
+        'contents': {'en': message},
+    }
+    if player_ids:
+        payload['include_player_ids'] = player_ids
+    elif segments:
+        payload['included_segments'] = segments
+    if data:
+        payload['data'] = data
+    if url:
+        payload['url'] = url
+    return payload
+
+
+class PushDispatcher:
+    """
+    Collects notifications per user and sends identical payloads together
+
+    Usage:
+        dispatcher = PushDispatcher()
+        dispatcher.add(user_id, title, message, data, tag=...)
+        for group in dispatcher.enqueue(source=...):
+            group['tags'], group['user_ids'], group['rows']
+    """
+
+    def __init__(self):
+        self._groups = OrderedDict()
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, user_id, title: str, message: str, data: Optional[dict] = None, tag=None):
+        """Queue a notification for one user; tag is handed back by enqueue()"""
+        key = (title, message, json.dumps(data or {}, sort_keys=True))
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {
+                'title': title,
+                'message': message,
+                'data': data,
+                'payload': build_payload(title, message, data=data),
+                'user_ids': [],
+                'seen': set(),
+                'tags': []
+            }
+        if str(user_id) not in group['seen']:
+            group['seen'].add(str(user_id))
+            group['user_ids'].append(str(user_id))
+        group['tags'].append(tag)
+
+    def enqueue(self, source: str = None) -> List[dict]:
+        """
+        Queue everything in the notification outbox instead of sending it
+
+        The caller commits the session.
+
+        Returns:
+            One dict per payload: user_ids, tags, rows (NotificationOutbox)
+        """
+        from app.utils.notification_outbox import enqueue_notification
+
+        queued = []
+        groups, self._groups = self._groups, OrderedDict()
+        for group in groups.values():
+            rows = enqueue_notification(
+                title=group['title'],
+                message=group['message'],
+                user_ids=group['user_ids'],
+                data=group['data'],
+                source=source
+            )
+            queued.append({'user_ids': group['user_ids'], 'tags': group['tags'], 'rows': rows})
+        return queued
@@ -0,0 +1,226 @@
+"""
+Simulation Voice Packs for Swasthya
+Pre-renders the bilingual narration of every simulation step (CPR, choking, ...)
+into a versioned pack of content-addressed clips plus a JSON manifest, so
+playback never waits on on-demand TTS.
+
+Rebuilds are incremental: a clip's file name is the hash of its text, voice and
+rate, so only steps whose narration changed get re-synthesized.
+"""
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+from app.utils.tts_service import AUDIO_OUTPUT_DIR, tts_content_key
+from app.utils.tts_batch import get_cache_filename, render_tts_batch
+
+logger = logging.getLogger(__name__)
+
+SIMULATION_PACK_DIR = os.path.join(AUDIO_OUTPUT_DIR, "simulation_packs")
+MANIFEST_FILENAME = "manifest.json"
+PACK_AUDIO_URL_PREFIX = "/api/simulations/audio"
+
+PACK_VOICE = "nova"
+PACK_SPEED = 1.0
+PACK_FORMAT = "mp3"
+
+# lang param used by the simulation API -> (TTS language, voice field, fallback field)
+PACK_LANGUAGES = {
+    'en': ('en-US', 'voice_text', 'instruction'),
+    'ne': ('ne-NP', 'voice_text_ne', 'instruction_ne'),
+}
+
+# Manifest cache, refreshed when the file on disk changes
+_manifest_cache: Dict[str, Any] = {'mtime': None, 'data': None}
+
+
+def get_step_voice_text(step, lang: str) -> Optional[str]:
+    """Narration text for a step in the given language"""
+    _, field, fallback = PACK_LANGUAGES[lang]
+    return getattr(step, field, None) or getattr(step, fallback, None)
+
+
+def get_clip_key(text: str, lang: str) -> str:
+    """Content key for a step narration clip"""
+    language_code = PACK_LANGUAGES[lang][0]
+    return tts_content_key(text, PACK_VOICE, language_code, PACK_SPEED, PACK_FORMAT)
+
+
+def get_clip_filename(key: str) -> str:
+    return get_cache_filename(key, PACK_FORMAT, prefix="sim")
+
+
+def load_manifest() -> Dict[str, Any]:
+    """Load the current pack manifest (empty manifest if none was built yet)"""
+    path = os.path.join(SIMULATION_PACK_DIR, MANIFEST_FILENAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {'version': None, 'simulations': {}}
+
+    if _manifest_cache['mtime'] != mtime:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _manifest_cache['data'] = json.load(f)
+            _manifest_cache['mtime'] = mtime
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read voice pack manifest: {e}")
+            return {'version': None, 'simulations': {}}
+
+    return _manifest_cache['data']
+
+
+def _write_manifest(manifest: Dict[str, Any]):
+    """Write the manifest atomically so readers never see a partial file"""
+    path = os.path.join(SIMULATION_PACK_DIR, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def get_step_audio_urls(slug: str, step, manifest: Dict[str, Any] = None) -> Dict[str, str]:
+    """
+    Ready pack URLs for a step, keyed by lang ('en', 'ne')
+
+    A clip is only returned when it was rendered from the step's current text,
+    so edited steps fall back to on-demand TTS until the pack is rebuilt.
+    """
+    manifest = manifest if manifest is not None else load_manifest()
+    entries = manifest.get('simulations', {}).get(slug, {}).get(str(step.step_number), {})
+
+    urls = {}
+    for lang, entry in entries.items():
+        if lang not in PACK_LANGUAGES:
+            continue
+        text = get_step_voice_text(step, lang)
+        if text and entry.get('key') == get_clip_key(text, lang):
+            urls[lang] = f"{PACK_AUDIO_URL_PREFIX}/{entry['file']}"
+    return urls
+
+
+def build_simulation_voice_packs(
+    force: bool = False,
+    prune: bool = False,
+    languages: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Render all simulation step narration into the voice pack
+
+    Must run inside an app context.
+
+    Args:
+        force: Re-render clips even if they already exist
+        prune: Delete clips no longer referenced by the manifest
+        languages: Subset of PACK_LANGUAGES keys (default: all)
+
+    Returns:
+        Dict with version, rendered/reused/failed counts and errors
+    """
+    from app.models.simulation import Simulation
+
+    languages = languages or list(PACK_LANGUAGES.keys())
+    os.makedirs(SIMULATION_PACK_DIR, exist_ok=True)
+
+    summary = {
+        'version': None,
+        'rendered': 0,
+        'reused': 0,
+        'failed': 0,
+        'pruned': 0,
+        'errors': []
+    }
+
+    simulations_manifest: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    pending = []  # (text, lang, filename, entry, slug, step_number)
+
+    simulations = Simulation.query.filter_by(is_active=True).order_by(Simulation.order_index).all()
+    for simulation in simulations:
+        steps_manifest = simulations_manifest.setdefault(simulation.slug, {})
+        for step in simulation.steps.all():
+            for lang in languages:
+                text = get_step_voice_text(step, lang)
+                if not text:
+                    continue
+
+                key = get_clip_key(text, lang)
+                filename = get_clip_filename(key)
+                entry = {'key': key, 'file': filename}
+
+                clip_path = os.path.join(SIMULATION_PACK_DIR, filename)
+                if not force and os.path.exists(clip_path):
+                    summary['reused'] += 1
+                    steps_manifest.setdefault(str(step.step_number), {})[lang] = entry
+                else:
+                    if force and os.path.exists(clip_path):
+                        os.remove(clip_path)
+                    pending.append((text, lang, filename, entry, simulation.slug, step.step_number))
+
+    if pending:
+        batch = render_tts_batch(
+            [
+                {
+                    'text': text,
+                    'language': PACK_LANGUAGES[lang][0],
+                    'voice': PACK_VOICE,
+                    'speed': PACK_SPEED,
+                    'format': PACK_FORMAT
+                }
+                for text, lang, _, _, _, _ in pending
+            ],
+            audio_dir=SIMULATION_PACK_DIR,
+            filename_prefix="sim",
+            url_prefix=PACK_AUDIO_URL_PREFIX
+        )
+        for (text, lang, filename, entry, slug, step_number), result in zip(pending, batch['results']):
+            if result['status'] in ('rendered', 'cached', 'duplicate'):
+                summary['rendered'] += 1
+                simulations_manifest[slug].setdefault(str(step_number), {})[lang] = entry
+            else:
+                summary['failed'] += 1
+                summary['errors'].append(f"{slug} step {step_number} ({lang}): {result.get('message')}")
+
+    content = json.dumps(simulations_manifest, sort_keys=True).encode('utf-8')
+    version = hashlib.sha256(content).hexdigest()[:12]
+    summary['version'] = version
+
+    _write_manifest({
+        'version': version,
+        'built_at': datetime.utcnow().isoformat(),
+        'voice': PACK_VOICE,
+        'speed': PACK_SPEED,
+        'format': PACK_FORMAT,
+        'languages': languages,
+        'simulations': simulations_manifest
+    })
+
+    if prune:
+        summary['pruned'] = _prune_clips(simulations_manifest)
+
+    logger.info(
+        f"Voice pack {version}: rendered {summary['rendered']}, "
+        f"reused {summary['reused']}, failed {summary['failed']}"
+    )
+    return summary
+
+
+def _prune_clips(simulations_manifest: Dict[str, Any]) -> int:
+    """Remove clips that are not referenced by the manifest"""
+    referenced = {
+        entry['file']
+        for steps in simulations_manifest.values()
+        for langs in steps.values()
+        for entry in langs.values()
+    }
+    removed = 0
+    for name in os.listdir(SIMULATION_PACK_DIR):
+        if name.startswith('sim_') and name not in referenced:
+            try:
+                os.remove(os.path.join(SIMULATION_PACK_DIR, name))
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not prune {name}: {e}")
+    return removed
@@ -0,0 +1,312 @@
+"""
+Object Storage for Swasthya
+Storage backends for user uploads so app nodes keep no local state:
+
+- LocalStorage: sharded content-addressed tree on disk (single node / shared
+  volume), downloads via HMAC-signed, expiring /api/files URLs
+- S3Storage: any S3-compatible store (AWS S3, MinIO, R2) via boto3, downloads
+  via presigned URLs so file bytes never pass through the app workers
+
+Content-addressed keys look like documents/ab/cd/abcd...ef.jpg - identical
+uploads share one object (dedup by sha256).
+
+Select with STORAGE_BACKEND=local|s3 (see Config).
+"""
+import os
+import re
+import hmac
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+CHUNK_SIZE = 64 * 1024
+
+# Spool size kept in memory while hashing a non-seekable stream
+SPOOL_MEMORY_LIMIT = 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    key: str
+    sha256: Optional[str]
+    size: int
+    content_type: Optional[str]
+    deduplicated: bool = False
+
+
+def content_key(sha256: str, extension: str = '', prefix: str = 'files') -> str:
+    """
+    Sharded content-addressed key: <prefix>/ab/cd/<sha256>.<ext>
+
+    Raises:
+        ValueError: If the extension is not 1-5 lowercase letters/digits
+    """
+    extension = extension.lower().lstrip('.')
+    if extension and not re.fullmatch(r'[a-z0-9]{1,5}', extension):
+        raise ValueError(f"Invalid file extension: {extension!r}")
+    name = f"{sha256}.{extension}" if extension else sha256
+    return f"{prefix}/{sha256[:2]}/{sha256[2:4]}/{name}"
+
+
+def _hash_stream(fileobj: BinaryIO):
+    """
+    Hash a stream, returning (seekable file positioned at 0, sha256, size)
+
+    Seekable streams are hashed in place; others are spooled to a temp file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        seekable = fileobj.seekable()
+    except Exception:
+        seekable = False
+
+    if seekable:
+        fileobj.seek(0)
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        fileobj.seek(0)
+        return fileobj, digest.hexdigest(), size
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT)
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
+
+
+class StorageBackend(ABC):
+    """Interface shared by all storage backends"""
+
+    name = 'base'
+
+    @abstractmethod
+    def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        """Stream a file object to key; returns bytes written"""
+        pass
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open an object for streaming reads (caller closes)"""
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def url(self, key: str, expires_in: Optional[int] = None, filename: Optional[str] = None) -> str:
+        """Time-limited download URL"""
+        pass
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(key) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    def read_bytes(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> int:
+        import io
+        return self.put(key, io.BytesIO(data), content_type)
+
+    def put_content_addressed(
+        self,
+        fileobj: BinaryIO,
+        extension: str = '',
+        prefix: str = 'files',
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+        size: Optional[int] = None
+    ) -> StoredObject:
+        """
+        Store a stream under its sha256, skipping the upload if it already exists
+
+        Args:
+            sha256, size: Pass when already known (e.g. SpooledUpload) to skip rehashing
+        """
+        if sha256 is None or size is None:
+            fileobj, sha256, size = _hash_stream(fileobj)
+        else:
+            fileobj.seek(0)
+
+        key = content_key(sha256, extension, prefix)
+        if self.exists(key):
+            return StoredObject(key, sha256, size, content_type, deduplicated=True)
+
+        self.put(key, fileobj, content_type)
+        fileobj.seek(0)
+        return StoredObject(key, sha256, size, content_type)
+
+
+class LocalStorage(StorageBackend):
+    """Filesystem backend with signed, expiring download URLs"""
+
+    name = 'local'
+
+    def __init__(self, root: str, secret: str, url_prefix: str = '/api/files', default_expires: int = 3600):
+        self.root = os.path.abspath(root)
+        self.secret = secret.encode('utf-8')
+        self.url_prefix = url_prefix.rstrip('/')
+        self.default_expires = default_expires
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            with open(temp_path, 'wb') as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+                written = out.tell()
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return written
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), 'rb')
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def sign(self, key: str, expires_at: int) -> str:
+        message = f"{key}:{expires_at}".encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def verify(self, key: str, expires_at: int, signature: str) -> bool:
+        if expires_at < time.time():
+            return False
+        return hmac.compare_digest(self.sign(key, expires_at), signature or '')
+
+    def url(self, key: str, expires_in: Optional[int] = None, filename: Optional[str] = None) -> str:
+        expires_at = int(time.time()) + (expires_in or self.default_expires)
+        url = f"{self.url_prefix}/{quote(key)}?expires={expires_at}&signature={self.sign(key, expires_at)}"
+        if filename:
+            url += f"&filename={quote(filename)}"
+        return url
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible backend (AWS S3, MinIO, Cloudflare R2)"""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None, region: Optional[str] = None, default_expires: int = 3600):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("S3 storage requires boto3: pip install boto3")
+        self.bucket = bucket
+        self.default_expires = default_expires
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None
+        )
+
+    def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        extra = {'ContentType': content_type} if content_type else None
+        start = fileobj.tell() if fileobj.seekable() else 0
+        # upload_fileobj streams in multipart chunks - never the whole file in memory
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra)
+        return fileobj.tell() - start if fileobj.seekable() else -1
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str, expires_in: Optional[int] = None, filename: Optional[str] = None) -> str:
+        params = {'Bucket': self.bucket, 'Key': key}
+        if filename:
+            params['ResponseContentDisposition'] = f'inline; filename="{filename}"'
+        return self.client.generate_presigned_url(
+            'get_object', Params=params, ExpiresIn=expires_in or self.default_expires
+        )
+
+
+_storage_cache = {}
+
+
+def get_storage(app=None) -> StorageBackend:
+    """Storage backend configured for the (current) app, created once per app"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+
+    storage = _storage_cache.get(id(app))
+    if storage is not None:
+        return storage
+
+    config = app.config
+    backend = config.get('STORAGE_BACKEND', 'local')
+    expires = config.get('STORAGE_URL_EXPIRES', 3600)
+    if backend == 's3':
+        storage = S3Storage(
+            bucket=config['S3_BUCKET'],
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            access_key=config.get('S3_ACCESS_KEY_ID'),
+            secret_key=config.get('S3_SECRET_ACCESS_KEY'),
+            region=config.get('S3_REGION'),
+            default_expires=expires
+        )
+    else:
+        storage = LocalStorage(
+            root=config.get('STORAGE_LOCAL_ROOT') or config['UPLOAD_FOLDER'],
+            secret=config['SECRET_KEY'],
+            default_expires=expires
+        )
+    _storage_cache[id(app)] = storage
+    logger.info(f"Using {storage.name} storage backend")
+    return storage
@@ -0,0 +1,181 @@
+"""
+Batch TTS Rendering for Swasthya
+Renders many (text, language) items through a content-addressed audio cache:
+identical items are synthesized once, already cached clips are reused, and the
+rest are rendered concurrently (bounded) on a single event loop.
+
+Used by cron handlers (health tip audio), the simulation voice packs and the
+admin /tts/batch route.
+"""
+import os
+import uuid
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.utils.tts_service import (
+    AUDIO_OUTPUT_DIR, EDGE_TTS_AVAILABLE, SpeechGenerator, tts_content_key
+)
+
+logger = logging.getLogger(__name__)
+
+# Maximum concurrent Edge-TTS synthesis requests per batch
+TTS_BATCH_CONCURRENCY = int(os.getenv('TTS_BATCH_CONCURRENCY', '4'))
+
+# Hard limit on items accepted in one batch
+TTS_BATCH_MAX_ITEMS = int(os.getenv('TTS_BATCH_MAX_ITEMS', '200'))
+
+CACHE_FILENAME_PREFIX = "tts"
+
+# Output formats edge-tts can produce
+SUPPORTED_AUDIO_FORMATS = ('mp3',)
+
+
+def get_cache_filename(key: str, audio_format: str = "mp3", prefix: str = CACHE_FILENAME_PREFIX) -> str:
+    """Cache file name for a content key"""
+    return f"{prefix}_{key[:32]}.{audio_format}"
+
+
+def render_tts_batch(
+    items: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    audio_dir: Optional[str] = None,
+    filename_prefix: str = CACHE_FILENAME_PREFIX,
+    url_prefix: str = "/api/ai-sathi/audio"
+) -> Dict[str, Any]:
+    """
+    Render a batch of TTS items, reusing cached audio
+
+    Args:
+        items: List of dicts with 'text' and optional 'language' (e.g. 'ne-NP'),
+            'voice', 'speed' and 'format'
+        concurrency: Max parallel syntheses (default TTS_BATCH_CONCURRENCY)
+        audio_dir: Cache directory (default: generated_audio)
+        filename_prefix: Prefix for cached file names
+        url_prefix: URL path the cache directory is served from
+
+    Returns:
+        Dict with per-item 'results' (same order as items) and counts
+    """
+    return asyncio.run(render_tts_batch_async(
+        items,
+        concurrency=concurrency,
+        audio_dir=audio_dir,
+        filename_prefix=filename_prefix,
+        url_prefix=url_prefix
+    ))
+
+
+async def render_tts_batch_async(
+    items: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    audio_dir: Optional[str] = None,
+    filename_prefix: str = CACHE_FILENAME_PREFIX,
+    url_prefix: str = "/api/ai-sathi/audio"
+) -> Dict[str, Any]:
+    """Async version of render_tts_batch for callers already on an event loop"""
+    audio_dir = audio_dir or AUDIO_OUTPUT_DIR
+    os.makedirs(audio_dir, exist_ok=True)
+    generator = SpeechGenerator(audio_dir)
+    semaphore = asyncio.Semaphore(max(1, concurrency or TTS_BATCH_CONCURRENCY))
+
+    results: List[Dict[str, Any]] = []
+    unique: Dict[str, Dict[str, Any]] = {}  # key -> render job
+
+    for index, item in enumerate(items):
+        text = (item.get('text') or '').strip()
+        language_code = item.get('language') or 'en-US'
+        voice = item.get('voice') or 'nova'
+        audio_format = item.get('format') or 'mp3'
+
+        if not text:
+            results.append({'index': index, 'status': 'error', 'message': 'No text provided'})
+            continue
+        # edge-tts only produces MP3; the format also ends up in the file name
+        if audio_format not in SUPPORTED_AUDIO_FORMATS:
+            results.append({'index': index, 'status': 'error', 'message': f'Unsupported format: {audio_format}'})
+            continue
+        try:
+            speed = float(item.get('speed') or 1.0)
+        except (TypeError, ValueError):
+            results.append({'index': index, 'status': 'error', 'message': 'speed must be a number'})
+            continue
+
+        key = tts_content_key(text, voice, language_code, speed, audio_format)
+        filename = get_cache_filename(key, audio_format, filename_prefix)
+        result = {
+            'index': index,
+            'key': key,
+            'filename': filename,
+            'url': f"{url_prefix}/{filename}",
+            'language': language_code
+        }
+
+        if key in unique:
+            result['status'] = 'duplicate'
+        elif os.path.exists(os.path.join(audio_dir, filename)):
+            result['status'] = 'cached'
+        else:
+            unique[key] = {
+                'text': text,
+                'voice': voice,
+                'speed': speed,
+                'language_code': language_code,
+                'audio_format': audio_format,
+                'filename': filename
+            }
+            result['status'] = 'pending'
+        results.append(result)
+
+    if unique and not EDGE_TTS_AVAILABLE:
+        outcomes = {key: {'status': 'error', 'message': 'TTS not available. Install: pip install edge-tts'}
+                    for key in unique}
+    else:
+        keys = list(unique.keys())
+        rendered = await asyncio.gather(
+            *(_render_one(generator, semaphore, audio_dir, unique[key]) for key in keys)
+        )
+        outcomes = dict(zip(keys, rendered))
+
+    # Resolve pending items and duplicates from the rendered outcomes
+    for result in results:
+        key = result.get('key')
+        if key in outcomes and result['status'] in ('pending', 'duplicate'):
+            outcome = outcomes[key]
+            if outcome['status'] == 'success':
+                result['status'] = 'rendered' if result['status'] == 'pending' else 'duplicate'
+            else:
+                result['status'] = 'error'
+                result['message'] = outcome.get('message')
+
+    counts = {'rendered': 0, 'cached': 0, 'duplicate': 0, 'error': 0}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+
+    logger.info(
+        f"TTS batch: {len(items)} items, rendered {counts['rendered']}, "
+        f"cached {counts['cached']}, duplicate {counts['duplicate']}, errors {counts['error']}"
+    )
+    return {'results': results, 'total': len(items), **counts}
+
+
+async def _render_one(generator: SpeechGenerator, semaphore: asyncio.Semaphore,
+                      audio_dir: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Render one clip to a temp name, then move it into place atomically"""
+    temp_name = f".{job['filename']}.{uuid.uuid4().hex[:8]}.part"
+    async with semaphore:
+        result = await generator.generate_speech_async(
+            text=job['text'],
+            voice=job['voice'],
+            audio_format=job['audio_format'],
+            speed=job['speed'],
+            language_code=job['language_code'],
+            filename=temp_name
+        )
+    if result.get('status') != 'success':
+        return result
+    try:
+        os.replace(os.path.join(audio_dir, temp_name), os.path.join(audio_dir, job['filename']))
+    except OSError as e:
+        return {'status': 'error', 'message': f"Failed to store audio: {e}"}
+    return result
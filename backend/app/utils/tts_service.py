@@ -4,7 +4,9 @@ Provides TTS generation with Microsoft Edge's Text-to-Speech service (free, reli
 Adapted from Ashlya Academy for medical consultations
 """
 import os
+import re
 import uuid
+import hashlib
 import logging
 import asyncio
 from datetime import datetime
@@ -75,8 +77,11 @@ EDGE_TTS_VOICES = {
 # Default fallback voice
 DEFAULT_VOICE = "en-US-JennyNeural"
 
-# Audio output directory
-AUDIO_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "generated_audio")
+# Audio output directory - a regenerable cache, not user data; point it at a
+# shared volume when running several app nodes
+AUDIO_OUTPUT_DIR = os.getenv('GENERATED_AUDIO_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "generated_audio"
+)
 os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
 
 # Language names
@@ -90,6 +95,93 @@ LANGUAGE_NAMES = {
 }
 
 
+# Approximate speaking rate at speed 1.0 (characters per second, after cleaning)
+# Used to estimate TTS duration before synthesis
+SPEAKING_CHARS_PER_SECOND = {
+    'en-US': 15.0,
+    'hi-IN': 13.0,
+    'ne-NP': 12.0,
+    'es-ES': 15.5,
+    'fr-FR': 15.0,
+    'de-DE': 14.0,
+}
+DEFAULT_CHARS_PER_SECOND = 14.0
+
+# Hard character caps per language regardless of time budget
+VOICE_MAX_CHARS = {
+    'en-US': 400,
+    'hi-IN': 320,
+    'ne-NP': 300,
+}
+DEFAULT_VOICE_MAX_CHARS = 400
+
+# Sentence ends, including the Devanagari danda used in Nepali/Hindi
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?।॥])\s+')
+
+
+def estimate_speech_seconds(text: str, language_code: str = "en-US", speed: float = 1.0) -> float:
+    """Estimate how long Edge-TTS will speak the given text"""
+    speed = max(0.5, min(2.0, speed))
+    chars_per_second = SPEAKING_CHARS_PER_SECOND.get(language_code, DEFAULT_CHARS_PER_SECOND)
+    return len(text) / (chars_per_second * speed)
+
+
+def shape_text_for_speech(
+    text: str,
+    language_code: str = "en-US",
+    speed: float = 1.0,
+    max_seconds: float = 20.0,
+    max_chars: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Split a response into a spoken part that fits the time/char budget and a
+    text-only overflow, cutting at sentence boundaries
+
+    Returns:
+        Dict with spoken, overflow, estimated_seconds and truncated flag
+    """
+    text = (text or "").strip()
+    speed = max(0.5, min(2.0, speed))
+    chars_per_second = SPEAKING_CHARS_PER_SECOND.get(language_code, DEFAULT_CHARS_PER_SECOND)
+    char_budget = int(max_seconds * chars_per_second * speed)
+    char_budget = min(char_budget, max_chars or VOICE_MAX_CHARS.get(language_code, DEFAULT_VOICE_MAX_CHARS))
+
+    if len(clean_text_for_tts(text)) <= char_budget:
+        return {
+            "spoken": text,
+            "overflow": "",
+            "estimated_seconds": estimate_speech_seconds(clean_text_for_tts(text), language_code, speed),
+            "truncated": False
+        }
+
+    sentences = [s for s in SENTENCE_END_PATTERN.split(text) if s.strip()]
+    spoken_parts = []
+    used = 0
+    for sentence in sentences:
+        length = len(clean_text_for_tts(sentence)) + (1 if spoken_parts else 0)
+        if used + length > char_budget:
+            break
+        spoken_parts.append(sentence)
+        used += length
+
+    if spoken_parts:
+        spoken = " ".join(spoken_parts)
+        overflow = " ".join(sentences[len(spoken_parts):])
+    else:
+        # First sentence alone is over budget - cut it at the last word boundary
+        cut = text.rfind(" ", 0, char_budget)
+        cut = cut if cut > 0 else char_budget
+        spoken = text[:cut].rstrip(" ,;:") + "…"
+        overflow = text[cut:].strip()
+
+    return {
+        "spoken": spoken,
+        "overflow": overflow,
+        "estimated_seconds": estimate_speech_seconds(clean_text_for_tts(spoken), language_code, speed),
+        "truncated": True
+    }
+
+
 def get_edge_voice(voice_name: str, language_code: str = "en-US") -> str:
     """Get the Edge TTS voice name for the given voice and language"""
     voice_name = voice_name.lower() if voice_name else "nova"
@@ -113,7 +205,6 @@ def get_optimal_voice(language_code: str) -> str:
 
 def clean_text_for_tts(text: str) -> str:
     """Clean text for better TTS output"""
-    import re
     
     # Remove markdown
     text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
@@ -143,6 +234,31 @@ def clean_text_for_tts(text: str) -> str:
     return text
 
 
+def get_rate_string(speed: float) -> str:
+    """Convert a speed multiplier into an Edge-TTS rate string (e.g. +10%)"""
+    speed = max(0.5, min(2.0, speed))
+    rate_percent = int((speed - 1.0) * 100)
+    return f"+{rate_percent}%" if rate_percent >= 0 else f"{rate_percent}%"
+
+
+def tts_content_key(
+    text: str,
+    voice: str = "nova",
+    language_code: str = "en-US",
+    speed: float = 1.0,
+    audio_format: str = "mp3"
+) -> str:
+    """Stable hash of everything that affects the synthesized audio"""
+    edge_voice = get_edge_voice(voice, language_code)
+    payload = "|".join([
+        clean_text_for_tts(text or ""),
+        edge_voice,
+        get_rate_string(speed),
+        audio_format
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
 class SpeechGenerator:
     """Speech generator using Edge-TTS for medical consultations"""
     
@@ -158,7 +274,8 @@ class SpeechGenerator:
         voice: str = "nova",
         audio_format: str = "mp3",
         speed: float = 1.0,
-        language_code: str = "en-US"
+        language_code: str = "en-US",
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """Generate speech from text using Edge-TTS"""
         
@@ -182,16 +299,15 @@ class SpeechGenerator:
             edge_voice = get_edge_voice(voice, language_code)
             
             # Calculate rate adjustment
-            speed = max(0.5, min(2.0, speed))
-            rate_percent = int((speed - 1.0) * 100)
-            rate_str = f"+{rate_percent}%" if rate_percent >= 0 else f"{rate_percent}%"
+            rate_str = get_rate_string(speed)
             
             logger.info(f"Generating speech: voice={edge_voice}, rate={rate_str}, chars={len(clean_text)}")
             
-            # Generate unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            random_id = str(uuid.uuid4())[:8]
-            filename = f"swasthya_tts_{language_code}_{timestamp}_{random_id}.{audio_format}"
+            # Generate unique filename unless the caller picked one
+            if not filename:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                random_id = str(uuid.uuid4())[:8]
+                filename = f"swasthya_tts_{language_code}_{timestamp}_{random_id}.{audio_format}"
             file_path = os.path.join(self.audio_dir, filename)
             
             # Create communicator and generate speech
@@ -237,7 +353,8 @@ class SpeechGenerator:
         voice: str = "nova",
         audio_format: str = "mp3",
         speed: float = 1.0,
-        language_code: str = "en-US"
+        language_code: str = "en-US",
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """Synchronous wrapper for speech generation"""
         loop = asyncio.new_event_loop()
@@ -249,7 +366,8 @@ class SpeechGenerator:
                     voice=voice,
                     audio_format=audio_format,
                     speed=speed,
-                    language_code=language_code
+                    language_code=language_code,
+                    filename=filename
                 )
             )
         finally:
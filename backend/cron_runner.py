@@ -14,6 +14,21 @@ Usage:
     python cron_runner.py --handler medicine_reminders
     python cron_runner.py --handler health_alerts
     python cron_runner.py --handler weather_alerts
+    python cron_runner.py --handler earthquake_alerts
+    
+    # Pre-render simulation step narration (incremental, safe to re-run)
+    python cron_runner.py --build-voice-packs
+    python cron_runner.py --build-voice-packs --force --prune
+    
+    # Run the document analysis worker (long-running, stops on SIGTERM)
+    python cron_runner.py --analysis-worker --workers 4
+    
+    # Run the push notification outbox dispatcher (long-running, stops on SIGTERM)
+    python cron_runner.py --notification-worker --workers 4
+    
+    # Run every handler on its own interval in one long-running process
+    # (replaces the crontab entries below; only one daemon per host)
+    python cron_runner.py --daemon
 
 Add to cPanel cron (run every minute for medicine reminders):
     * * * * * cd /path/to/backend && python cron_runner.py >> /var/log/swasthya_cron.log 2>&1
@@ -21,6 +36,7 @@ Add to cPanel cron (run every minute for medicine reminders):
 Or run health/weather checks every 30 minutes:
     */30 * * * * cd /path/to/backend && python cron_runner.py --handler health_alerts >> /var/log/swasthya_cron.log 2>&1
     */30 * * * * cd /path/to/backend && python cron_runner.py --handler weather_alerts >> /var/log/swasthya_cron.log 2>&1
+    */5 * * * * cd /path/to/backend && python cron_runner.py --handler earthquake_alerts >> /var/log/swasthya_cron.log 2>&1
 """
 
 import sys
@@ -46,7 +62,8 @@ def main():
     parser.add_argument(
         '--handler',
         type=str,
-        choices=['medicine_reminders', 'health_alerts', 'weather_alerts', 'user_health_insights', 'general_health_tips'],
+        choices=['medicine_reminders', 'health_alerts', 'weather_alerts', 'earthquake_alerts', 'user_health_insights',
+                 'general_health_tips', 'document_analysis', 'notification_dispatch'],
         help='Run specific handler only'
     )
     parser.add_argument(
@@ -54,6 +71,44 @@ def main():
         action='store_true',
         help='List available handlers'
     )
+    parser.add_argument(
+        '--build-voice-packs',
+        action='store_true',
+        help='Pre-render simulation voice packs (only changed steps are synthesized)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='With --build-voice-packs: re-render every clip'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help='With --build-voice-packs: delete clips no longer in the manifest'
+    )
+    parser.add_argument(
+        '--analysis-worker',
+        action='store_true',
+        help='Run the document analysis worker until stopped'
+    )
+    parser.add_argument(
+        '--notification-worker',
+        action='store_true',
+        help='Run the push notification outbox dispatcher until stopped'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run all handlers on their own intervals until stopped'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Parallel analyses with --analysis-worker (default DOCUMENT_ANALYSIS_WORKERS), '
+             'parallel sends with --notification-worker (default NOTIFICATION_DISPATCH_WORKERS), '
+             'otherwise concurrent handlers (default CRON_MAX_WORKERS)'
+    )
     
     args = parser.parse_args()
     
@@ -66,7 +121,44 @@ def main():
     
     app = create_app()
     
+    if args.analysis_worker:
+        from app.utils.document_jobs import run_worker
+        
+        print("\nStarting document analysis worker")
+        run_worker(app, workers=args.workers)
+        return
+    
+    if args.notification_worker:
+        from app.utils.notification_outbox import run_worker
+        
+        print("\nStarting notification outbox dispatcher")
+        run_worker(app, workers=args.workers)
+        return
+    
+    if args.daemon:
+        from app.cron import CronDaemon, DaemonAlreadyRunning
+        
+        print(f"\nStarting cron daemon (Mode: {'DRY RUN' if args.dry_run else 'LIVE'})")
+        try:
+            CronDaemon(app, dry_run=args.dry_run).run()
+        except DaemonAlreadyRunning as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+    
     with app.app_context():
+        if args.build_voice_packs:
+            from app.utils.simulation_voice_packs import build_simulation_voice_packs
+            
+            print("\nBuilding simulation voice packs")
+            summary = build_simulation_voice_packs(force=args.force, prune=args.prune)
+            print(f"  Version: {summary['version']}")
+            print(f"  Rendered: {summary['rendered']}, Reused: {summary['reused']}, "
+                  f"Failed: {summary['failed']}, Pruned: {summary['pruned']}")
+            if summary['errors']:
+                print(f"  Errors: {summary['errors']}")
+            return
+        
         from app.cron import CronScheduler
         
         scheduler = CronScheduler()
@@ -86,7 +178,7 @@ def main():
         else:
             print(f"\nRunning all handlers")
             print(f"Mode: {'DRY RUN' if args.dry_run else 'LIVE'}")
-            result = scheduler.run_all(dry_run=args.dry_run)
+            result = scheduler.run_all(dry_run=args.dry_run, max_workers=args.workers)
         
         # Print results
         print(f"\n{'='*60}")
@@ -105,7 +197,9 @@ def main():
                           f"Failed: {handler_result.get('failed', 0)}, "
                           f"Skipped: {handler_result.get('skipped', 0)}")
             
-            print(f"\nTotal duration: {result.get('total_duration_seconds', 0):.2f}s")
+            timing = result.get('timing', {})
+            print(f"\nTotal duration: {result.get('total_duration_seconds', 0):.2f}s "
+                  f"(handlers {timing.get('handler_seconds', 0):.2f}s, CPU {timing.get('cpu_seconds', 0):.2f}s)")
             print(f"Totals: {result.get('totals', {})}")
         else:
             # Single handler ran
@@ -0,0 +1,12 @@
+-- Alert Dedup Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS alert_dedup (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    scope VARCHAR(50) NOT NULL,
+    `key` VARCHAR(191) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_alert_dedup_scope_key (scope, `key`),
+    INDEX idx_alert_dedup_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,10 @@
+-- Cron Handler Lease Locks Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS cron_locks (
+    name VARCHAR(100) NOT NULL PRIMARY KEY,
+    owner VARCHAR(150) NULL,
+    token BIGINT NOT NULL DEFAULT 0,
+    acquired_at DATETIME NULL,
+    expires_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
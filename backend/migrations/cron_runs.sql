@@ -0,0 +1,22 @@
+-- Cron Run History Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS cron_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    handler VARCHAR(100) NOT NULL,
+    host VARCHAR(100) NULL,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME NOT NULL,
+    duration_seconds FLOAT NOT NULL,
+    cpu_seconds FLOAT NULL,
+    success INT NOT NULL DEFAULT 0,
+    failed INT NOT NULL DEFAULT 0,
+    skipped INT NOT NULL DEFAULT 0,
+    rows_scanned INT NOT NULL DEFAULT 0,
+    notifications_sent INT NOT NULL DEFAULT 0,
+    errors TEXT NULL,
+    dry_run TINYINT(1) NOT NULL DEFAULT 0,
+    lease_token BIGINT NULL,
+    INDEX idx_cron_runs_handler_started (handler, started_at),
+    INDEX idx_cron_runs_started (started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
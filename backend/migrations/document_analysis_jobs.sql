@@ -0,0 +1,28 @@
+-- Document Analysis Job Queue Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS document_analysis_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    document_id INT NOT NULL,
+    user_id INT NOT NULL,
+    status ENUM('queued', 'running', 'completed', 'failed') NOT NULL DEFAULT 'queued',
+    input_path VARCHAR(500) NULL,
+    filename VARCHAR(255) NULL,
+    mime_type VARCHAR(50) NULL,
+    document_type VARCHAR(50) NULL,
+    language VARCHAR(10) DEFAULT 'en',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    worker_id VARCHAR(100) NULL,
+    locked_at DATETIME NULL,
+    error TEXT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    FOREIGN KEY (document_id) REFERENCES medical_documents(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_document_id (document_id),
+    INDEX idx_user_id (user_id),
+    INDEX idx_analysis_jobs_status_run_after (status, run_after)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
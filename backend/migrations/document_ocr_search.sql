@@ -0,0 +1,5 @@
+-- Document OCR Search Migration
+-- Run this SQL in your MySQL database to index OCR text for document search
+
+ALTER TABLE medical_documents
+    ADD FULLTEXT INDEX ft_medical_documents_search (title, ocr_text, ai_summary);
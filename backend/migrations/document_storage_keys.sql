@@ -0,0 +1,9 @@
+-- Document Object Storage Migration
+-- Run this SQL in your MySQL database to store upload object keys
+-- (content-addressed, resolved to signed/presigned URLs at read time)
+
+ALTER TABLE medical_documents
+    ADD COLUMN file_key VARCHAR(255) NULL AFTER file_url;
+
+ALTER TABLE medical_document_images
+    ADD COLUMN image_key VARCHAR(255) NULL AFTER image_url;
@@ -0,0 +1,23 @@
+-- Image Analysis Cache Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS image_analysis_cache (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    image_sha256 CHAR(64) NOT NULL,
+    perceptual_hash CHAR(16) NULL,
+    prompt_key CHAR(64) NOT NULL,
+    analysis_type VARCHAR(50) NOT NULL,
+    language VARCHAR(10) DEFAULT 'en',
+    prompt_version VARCHAR(20) NOT NULL,
+    user_id INT NULL,
+    analysis TEXT NOT NULL,
+    model VARCHAR(100) NULL,
+    ocr_text TEXT NULL,
+    ocr_confidence FLOAT NULL,
+    hit_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at DATETIME NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    UNIQUE KEY uq_image_analysis_cache_key (image_sha256, prompt_key),
+    INDEX idx_image_analysis_cache_user_type (user_id, analysis_type, created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
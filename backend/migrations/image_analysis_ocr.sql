@@ -0,0 +1,7 @@
+-- Image Analysis OCR Migration
+-- Run this SQL in your MySQL database if image_analysis_cache was created
+-- before it stored the local OCR text. Existing entries are OCR'd again on
+-- their next cache hit.
+
+ALTER TABLE image_analysis_cache ADD COLUMN ocr_text TEXT NULL;
+ALTER TABLE image_analysis_cache ADD COLUMN ocr_confidence FLOAT NULL;
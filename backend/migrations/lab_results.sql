@@ -0,0 +1,22 @@
+-- Lab Results Time-Series Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS lab_results (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    document_id INT NULL,
+    analyte VARCHAR(50) NOT NULL,
+    analyte_name VARCHAR(100) NULL,
+    value DOUBLE NOT NULL,
+    unit VARCHAR(30) NULL,
+    ref_low DOUBLE NULL,
+    ref_high DOUBLE NULL,
+    flag ENUM('low', 'normal', 'high', 'unknown') NOT NULL DEFAULT 'unknown',
+    measured_on DATE NOT NULL,
+    source ENUM('ocr', 'ai', 'manual') DEFAULT 'ai',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (document_id) REFERENCES medical_documents(id) ON DELETE CASCADE,
+    INDEX idx_document_id (document_id),
+    INDEX idx_lab_results_user_analyte_date (user_id, analyte, measured_on)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,30 @@
+-- Notification Outbox Migration
+-- Run this SQL in your MySQL database to create the new table
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    idempotency_key VARCHAR(36) NOT NULL,
+    dedup_key VARCHAR(191) NULL,
+    source VARCHAR(100) NULL,
+    status ENUM('queued', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'queued',
+    title VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    data JSON NULL,
+    url VARCHAR(500) NULL,
+    user_ids JSON NULL,
+    player_ids JSON NULL,
+    segments JSON NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_after DATETIME NOT NULL,
+    worker_id VARCHAR(100) NULL,
+    locked_at DATETIME NULL,
+    error TEXT NULL,
+    provider_id VARCHAR(64) NULL,
+    recipients INT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME NULL,
+    UNIQUE KEY uq_notification_outbox_idempotency (idempotency_key),
+    UNIQUE KEY uq_notification_outbox_dedup (dedup_key),
+    INDEX idx_notification_outbox_status_run_after (status, run_after)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,9 @@
+-- Reminder Next-Fire Migration
+-- Run this SQL in your MySQL database after reminder_schedule_slots.sql.
+-- next_fire_at is filled in automatically on the next app start.
+
+ALTER TABLE users ADD COLUMN timezone VARCHAR(50) DEFAULT 'Asia/Kathmandu';
+
+ALTER TABLE reminder_schedule_slots ADD COLUMN next_fire_at DATETIME NULL;
+CREATE INDEX idx_reminder_slots_next_fire ON reminder_schedule_slots (next_fire_at);
+DROP INDEX idx_reminder_slots_minute ON reminder_schedule_slots;
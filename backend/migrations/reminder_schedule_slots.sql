@@ -0,0 +1,14 @@
+-- Reminder Schedule Slots Migration
+-- Run this SQL in your MySQL database to create the new table.
+-- Existing reminders are indexed automatically on the next app start.
+
+CREATE TABLE IF NOT EXISTS reminder_schedule_slots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    reminder_id INT NOT NULL,
+    minute_of_day SMALLINT NOT NULL,
+    days_mask SMALLINT NOT NULL DEFAULT 127,
+    time_str VARCHAR(5) NOT NULL,
+    FOREIGN KEY (reminder_id) REFERENCES medicine_reminders(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_reminder_slot (reminder_id, minute_of_day),
+    INDEX idx_reminder_slots_minute (minute_of_day, reminder_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
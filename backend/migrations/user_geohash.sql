@@ -0,0 +1,7 @@
+-- User Geohash Migration
+-- Run this SQL in your MySQL database after user_location_keys.sql.
+-- Geohash of users.latitude/longitude for radius-targeted alerts;
+-- existing rows are filled in automatically on the next app start.
+
+ALTER TABLE users ADD COLUMN geohash VARCHAR(12);
+CREATE INDEX ix_users_geohash ON users (geohash);
@@ -0,0 +1,9 @@
+-- User Location Keys Migration
+-- Run this SQL in your MySQL database.
+-- Normalized city/province names for indexed alert audience lookups;
+-- existing rows are filled in automatically on the next app start.
+
+ALTER TABLE users ADD COLUMN city_key VARCHAR(100);
+ALTER TABLE users ADD COLUMN province_key VARCHAR(100);
+CREATE INDEX ix_users_city_key ON users (city_key);
+CREATE INDEX ix_users_province_key ON users (province_key);
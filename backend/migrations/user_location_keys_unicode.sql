@@ -0,0 +1,7 @@
+-- User Location Keys (Unicode) Migration
+-- Run this SQL in your MySQL database after user_location_keys.sql.
+-- Location keys now keep non-ASCII names (Devanagari) and drop a trailing
+-- country; clearing them makes the next app start recompute every key.
+
+UPDATE users SET city_key = NULL, province_key = NULL
+WHERE city IS NOT NULL OR province IS NOT NULL;
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Notification Fan-out Benchmark
+Seeds N users and M medicine reminders that are all due now, points the
+push client at a local OneSignal stub (scripts/onesignal_stub.py) and runs
+CronScheduler.run_all. Reports per sweep:
+
+- total sweep duration and the reminder / dispatch handler durations
+- DB queries issued during the sweep (all threads)
+- outbox notifications sent per second and recipients per second
+
+Only medicine_reminders and notification_dispatch run unless
+--all-handlers is given (the others call external weather/LLM APIs).
+
+Runs against the in-memory SQLite testing config by default. With
+--config development the seeded rows go to the configured database and are
+deleted afterwards.
+
+Usage:
+    python scripts/benchmark_notifications.py --users 1000 --reminders 2000
+    python scripts/benchmark_notifications.py --users 500 --reminders 500 --latency-ms 150 --error-rate 0.02
+    python scripts/benchmark_notifications.py --rate-limit 50 --dispatch-workers 8 --runs 3
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from onesignal_stub import start_stub_server, add_stub_arguments, stub_options
+
+BENCH_EMAIL_DOMAIN = 'bench.example.invalid'
+
+
+def configure_environment(args, stub_url: str):
+    """Must run before the app is imported: the push/outbox modules read these at import"""
+    if args.config != 'testing':
+        from dotenv import load_dotenv
+        load_dotenv()
+    os.environ['ONESIGNAL_API_URL'] = stub_url
+    os.environ.setdefault('ONESIGNAL_APP_ID', 'benchmark-app')
+    os.environ.setdefault('ONESIGNAL_REST_API_KEY', 'benchmark-key')
+    # Every due reminder is queued and drained in the same sweep
+    os.environ['NOTIFICATION_BATCH_SIZE'] = str(max(args.reminders, 1))
+    if args.rate_limit:
+        os.environ['NOTIFICATION_RATE_LIMIT'] = str(args.rate_limit)
+    if args.dispatch_workers:
+        os.environ['NOTIFICATION_DISPATCH_WORKERS'] = str(args.dispatch_workers)
+
+
+def seed(db, num_users: int, num_reminders: int) -> list:
+    """Insert users and one-time-a-day reminders with their schedule slots; returns user ids"""
+    from sqlalchemy import insert
+    from app.models import User, MedicineReminder, ReminderScheduleSlot
+
+    run_tag = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    db.session.execute(insert(User), [
+        {
+            'email': f"bench-{run_tag}-{i}@{BENCH_EMAIL_DOMAIN}",
+            'full_name': f"Bench User {i}",
+            'is_active': True,
+            'notification_push': True,
+            'role': 'user',
+            'timezone': 'Asia/Kathmandu'
+        }
+        for i in range(num_users)
+    ])
+    user_ids = [row[0] for row in db.session.query(User.id).filter(
+        User.email.like(f"bench-{run_tag}-%")
+    ).order_by(User.id).all()]
+
+    medicines = ['Paracetamol', 'Metformin', 'Amlodipine', 'Vitamin D', 'Omeprazole']
+    db.session.execute(insert(MedicineReminder), [
+        {
+            'user_id': user_ids[i % len(user_ids)],
+            'medicine_name': medicines[i % len(medicines)],
+            'form': 'tablet',
+            'strength': '500',
+            'unit': 'mg',
+            'reminder_times': ['08:00'],
+            'is_active': True
+        }
+        for i in range(num_reminders)
+    ])
+    reminder_ids = [row[0] for row in db.session.query(MedicineReminder.id).filter(
+        MedicineReminder.user_id.in_(user_ids)
+    ).all()]
+
+    db.session.execute(insert(ReminderScheduleSlot), [
+        {'reminder_id': reminder_id, 'minute_of_day': 480, 'days_mask': 127, 'time_str': '08:00'}
+        for reminder_id in reminder_ids
+    ])
+    db.session.commit()
+    return user_ids
+
+
+def arm_slots(db, user_ids: list):
+    """Make every seeded slot due now"""
+    from app.models import MedicineReminder, ReminderScheduleSlot
+
+    due_at = datetime.utcnow().replace(second=0, microsecond=0)
+    reminder_ids = db.session.query(MedicineReminder.id).filter(MedicineReminder.user_id.in_(user_ids))
+    ReminderScheduleSlot.query.filter(
+        ReminderScheduleSlot.reminder_id.in_(reminder_ids)
+    ).update({'next_fire_at': due_at}, synchronize_session=False)
+    db.session.commit()
+
+
+def cleanup(db, user_ids: list, first_outbox_id: int):
+    from app.models import (
+        User, MedicineReminder, ReminderScheduleSlot, ReminderLog, NotificationOutbox
+    )
+
+    reminder_ids = [row[0] for row in db.session.query(MedicineReminder.id).filter(
+        MedicineReminder.user_id.in_(user_ids)
+    ).all()]
+    ReminderLog.query.filter(ReminderLog.reminder_id.in_(reminder_ids)).delete(synchronize_session=False)
+    ReminderScheduleSlot.query.filter(ReminderScheduleSlot.reminder_id.in_(reminder_ids)).delete(synchronize_session=False)
+    MedicineReminder.query.filter(MedicineReminder.id.in_(reminder_ids)).delete(synchronize_session=False)
+    User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    NotificationOutbox.query.filter(NotificationOutbox.id > first_outbox_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def run_sweep(scheduler, db, stub_state) -> dict:
+    from sqlalchemy import event
+
+    queries = {'count': 0}
+
+    def count_query(*_):
+        queries['count'] += 1
+
+    before = stub_state.stats()
+    event.listen(db.engine, 'before_cursor_execute', count_query)
+    try:
+        result = scheduler.run_all()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_query)
+    after = stub_state.stats()
+
+    reminders = result['handlers'].get('medicine_reminders', {})
+    dispatch = result['handlers'].get('notification_dispatch', {})
+    dispatch_seconds = dispatch.get('duration_seconds') or 0
+    accepted = after['accepted'] - before['accepted']
+    recipients = after['recipients'] - before['recipients']
+    return {
+        'sweep_seconds': result.get('total_duration_seconds', 0),
+        'reminders_seconds': reminders.get('duration_seconds', 0),
+        'dispatch_seconds': dispatch_seconds,
+        'queries': queries['count'],
+        'queued': reminders.get('notifications_sent', 0),
+        'api_requests': after['requests'] - before['requests'],
+        'accepted': accepted,
+        'recipients': recipients,
+        'sends_per_second': accepted / dispatch_seconds if dispatch_seconds else 0.0,
+        'recipients_per_second': recipients / dispatch_seconds if dispatch_seconds else 0.0,
+        'errors': (reminders.get('errors') or []) + (dispatch.get('errors') or [])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notification fan-out benchmark')
+    parser.add_argument('--users', type=int, default=1000, help='Users to seed')
+    parser.add_argument('--reminders', type=int, default=2000, help='Reminders to seed (round-robin over users)')
+    parser.add_argument('--runs', type=int, default=3, help='Sweeps to run')
+    parser.add_argument('--config', default='testing', help='App config (testing = in-memory SQLite)')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='OneSignal calls per second (default NOTIFICATION_RATE_LIMIT)')
+    parser.add_argument('--dispatch-workers', type=int, default=0,
+                        help='Parallel sends (default NOTIFICATION_DISPATCH_WORKERS)')
+    parser.add_argument('--all-handlers', action='store_true', help='Run every cron handler, not just reminders')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    if args.users < 1 or args.reminders < 1:
+        parser.error('--users and --reminders must be positive')
+
+    server, stub_url = start_stub_server(**stub_options(args))
+    configure_environment(args, stub_url)
+
+    from app import create_app, db
+    from app.cron import CronScheduler
+    from app.models import NotificationOutbox
+    from app.utils.notification_outbox import NOTIFICATION_RATE_LIMIT, NOTIFICATION_DISPATCH_WORKERS
+
+    app = create_app(args.config)
+    with app.app_context():
+        first_outbox_id = db.session.query(db.func.max(NotificationOutbox.id)).scalar() or 0
+        seed_start = time.perf_counter()
+        user_ids = seed(db, args.users, args.reminders)
+        print(f"\nSeeded {args.users} users / {args.reminders} reminders in {time.perf_counter() - seed_start:.2f}s")
+        print(f"Stub: {stub_url}  (latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+              f"errors {args.error_rate:.0%}, 429s {args.rate_limit_rate:.0%})")
+        print(f"Dispatcher: {NOTIFICATION_DISPATCH_WORKERS} workers, {NOTIFICATION_RATE_LIMIT:g} calls/s")
+
+        scheduler = CronScheduler()
+        if not args.all_handlers:
+            scheduler.handlers = {
+                name: scheduler.handlers[name] for name in ('medicine_reminders', 'notification_dispatch')
+            }
+
+        print(f"\n{'run':>4}{'sweep s':>9}{'remind s':>10}{'dispatch s':>12}{'queries':>9}"
+              f"{'queued':>8}{'API calls':>11}{'sent/s':>9}{'recip/s':>9}")
+        runs = []
+        try:
+            for run in range(1, args.runs + 1):
+                arm_slots(db, user_ids)
+                stats = run_sweep(scheduler, db, server.state)
+                runs.append(stats)
+                print(f"{run:>4}{stats['sweep_seconds']:>9.2f}{stats['reminders_seconds']:>10.2f}"
+                      f"{stats['dispatch_seconds']:>12.2f}{stats['queries']:>9}{stats['queued']:>8}"
+                      f"{stats['api_requests']:>11}{stats['sends_per_second']:>9.1f}"
+                      f"{stats['recipients_per_second']:>9.1f}")
+                for error in stats['errors'][:5]:
+                    print(f"      ! {error}")
+        finally:
+            if args.config != 'testing':
+                cleanup(db, user_ids, first_outbox_id)
+            server.shutdown()
+
+        if runs:
+            print(f"\nMedian over {len(runs)} runs: "
+                  f"sweep {statistics.median(r['sweep_seconds'] for r in runs):.2f}s, "
+                  f"{statistics.median(r['queries'] for r in runs):.0f} queries, "
+                  f"{statistics.median(r['sends_per_second'] for r in runs):.1f} sends/s, "
+                  f"{statistics.median(r['recipients_per_second'] for r in runs):.1f} recipients/s")
+            print(f"Stub totals: {server.state.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Vision Preprocessing Benchmark
+Compares sending original phone photos to the vision model against the
+per-analysis-type preprocessing in app.utils.image_ingest.
+
+For each image and analysis type it reports bytes sent, preprocessing time,
+estimated upload time at a given uplink speed and (with --live) the measured
+end-to-end latency of analyze_medical_image for both variants.
+
+Usage:
+    python scripts/benchmark_vision_preprocessing.py photo1.jpg scan.jpg
+    python scripts/benchmark_vision_preprocessing.py --types skin document --uplink-mbps 5
+    python scripts/benchmark_vision_preprocessing.py --live report.jpg     # calls the provider
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.utils.image_ingest import (
+    PIL_AVAILABLE, SpooledUpload, get_vision_profile, prepare_for_vision, split_into_tiles
+)
+
+
+def make_synthetic_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """A 12 MP JPEG with sensor-like noise and EXIF, similar to a phone photo"""
+    from PIL import Image
+
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 20)
+    img = Image.merge('RGB', (gradient, Image.blend(gradient, noise, 0.3), noise))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=92, exif=exif)
+    return buffer.getvalue()
+
+
+def upload_seconds(num_bytes: int, uplink_mbps: float) -> float:
+    return num_bytes * 8 / (uplink_mbps * 1_000_000)
+
+
+def time_call(fn, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def benchmark_image(name: str, data: bytes, analysis_types, args, app=None):
+    print(f"\n📷 {name}: {len(data) / 1024:.0f} KB original")
+    print(f"   {'type':<13}{'sent KB':>9}{'saved':>8}{'tiles':>7}{'prep ms':>9}"
+          f"{'upload s':>10}{'orig upload s':>15}")
+
+    # Before: original bytes as a base64 data URL (4/3 inflation)
+    original_payload = len(data) * 4 // 3
+
+    for analysis_type in analysis_types:
+        def run():
+            upload = SpooledUpload(io.BytesIO(data), name, '', len(data), owned=True)
+            with upload:
+                image_bytes, mime_type = prepare_for_vision(upload, analysis_type=analysis_type)
+            profile = get_vision_profile(analysis_type)
+            overview, tiles = (None, [])
+            if profile['tile_size']:
+                overview, tiles = split_into_tiles(image_bytes, profile['tile_size'])
+            return image_bytes, overview, tiles
+
+        (image_bytes, overview, tiles), prep_seconds = time_call(run, args.repeat)
+        sent = len(overview) + sum(len(t) for t in tiles) if tiles else len(image_bytes)
+        saved = 100.0 * (original_payload - sent) / original_payload
+
+        print(f"   {analysis_type:<13}{sent / 1024:>9.0f}{saved:>7.0f}%{len(tiles):>7}"
+              f"{prep_seconds * 1000:>9.0f}{upload_seconds(sent, args.uplink_mbps):>10.2f}"
+              f"{upload_seconds(original_payload, args.uplink_mbps):>15.2f}")
+
+        if args.live and app is not None:
+            from app.utils.ai_image_service import analyze_medical_image
+
+            with app.app_context():
+                _, original_latency = time_call(lambda: analyze_medical_image(
+                    data, name, analysis_type=analysis_type, use_cache=False
+                ), 1)
+                _, prepared_latency = time_call(lambda: analyze_medical_image(
+                    image_bytes, name, analysis_type=analysis_type, use_cache=False
+                ), 1)
+            print(f"   {'':<13}end-to-end: original {original_latency:.1f}s, "
+                  f"preprocessed {prepared_latency + prep_seconds:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vision preprocessing benchmark')
+    parser.add_argument('images', nargs='*', help='Image files (default: synthetic 12 MP photo)')
+    parser.add_argument('--types', nargs='+', default=['skin', 'general', 'document'],
+                        help='Analysis types to compare')
+    parser.add_argument('--uplink-mbps', type=float, default=10.0,
+                        help='Uplink speed used to estimate upload time to the provider')
+    parser.add_argument('--repeat', type=int, default=3, help='Preprocessing runs per measurement')
+    parser.add_argument('--live', action='store_true',
+                        help='Also call the configured vision provider (slow, uses quota)')
+    args = parser.parse_args()
+
+    if not PIL_AVAILABLE:
+        print("❌ Pillow is required: pip install pillow")
+        sys.exit(1)
+
+    app = None
+    if args.live:
+        from app import create_app
+        app = create_app()
+
+    if args.images:
+        for path in args.images:
+            with open(path, 'rb') as f:
+                benchmark_image(os.path.basename(path), f.read(), args.types, args, app)
+    else:
+        benchmark_image('synthetic_12mp.jpg', make_synthetic_photo(), args.types, args, app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+OneSignal Stub Server
+Local stand-in for POST /api/v1/notifications so notification fan-out can be
+load-tested without the real API. Point the backend at it with:
+
+    ONESIGNAL_API_URL=http://127.0.0.1:8787/api/v1/notifications
+
+It checks the parts of the contract the backend relies on (app_id,
+Authorization header, exactly one target, external_id limit), answers with
+OneSignal-shaped bodies and can inject latency, 429/5xx errors and
+unsubscribed recipients. Repeated idempotency keys return the original
+notification id without counting a second delivery.
+
+GET /stats returns counters, POST /reset clears them.
+
+Usage:
+    python scripts/onesignal_stub.py --port 8787
+    python scripts/onesignal_stub.py --latency-ms 200 --jitter-ms 100 --error-rate 0.05
+    python scripts/onesignal_stub.py --rate-limit-rate 0.1 --max-external-ids 500
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NOTIFICATIONS_PATH = '/api/v1/notifications'
+
+
+class StubState:
+    """Options and counters shared by the request threads"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 unsubscribed_rate=0.0, max_external_ids=2000, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.unsubscribed_rate = unsubscribed_rate
+        self.max_external_ids = max_external_ids
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.accepted = 0
+            self.recipients = 0
+            self.rejected = 0
+            self.server_errors = 0
+            self.rate_limited = 0
+            self.duplicates = 0
+            self.idempotency_keys = {}
+            self.started = time.time()
+
+    def stats(self) -> dict:
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                'requests': self.requests,
+                'accepted': self.accepted,
+                'recipients': self.recipients,
+                'rejected': self.rejected,
+                'server_errors': self.server_errors,
+                'rate_limited': self.rate_limited,
+                'duplicates': self.duplicates,
+                'elapsed_seconds': round(elapsed, 3),
+                'accepted_per_second': round(self.accepted / elapsed, 1)
+            }
+
+
+class OneSignalStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self._reply(200, self.state.stats())
+        else:
+            self._reply(404, {'errors': ['Not found']})
+
+    def do_POST(self):
+        state = self.state
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if self.path == '/reset':
+            state.reset()
+            self._reply(200, {'success': True})
+            return
+        if self.path.rstrip('/') != NOTIFICATIONS_PATH:
+            self._reply(404, {'errors': ['Not found']})
+            return
+
+        with state.lock:
+            state.requests += 1
+            roll = state.random.random()
+            delay = max(0.0, state.latency_ms + state.random.uniform(-state.jitter_ms, state.jitter_ms))
+        time.sleep(delay / 1000.0)
+
+        if roll < state.rate_limit_rate:
+            with state.lock:
+                state.rate_limited += 1
+            self._reply(429, {'errors': ['API rate limit exceeded']}, {'Retry-After': '1'})
+            return
+        if roll < state.rate_limit_rate + state.error_rate:
+            with state.lock:
+                state.server_errors += 1
+            self._reply(503, {'errors': ['Service temporarily unavailable']})
+            return
+
+        try:
+            payload = json.loads(raw or b'{}')
+        except ValueError:
+            self._reject(['Invalid JSON'])
+            return
+        if not self.headers.get('Authorization', '').startswith(('Basic ', 'Key ')):
+            self._reply(401, {'errors': ['Missing or invalid Authorization header']})
+            return
+
+        errors = self._validate(payload)
+        if errors:
+            self._reject(errors)
+            return
+
+        key = payload.get('idempotency_key')
+        with state.lock:
+            original_id = state.idempotency_keys.get(key) if key else None
+            if original_id:
+                state.duplicates += 1
+        if original_id:
+            self._reply(200, {'id': original_id, 'external_id': None})
+            return
+
+        external_ids = (payload.get('include_aliases') or {}).get('external_id') or []
+        player_ids = payload.get('include_player_ids') or []
+        body = {'id': str(uuid.uuid4()), 'external_id': None}
+        if external_ids or player_ids:
+            targets = external_ids or player_ids
+            unsubscribed = [t for t in targets if state.random.random() < state.unsubscribed_rate]
+            body['recipients'] = len(targets) - len(unsubscribed)
+            if unsubscribed:
+                field = 'invalid_aliases' if external_ids else 'invalid_player_ids'
+                body['errors'] = {field: {'external_id': unsubscribed} if external_ids else unsubscribed}
+        else:
+            # Segment sends report no recipient count synchronously
+            body['recipients'] = 0
+
+        with state.lock:
+            state.accepted += 1
+            state.recipients += body['recipients']
+            if key:
+                state.idempotency_keys[key] = body['id']
+        self._reply(200, body)
+
+    def _reject(self, errors: list):
+        with self.state.lock:
+            self.state.rejected += 1
+        self._reply(400, {'errors': errors})
+
+    def _validate(self, payload: dict) -> list:
+        errors = []
+        if not payload.get('app_id'):
+            errors.append('app_id not found. You may be missing a Content-Type: application/json header.')
+        if not (payload.get('contents') or {}).get('en'):
+            errors.append('Message Notifications must have English language content')
+
+        aliases = payload.get('include_aliases')
+        targets = [name for name in ('include_aliases', 'include_player_ids', 'included_segments')
+                   if payload.get(name)]
+        if len(targets) != 1:
+            errors.append('Notification must have exactly one of include_aliases, include_player_ids, included_segments')
+        if aliases is not None:
+            external_ids = aliases.get('external_id') or []
+            if payload.get('target_channel') != 'push':
+                errors.append('target_channel must be set when using include_aliases')
+            if len(external_ids) > self.state.max_external_ids:
+                errors.append(f'include_aliases external_id is limited to {self.state.max_external_ids} entries')
+        return errors
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, **options):
+    """
+    Start the stub in a background thread
+
+    Returns:
+        (server, notifications URL); stop with server.shutdown()
+    """
+    server = ThreadingHTTPServer((host, port), OneSignalStubHandler)
+    server.daemon_threads = True
+    server.state = StubState(**options)
+    threading.Thread(target=server.serve_forever, name='onesignal-stub', daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}{NOTIFICATIONS_PATH}"
+    return server, url
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Added response latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random +/- latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered 429')
+    parser.add_argument('--unsubscribed-rate', type=float, default=0.0,
+                        help='Share of recipients reported as unsubscribed')
+    parser.add_argument('--max-external-ids', type=int, default=2000,
+                        help='Max include_aliases external_ids per request')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+
+
+def stub_options(args) -> dict:
+    return {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'rate_limit_rate': args.rate_limit_rate,
+        'unsubscribed_rate': args.unsubscribed_rate,
+        'max_external_ids': args.max_external_ids,
+        'seed': args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OneSignal notifications API stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, **stub_options(args))
+    print(f"OneSignal stub listening on {url}")
+    print(f"  export ONESIGNAL_API_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\nStats: {server.state.stats()}")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()